@@ -0,0 +1,126 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Optional, Any
+
+class ArtifactCache:
+    """
+    On-disk cache for intermediate artifacts (transcripts, face analyses,
+    un-subtitled renders).
+    
+    Entries are content-addressed by a hash of their kind and parameters and
+    evicted least-recently-used once the cache exceeds max_bytes. Writes are
+    atomic renames, so several worker processes can share one cache directory.
+    """
+    
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+    
+    @staticmethod
+    def make_key(kind: str, **params: Any) -> str:
+        """Build a cache key from an artifact kind and its parameters"""
+        payload = json.dumps({'kind': kind, **params}, sort_keys=True, default=str)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return f"{kind}-{digest[:32]}"
+    
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.root, key + ext)
+    
+    def _touch(self, path: str) -> bool:
+        """Mark an entry as recently used; False if it is gone"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+    
+    def get_json(self, key: str) -> Optional[Any]:
+        """Return a cached JSON artifact, or None"""
+        path = self._path(key, '.json')
+        if not self._touch(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def put_json(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable artifact"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp_')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, self._path(key, '.json'))
+        self._evict()
+    
+    def fetch_file(self, key: str, dest_path: str, ext: str = '.mp4') -> bool:
+        """
+        Materialize a cached file at dest_path. Uses a hard link when possible
+        so the copy stays valid even if the entry is evicted meanwhile.
+        """
+        path = self._path(key, ext)
+        if not self._touch(path):
+            return False
+        try:
+            try:
+                os.link(path, dest_path)
+            except OSError:
+                shutil.copyfile(path, dest_path)
+            return True
+        except OSError:
+            return False
+    
+    def put_file(self, key: str, src_path: str, ext: str = '.mp4') -> None:
+        """Store a copy of a file"""
+        if os.path.getsize(src_path) > self.max_bytes:
+            return
+        
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp_')
+        os.close(fd)
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, self._path(key, ext))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+    
+    def size_bytes(self) -> int:
+        """Total size of all cached entries"""
+        total = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith('.tmp_'):
+                total += entry.stat().st_size
+        return total
+    
+    def _evict(self) -> None:
+        """Delete least recently used entries until within budget"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or entry.name.startswith('.tmp_'):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+            
+            if total <= self.max_bytes:
+                return
+            
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
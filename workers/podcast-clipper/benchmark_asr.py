@@ -0,0 +1,113 @@
+"""
+Benchmark ASR backends on a fixed audio fixture.
+
+Transcribes the same audio with each whisper_model setting and reports
+load time, real-time factor (transcription time / audio duration), word
+count and word-timing drift against the first backend, which is the
+reference (the current whisper_timestamped path by default).
+
+    python benchmark_asr.py fixture.wav
+    python benchmark_asr.py podcast.mp4 --models base,faster-whisper:base,faster-whisper:small --threads 4
+"""
+import os
+import re
+import time
+import wave
+import difflib
+import tempfile
+import argparse
+import subprocess
+
+import numpy as np
+
+from smartclip_engine import get_model_pool
+
+def prepare_audio(path: str, work_dir: str) -> str:
+    """Convert any media file to the 16kHz mono PCM the engine transcribes"""
+    audio_path = os.path.join(work_dir, 'fixture.wav')
+    cmd = [
+        'ffmpeg', '-y', '-i', path,
+        '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
+        audio_path
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+    return audio_path
+
+def audio_duration(path: str) -> float:
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / wav.getframerate()
+
+def normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9']", '', text.lower())
+
+def timing_drift(reference: list, words: list) -> dict:
+    """Match words by text and compare their start/end times"""
+    matcher = difflib.SequenceMatcher(
+        a=[normalize(w['text']) for w in reference],
+        b=[normalize(w['text']) for w in words],
+        autojunk=False
+    )
+
+    start_diffs = []
+    end_diffs = []
+    for block in matcher.get_matching_blocks():
+        for i in range(block.size):
+            ref = reference[block.a + i]
+            word = words[block.b + i]
+            start_diffs.append(abs(ref['start'] - word['start']))
+            end_diffs.append(abs(ref['end'] - word['end']))
+
+    if not start_diffs:
+        return {'matched': 0.0, 'start_mean_ms': 0.0, 'start_p95_ms': 0.0, 'end_mean_ms': 0.0}
+
+    return {
+        'matched': len(start_diffs) / max(1, len(reference)),
+        'start_mean_ms': float(np.mean(start_diffs)) * 1000,
+        'start_p95_ms': float(np.percentile(start_diffs, 95)) * 1000,
+        'end_mean_ms': float(np.mean(end_diffs)) * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='ASR backend benchmark')
+    parser.add_argument('audio', help='Audio or video fixture')
+    parser.add_argument('--models', default='base,faster-whisper:base', help='Comma-separated whisper_model values; the first is the reference')
+    parser.add_argument('--threads', type=int, default=0, help='CPU threads for faster-whisper (0 = library default)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per model (best is reported)')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='asr_bench_')
+    audio_path = prepare_audio(args.audio, work_dir)
+    duration = audio_duration(audio_path)
+
+    pool = get_model_pool()
+    pool.asr_threads = args.threads
+
+    print(f"Audio: {duration:.1f}s, CPU cores: {os.cpu_count()}, ASR threads: {args.threads or 'default'}")
+    print(f"{'model':<28} {'load (s)':>8} {'RTF':>6} {'words':>6} {'matched':>8} {'start drift':>12} {'p95':>8} {'end drift':>10}")
+
+    reference = None
+    for whisper_model in [m.strip() for m in args.models.split(',') if m.strip()]:
+        started = time.perf_counter()
+        backend = pool.asr(whisper_model)
+        load_time = time.perf_counter() - started
+
+        best = None
+        words = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            words = backend.transcribe(audio_path)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        if reference is None:
+            reference = words
+        drift = timing_drift(reference, words)
+
+        print(
+            f"{whisper_model:<28} {load_time:>8.1f} {best / duration:>6.3f} {len(words):>6} "
+            f"{drift['matched']:>7.0%} {drift['start_mean_ms']:>9.0f} ms {drift['start_p95_ms']:>5.0f} ms "
+            f"{drift['end_mean_ms']:>7.0f} ms"
+        )
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Exercise the Redis Streams job queue against a local Redis.
+
+Pushes jobs onto the legacy list (as the API does), runs several consumer
+processes that "process" each job with a sleep and randomly crash or fail
+some of them, then reports throughput and checks that every job either
+completed exactly once or ended up on the dead-letter stream. Crashes are
+injected both mid-job and between marking a job done and acking it, and
+some consumers stop heartbeating for longer than the visibility timeout so
+their job is reclaimed while they still hold it.
+
+    docker run -p 6379:6379 redis:7
+    python benchmark_queue.py --jobs 200 --consumers 1,2,4
+"""
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import multiprocessing
+
+import redis
+
+from job_queue import StreamJobQueue
+
+def consume(
+    redis_url: str,
+    prefix: str,
+    work: float,
+    crash_rate: float,
+    ack_crash_rate: float,
+    pause_rate: float,
+    fail_rate: float,
+    visibility: float,
+    deadline: float
+) -> None:
+    client = redis.from_url(redis_url, decode_responses=True)
+    queue = StreamJobQueue(
+        client, f"{prefix}:stream", f"{prefix}:workers",
+        legacy_list=f"{prefix}:jobs", visibility_timeout=visibility, max_attempts=3
+    )
+    rng = random.Random(os.getpid())
+    
+    while time.time() < deadline:
+        job = queue.fetch(0.2)
+        if job is None:
+            if queue.depth() == 0 and not client.xpending(queue.stream, queue.group)['pending']:
+                return
+            continue
+        
+        if queue.exhausted(job):
+            queue.dead_letter(job, 'abandoned')
+            continue
+        
+        if rng.random() < pause_rate:
+            # Heartbeats stall past the visibility timeout (GC pause, network
+            # partition), so another consumer may reclaim the job meanwhile
+            time.sleep(visibility * 1.5)
+            queue.heartbeat(job)
+        
+        with queue.keepalive(job):
+            time.sleep(work)
+            if rng.random() < crash_rate:
+                # Die holding the job; another consumer must reclaim it
+                os._exit(1)
+            if job.lost:
+                # Taken over: no retry, dead-letter or completion from this delivery
+                client.hincrby(f"{prefix}:taken_over", job.data['job_id'], 1)
+                continue
+            if rng.random() < fail_rate:
+                if queue.is_final_attempt(job):
+                    queue.dead_letter(job, 'simulated failure')
+                else:
+                    queue.retry(job, 'simulated failure')
+                continue
+            
+            # The worker checks this before uploading its output
+            if not queue.is_done(job):
+                client.hincrby(f"{prefix}:completions", job.data['job_id'], 1)
+        
+        queue.mark_done(job)
+        if rng.random() < ack_crash_rate:
+            # Die after completing but before the ack; the redelivery must be dropped
+            os._exit(1)
+        queue.ack(job)
+
+def run(redis_url: str, jobs: int, consumers: int, args) -> None:
+    prefix = f"queue_bench:{uuid.uuid4().hex[:8]}"
+    client = redis.from_url(redis_url, decode_responses=True)
+    for i in range(jobs):
+        client.lpush(f"{prefix}:jobs", f'{{"job_id": "job-{i}", "project_id": "bench"}}')
+    
+    started = time.time()
+    deadline = started + args.timeout
+    processes = {}
+    
+    def spawn(slot: int) -> None:
+        process = multiprocessing.Process(
+            target=consume,
+            args=(redis_url, prefix, args.work, args.crash_rate, args.ack_crash_rate, args.pause_rate, args.fail_rate, args.visibility, deadline)
+        )
+        process.start()
+        processes[slot] = process
+    
+    for slot in range(consumers):
+        spawn(slot)
+    
+    # Restart crashed consumers like the worker pool does
+    while any(p.is_alive() for p in processes.values()) and time.time() < deadline:
+        for slot, process in list(processes.items()):
+            if not process.is_alive() and process.exitcode != 0:
+                spawn(slot)
+        time.sleep(0.1)
+    for process in processes.values():
+        process.join()
+    elapsed = time.time() - started
+    
+    completions = {k: int(v) for k, v in client.hgetall(f"{prefix}:completions").items()}
+    dead_ids = {json.loads(fields['job'])['job_id'] for _, fields in client.xrange(f"{prefix}:stream:dead")}
+    lost = [f"job-{i}" for i in range(jobs) if f"job-{i}" not in completions and f"job-{i}" not in dead_ids]
+    duplicated = [job_id for job_id, count in completions.items() if count > 1]
+    taken_over = sum(int(v) for v in client.hvals(f"{prefix}:taken_over"))
+    
+    print(
+        f"{consumers:>9} {elapsed:>8.1f} {len(completions) / elapsed:>8.1f} "
+        f"{len(completions):>9} {len(dead_ids):>5} {len(lost):>5} {len(duplicated):>10} {taken_over:>10}"
+    )
+    
+    keys = client.keys(f"{prefix}*")
+    if keys:
+        client.delete(*keys)
+
+def main():
+    parser = argparse.ArgumentParser(description='Redis Streams job queue benchmark')
+    parser.add_argument('--redis-url', default=os.environ.get('REDIS_URL', 'redis://localhost:6379'))
+    parser.add_argument('--jobs', type=int, default=100)
+    parser.add_argument('--consumers', default='1,2,4', help='Comma-separated consumer process counts')
+    parser.add_argument('--work', type=float, default=0.05, help='Seconds of simulated work per job')
+    parser.add_argument('--crash-rate', type=float, default=0.02, help='Chance a consumer dies mid-job')
+    parser.add_argument('--ack-crash-rate', type=float, default=0.02, help='Chance a consumer dies between completing a job and acking it')
+    parser.add_argument('--pause-rate', type=float, default=0.02, help='Chance a consumer stops heartbeating for longer than the visibility timeout')
+    parser.add_argument('--fail-rate', type=float, default=0.05, help='Chance a job raises')
+    parser.add_argument('--visibility', type=float, default=1.0, help='Visibility timeout (seconds)')
+    parser.add_argument('--timeout', type=float, default=300, help='Give up after this many seconds')
+    args = parser.parse_args()
+    
+    print(f"{'consumers':>9} {'time (s)':>8} {'jobs/s':>8} {'completed':>9} {'dead':>5} {'lost':>5} {'duplicated':>10} {'taken over':>10}")
+    for consumers in [int(c) for c in args.consumers.split(',')]:
+        run(args.redis_url, args.jobs, consumers, args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark single-process vs chunked parallel rendering.
+
+Renders the same clip with the engine's layout filter (and optionally a
+burned-in ASS track) at several chunk counts and reports wall time, speedup
+and the output frame count, which must match the single-process render.
+
+    python benchmark_render.py                      # synthetic 1080p source
+    python benchmark_render.py podcast.mp4 -s 60 -d 240 --chunks 1,2,4,8
+"""
+import os
+import time
+import tempfile
+import argparse
+import subprocess
+
+import cv2
+
+from smartclip_engine import SmartClipEngine
+
+def make_source(path: str, duration: float) -> None:
+    """Generate a 1920x1080 30fps test video with a tone"""
+    cmd = [
+        'ffmpeg', '-y',
+        '-f', 'lavfi', '-i', f"testsrc2=size=1920x1080:rate=30:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}",
+        '-c:v', 'libx264', '-preset', 'veryfast', '-g', '60',
+        '-c:a', 'aac',
+        '-shortest',
+        path
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+
+def make_subtitles(engine: SmartClipEngine, path: str, duration: float) -> str:
+    """Write an ASS file with a word every 0.4s"""
+    words = []
+    t = 0.0
+    while t + 0.4 <= duration:
+        words.append({'text': f"word{len(words)}", 'start': t, 'end': t + 0.35})
+        t += 0.4
+    timeline = [{'start': 0, 'end': duration, 'mode': 'single'}]
+    return engine.subtitle_gen.write_ass(words, path, 1080, 1920, timeline)
+
+def count_frames(path: str) -> int:
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-count_packets',
+        '-show_entries', 'stream=nb_read_packets',
+        '-of', 'csv=p=0',
+        path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    return int(result.stdout.strip().rstrip(','))
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked render benchmark')
+    parser.add_argument('input', nargs='?', help='Input video (default: generated test source)')
+    parser.add_argument('-s', '--start', type=float, default=0, help='Clip start (seconds)')
+    parser.add_argument('-d', '--duration', type=float, default=120, help='Clip duration (seconds)')
+    parser.add_argument('--chunks', default='1,2,4', help='Comma-separated chunk counts; 1 is the single-process path')
+    parser.add_argument('--no-subtitles', action='store_true', help='Benchmark without ASS burn-in')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per chunk count (best is reported)')
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix='render_bench_')
+    engine = SmartClipEngine(temp_dir=work_dir, output_dir=work_dir)
+    
+    input_path = args.input
+    if not input_path:
+        input_path = os.path.join(work_dir, 'source.mp4')
+        print(f"Generating {args.start + args.duration:.0f}s test source...")
+        make_source(input_path, args.start + args.duration)
+    
+    cap = cv2.VideoCapture(input_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    
+    filter_complex = engine._single_speaker_filter(width, height)
+    ass_path = None
+    if not args.no_subtitles:
+        ass_path = make_subtitles(engine, os.path.join(work_dir, 'bench.ass'), args.duration)
+    
+    print(f"CPU cores: {os.cpu_count()}, clip: {args.duration:.0f}s, subtitles: {ass_path is not None}")
+    print(f"{'chunks':>6} {'time (s)':>9} {'speedup':>8} {'frames':>7}")
+    
+    baseline = None
+    for chunks in [int(c) for c in args.chunks.split(',')]:
+        engine.render_chunks = chunks
+        output_path = os.path.join(work_dir, f"out_{chunks}.mp4")
+        
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            engine._render(input_path, output_path, args.start, args.duration, filter_complex, ass_path)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        
+        if baseline is None:
+            baseline = best
+        print(f"{chunks:>6} {best:>9.2f} {baseline / best:>7.2f}x {count_frames(output_path):>7}")
+    
+    print(f"\nOutputs kept in {work_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Exercise the streaming multipart upload (S3MultipartSink) against a local
+S3 stand-in.
+
+Streams random bytes into the sink in uneven writes, as FFmpeg's stdout
+does, and checks that the stored object matches byte for byte (part
+ordering), then reports upload throughput per concurrency. It also checks
+that no multipart upload is left behind when the stream is reset (a
+failed encode attempt), aborted (a failed job) or when
+complete_multipart_upload fails.
+
+    docker run -p 9000:9000 minio/minio server /data
+    AWS_S3_ENDPOINT_URL=http://localhost:9000 AWS_ACCESS_KEY_ID=minioadmin \\
+        AWS_SECRET_ACCESS_KEY=minioadmin python benchmark_upload.py
+
+    pip install "moto[server]"
+    python benchmark_upload.py --moto          # in-process moto server
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import hashlib
+import argparse
+
+def start_moto(port: int) -> None:
+    """Run a moto S3 server and point the worker's S3 settings at it"""
+    from moto.server import ThreadedMotoServer
+    
+    ThreadedMotoServer(ip_address='127.0.0.1', port=port).start()
+    os.environ['AWS_S3_ENDPOINT_URL'] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+class FailingComplete:
+    """S3 client whose complete_multipart_upload fails, like a dropped connection"""
+    
+    def __init__(self, client):
+        self._client = client
+    
+    def complete_multipart_upload(self, **kwargs):
+        raise ConnectionError('simulated failure completing the upload')
+    
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def stream(sink, data: bytes, rng: random.Random) -> None:
+    """Write data in uneven chunks, like pipe reads from FFmpeg"""
+    offset = 0
+    while offset < len(data):
+        size = rng.randint(1024, 3 * 1024 * 1024)
+        sink.write(data[offset:offset + size])
+        offset += size
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming multipart upload checks')
+    parser.add_argument('--moto', action='store_true', help='Start an in-process moto S3 server')
+    parser.add_argument('--moto-port', type=int, default=5055)
+    parser.add_argument('--size-mb', type=int, default=64, help='Size of the streamed object')
+    parser.add_argument('--concurrency', default='1,4,8', help='Comma-separated upload concurrencies')
+    args = parser.parse_args()
+    
+    if args.moto:
+        start_moto(args.moto_port)
+    
+    # Reads the S3 settings from the environment at import
+    import worker
+    from worker import S3MultipartSink, get_s3_client
+    
+    s3 = get_s3_client()
+    bucket = worker.AWS_S3_BUCKET
+    try:
+        s3.create_bucket(Bucket=bucket)
+    except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+        pass
+    
+    prefix = f"upload_bench/{uuid.uuid4().hex[:8]}"
+    rng = random.Random(0)
+    data = os.urandom(args.size_mb * 1024 * 1024)
+    failures = []
+    
+    def stored(key: str) -> bytes:
+        return s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    
+    def pending_uploads(key: str) -> int:
+        return len(s3.list_multipart_uploads(Bucket=bucket, Prefix=key).get('Uploads', []))
+    
+    def check(name: str, ok: bool, detail: str = '') -> None:
+        print(f"{'PASS' if ok else 'FAIL':<5} {name}{': ' + detail if detail else ''}")
+        if not ok:
+            failures.append(name)
+    
+    # Part ordering and throughput
+    print(f"{'concurrency':>11} {'MB':>6} {'parts':>6} {'time (s)':>8} {'MB/s':>8}")
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        key = f"{prefix}/ordered_{concurrency}.mp4"
+        sink = S3MultipartSink(key, max_concurrency=concurrency)
+        started = time.time()
+        stream(sink, data, rng)
+        sink.close()
+        elapsed = time.time() - started
+        parts = -(-len(data) // sink.part_size)
+        print(f"{concurrency:>11} {args.size_mb:>6} {parts:>6} {elapsed:>8.2f} {args.size_mb / elapsed:>8.1f}")
+        
+        body = stored(key)
+        check(
+            f"object matches the stream (concurrency {concurrency})",
+            hashlib.sha256(body).digest() == hashlib.sha256(data).digest(),
+            f"{len(body)} of {len(data)} bytes"
+        )
+    
+    # A failed encode attempt resets the sink and the retry streams again
+    key = f"{prefix}/reset.mp4"
+    retry_data = os.urandom(12 * 1024 * 1024)
+    sink = S3MultipartSink(key)
+    stream(sink, data[:20 * 1024 * 1024], rng)
+    sink.reset()
+    check('reset() aborts the upload', pending_uploads(key) == 0)
+    stream(sink, retry_data, rng)
+    sink.close()
+    check('upload after reset() holds only the retried stream', stored(key) == retry_data)
+    
+    # A failed job aborts the sink
+    key = f"{prefix}/abort.mp4"
+    sink = S3MultipartSink(key)
+    stream(sink, data[:20 * 1024 * 1024], rng)
+    sink.abort()
+    check('abort() leaves no upload or object', pending_uploads(key) == 0 and not s3.list_objects_v2(Bucket=bucket, Prefix=key).get('Contents'))
+    
+    # Completing the upload fails
+    key = f"{prefix}/complete_fails.mp4"
+    sink = S3MultipartSink(key)
+    sink.s3 = FailingComplete(sink.s3)
+    stream(sink, data[:20 * 1024 * 1024], rng)
+    try:
+        sink.close()
+        check('close() raises when completing fails', False)
+    except ConnectionError:
+        check('close() raises when completing fails', True)
+    check('failed completion aborts the upload', pending_uploads(key) == 0)
+    
+    for obj in s3.list_objects_v2(Bucket=bucket, Prefix=prefix).get('Contents', []):
+        s3.delete_object(Bucket=bucket, Key=obj['Key'])
+    
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from typing import Optional, Dict, Any, Callable
+
+from artifact_cache import ArtifactCache
+
+class JobCheckpoint:
+    """
+    Durable per-job stage outputs, so a retried job resumes where the
+    failed attempt stopped instead of starting over from the download.
+    
+    Everything lives in root/<job_id>/ next to a manifest.json recording
+    the completed stages and the artifacts they produced. The worker
+    checkpoints the clipped input itself; the engine checkpoints its shot
+    list, face analysis, word list and (in two-pass mode) base render
+    through the ArtifactCache interface (get_json/put_json/fetch_file/put_file), which
+    this class implements. Misses fall through to a shared artifact cache
+    and writes go to both. Put root on a shared volume to resume jobs
+    reclaimed by another worker node.
+    
+    A duplicate delivery of the same job may clear() the directory while
+    this one is still writing; writes then recreate it and carry on.
+    """
+    
+    MANIFEST = 'manifest.json'
+    
+    def __init__(self, root: str, job_id: str, shared: Optional[ArtifactCache] = None):
+        self.job_id = job_id
+        self.dir = os.path.join(root, job_id.replace('/', '_'))
+        self.shared = shared
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.dir, self.MANIFEST), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('job_id') == self.job_id:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {'job_id': self.job_id, 'stages': {}, 'artifacts': {}}
+    
+    def _write(self, name: str, produce: Callable[[str], None]) -> None:
+        """
+        Create `name` atomically: produce(tmp_path) writes a temporary file
+        that is then renamed into place. Retries once if the directory was
+        removed underneath (a concurrent clear()).
+        """
+        for attempt in range(2):
+            tmp_path = None
+            try:
+                os.makedirs(self.dir, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=self.dir, prefix='.tmp_')
+                os.close(fd)
+                produce(tmp_path)
+                os.replace(tmp_path, os.path.join(self.dir, name))
+                return
+            except FileNotFoundError:
+                if attempt:
+                    raise
+            finally:
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    
+    @staticmethod
+    def _dump_json(value: Any) -> Callable[[str], None]:
+        def produce(tmp_path: str) -> None:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+        return produce
+    
+    def _save_manifest(self) -> None:
+        """Atomically rewrite the manifest; callers hold the lock"""
+        self._write(self.MANIFEST, self._dump_json(self.manifest))
+    
+    def _store_file(self, src_path: str, name: str) -> None:
+        """Hard-link (or copy) a file into the checkpoint directory"""
+        def produce(tmp_path: str) -> None:
+            os.remove(tmp_path)
+            try:
+                os.link(src_path, tmp_path)
+            except OSError:
+                shutil.copyfile(src_path, tmp_path)
+        
+        self._write(name, produce)
+    
+    def _restore_file(self, name: str, dest_path: str) -> bool:
+        path = os.path.join(self.dir, name)
+        if not os.path.exists(path):
+            return False
+        try:
+            try:
+                os.link(path, dest_path)
+            except OSError:
+                shutil.copyfile(path, dest_path)
+            return True
+        except OSError:
+            return False
+    
+    def completed(self, stage: str) -> Optional[Dict[str, Any]]:
+        """Data recorded for a completed stage, or None"""
+        entry = self.manifest['stages'].get(stage)
+        return entry['data'] if entry else None
+    
+    def complete(self, stage: str, data: Optional[Dict[str, Any]] = None, file_path: Optional[str] = None) -> None:
+        """Record a stage as completed, with its output file if it has one"""
+        name = None
+        if file_path:
+            name = f"{stage}{os.path.splitext(file_path)[1]}"
+            self._store_file(file_path, name)
+        
+        with self._lock:
+            self.manifest['stages'][stage] = {'data': data or {}, 'file': name, 'completed_at': time.time()}
+            self._save_manifest()
+    
+    def restore(self, stage: str, dest_path: str) -> bool:
+        """Materialize a completed stage's output file at dest_path"""
+        entry = self.manifest['stages'].get(stage)
+        return bool(entry and entry['file'] and self._restore_file(entry['file'], dest_path))
+    
+    def _record_artifact(self, key: str, name: str) -> None:
+        # Artifact keys are '<kind>-<hash>'; the kind names the engine stage
+        with self._lock:
+            self.manifest['artifacts'][key] = name
+            self.manifest['stages'][key.split('-', 1)[0]] = {'data': {'key': key}, 'file': name, 'completed_at': time.time()}
+            self._save_manifest()
+    
+    def get_json(self, key: str) -> Optional[Any]:
+        """Return a checkpointed JSON artifact, else the shared cache's, or None"""
+        name = self.manifest['artifacts'].get(key)
+        if name:
+            try:
+                with open(os.path.join(self.dir, name), 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return self.shared.get_json(key) if self.shared else None
+    
+    def put_json(self, key: str, value: Any) -> None:
+        """Checkpoint a JSON-serializable artifact"""
+        name = key + '.json'
+        self._write(name, self._dump_json(value))
+        self._record_artifact(key, name)
+        
+        if self.shared:
+            self.shared.put_json(key, value)
+    
+    def fetch_file(self, key: str, dest_path: str, ext: str = '.mp4') -> bool:
+        """Materialize a checkpointed file artifact, falling back to the shared cache"""
+        name = self.manifest['artifacts'].get(key)
+        if name and self._restore_file(name, dest_path):
+            return True
+        return bool(self.shared and self.shared.fetch_file(key, dest_path, ext))
+    
+    def put_file(self, key: str, src_path: str, ext: str = '.mp4') -> None:
+        """Checkpoint a file artifact"""
+        self._store_file(src_path, key + ext)
+        self._record_artifact(key, key + ext)
+        
+        if self.shared:
+            self.shared.put_file(key, src_path, ext)
+    
+    def clear(self) -> None:
+        """Delete the checkpoint once the job has finished for good"""
+        shutil.rmtree(self.dir, ignore_errors=True)
+    
+    @staticmethod
+    def sweep(root: str, max_age_seconds: float) -> int:
+        """Delete checkpoints of jobs untouched for max_age_seconds; returns how many"""
+        if not os.path.isdir(root):
+            return 0
+        
+        removed = 0
+        cutoff = time.time() - max_age_seconds
+        for entry in os.scandir(root):
+            if not entry.is_dir():
+                continue
+            manifest = os.path.join(entry.path, JobCheckpoint.MANIFEST)
+            try:
+                modified = os.path.getmtime(manifest if os.path.exists(manifest) else entry.path)
+            except OSError:
+                continue
+            if modified < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterator
+
+import redis
+
+from metrics import get_metrics
+
+# Moves jobs pushed by the API onto the stream atomically, so a job is
+# never in neither place if the worker dies mid-move
+BRIDGE_SCRIPT = """
+local moved = 0
+for i = 1, tonumber(ARGV[1]) do
+    local job = redis.call('RPOP', KEYS[1])
+    if not job then
+        break
+    end
+    redis.call('XADD', KEYS[2], '*', 'job', job, 'attempt', '1')
+    moved = moved + 1
+end
+return moved
+"""
+
+# Resets an entry's idle time only while this consumer still owns it; a
+# plain XCLAIM would take back an entry another consumer has reclaimed
+HEARTBEAT_SCRIPT = """
+local pending = redis.call('XPENDING', KEYS[1], ARGV[1], ARGV[3], ARGV[3], 1)
+if #pending == 0 or pending[1][2] ~= ARGV[2] then
+    return 0
+end
+redis.call('XCLAIM', KEYS[1], ARGV[1], ARGV[2], 0, ARGV[3], 'JUSTID')
+return 1
+"""
+
+get_metrics().describe('smartclip_jobs_reclaimed_total', 'counter', 'Jobs reclaimed from a consumer that stopped heartbeating')
+get_metrics().describe('smartclip_job_retries_total', 'counter', 'Failed jobs requeued for another attempt')
+get_metrics().describe('smartclip_jobs_dead_lettered_total', 'counter', 'Jobs moved to the dead-letter stream')
+get_metrics().describe('smartclip_jobs_ownership_lost_total', 'counter', 'Running jobs reclaimed by another consumer after missing heartbeats')
+
+@dataclass
+class QueuedJob:
+    """A job delivered to this consumer and not yet acknowledged"""
+    entry_id: str
+    payload: str
+    data: Dict[str, Any]
+    attempt: int
+    # Set when another consumer reclaimed the entry; this delivery must stop
+    # and leave retries, dead-lettering and the job's status to that one
+    lost: bool = False
+
+class StreamJobQueue:
+    """
+    At-least-once job queue on a Redis Stream consumer group.
+    
+    A delivered entry stays in the group's pending list until ack(). While
+    a job runs, keepalive() periodically resets the entry's idle time; an
+    entry idle for longer than visibility_timeout belonged to a worker that
+    died and is reclaimed (XAUTOCLAIM) by the next free consumer. A
+    heartbeat never takes an entry back from the consumer that reclaimed
+    it; the stale delivery is flagged `lost` instead. Failed
+    jobs are requeued with an attempt counter and moved to a dead-letter
+    stream after max_attempts. A completion marker per job_id, written by
+    mark_done() before ack(), makes a redelivery after completion (crash
+    between finishing and ack) a no-op, and lets a delivery that was
+    reclaimed while still running see that it lost (is_done()).
+    
+    Jobs the API still pushes onto the legacy list are bridged onto the
+    stream by a Lua script.
+    """
+    
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        stream: str,
+        group: str,
+        legacy_list: Optional[str] = None,
+        consumer: Optional[str] = None,
+        visibility_timeout: float = 300,
+        max_attempts: int = 3,
+        done_ttl: int = 7 * 24 * 3600
+    ):
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.dead_letter_stream = f"{stream}:dead"
+        self.done_prefix = f"{stream}:done:"
+        self.legacy_list = legacy_list
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.done_ttl = done_ttl
+        self._bridge = redis_client.register_script(BRIDGE_SCRIPT)
+        self._heartbeat = redis_client.register_script(HEARTBEAT_SCRIPT)
+        self._ensure_group()
+    
+    def _ensure_group(self) -> None:
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+    
+    def bridge_legacy(self, max_jobs: int = 100) -> int:
+        """Move jobs from the legacy list onto the stream"""
+        if not self.legacy_list:
+            return 0
+        return int(self._bridge(keys=[self.legacy_list, self.stream], args=[max_jobs]))
+    
+    def fetch(self, block_seconds: float) -> Optional[QueuedJob]:
+        """
+        Next job for this consumer: an abandoned entry past its visibility
+        timeout first, else a new one (blocking up to block_seconds).
+        """
+        self.bridge_legacy()
+        
+        reclaimed = self.redis.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=int(self.visibility_timeout * 1000),
+            start_id='0-0', count=1
+        )
+        entries = reclaimed[1] if reclaimed else []
+        if entries:
+            get_metrics().inc('smartclip_jobs_reclaimed_total')
+            return self._delivered(*entries[0], reclaimed=True)
+        
+        result = self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: '>'},
+            count=1, block=int(block_seconds * 1000)
+        )
+        if not result:
+            return None
+        _, entries = result[0]
+        return self._delivered(*entries[0], reclaimed=False) if entries else None
+    
+    def _delivered(self, entry_id: str, fields: Optional[Dict[str, str]], reclaimed: bool) -> Optional[QueuedJob]:
+        """Wrap a delivered entry, dropping ones that must not run again"""
+        if not fields:
+            # Trimmed from the stream while pending
+            self.redis.xack(self.stream, self.group, entry_id)
+            return None
+        
+        payload = fields.get('job', '')
+        attempt = int(fields.get('attempt', 1))
+        if reclaimed:
+            # Each reclaim is an attempt whose worker died
+            pending = self.redis.xpending_range(self.stream, self.group, entry_id, entry_id, 1)
+            if pending:
+                attempt += int(pending[0]['times_delivered']) - 1
+        
+        try:
+            data = json.loads(payload)
+        except ValueError as e:
+            self._dead_letter(entry_id, payload, attempt, f"Invalid job JSON: {e}")
+            return None
+        
+        job = QueuedJob(entry_id, payload, data, attempt)
+        
+        if self.is_done(job):
+            self.ack(job)
+            return None
+        return job
+    
+    def exhausted(self, job: QueuedJob) -> bool:
+        """Whether the job has used up its attempts (e.g. it keeps crashing the worker)"""
+        return job.attempt > self.max_attempts
+    
+    def is_final_attempt(self, job: QueuedJob) -> bool:
+        return job.attempt >= self.max_attempts
+    
+    def heartbeat(self, job: QueuedJob) -> bool:
+        """
+        Reset the entry's idle time so it is not reclaimed while running.
+        Returns False, and flags the job lost, once this consumer no longer
+        owns the entry.
+        """
+        owned = bool(self._heartbeat(keys=[self.stream], args=[self.group, self.consumer, job.entry_id]))
+        if not owned and not job.lost:
+            job.lost = True
+            get_metrics().inc('smartclip_jobs_ownership_lost_total')
+        return owned
+    
+    @contextmanager
+    def keepalive(self, job: QueuedJob) -> Iterator[None]:
+        """Heartbeat the job from a background thread while the block runs"""
+        stop = threading.Event()
+        
+        def beat():
+            while not stop.wait(self.visibility_timeout / 3):
+                try:
+                    if not self.heartbeat(job):
+                        return
+                except redis.RedisError:
+                    pass
+        
+        thread = threading.Thread(target=beat, name='job-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+    
+    def is_done(self, job: QueuedJob) -> bool:
+        """Whether some delivery of this job has already completed it"""
+        job_id = job.data.get('job_id')
+        return bool(job_id) and bool(self.redis.exists(self.done_prefix + str(job_id)))
+    
+    def mark_done(self, job: QueuedJob) -> None:
+        """Record the job as completed; call as soon as it succeeds, before ack()"""
+        job_id = job.data.get('job_id')
+        if job_id:
+            self.redis.set(self.done_prefix + str(job_id), job.entry_id, ex=self.done_ttl)
+    
+    def ack(self, job: QueuedJob) -> None:
+        """Remove a finished job from the pending list"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xack(self.stream, self.group, job.entry_id)
+        pipe.xdel(self.stream, job.entry_id)
+        pipe.execute()
+    
+    def retry(self, job: QueuedJob, error: str) -> None:
+        """Requeue a failed job as a new entry with the next attempt number"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.stream, {'job': job.payload, 'attempt': str(job.attempt + 1), 'error': error[-500:]})
+        pipe.xack(self.stream, self.group, job.entry_id)
+        pipe.xdel(self.stream, job.entry_id)
+        pipe.execute()
+        get_metrics().inc('smartclip_job_retries_total')
+    
+    def dead_letter(self, job: QueuedJob, error: str) -> None:
+        """Give up on a job, keeping it on the dead-letter stream for inspection"""
+        self._dead_letter(job.entry_id, job.payload, job.attempt, error)
+    
+    def _dead_letter(self, entry_id: str, payload: str, attempt: int, error: str) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.xadd(self.dead_letter_stream, {
+            'job': payload,
+            'attempt': str(attempt),
+            'error': error[-500:],
+            'failed_at': str(int(time.time()))
+        })
+        pipe.xack(self.stream, self.group, entry_id)
+        pipe.xdel(self.stream, entry_id)
+        pipe.execute()
+        get_metrics().inc('smartclip_jobs_dead_lettered_total')
+    
+    def depth(self) -> int:
+        """Jobs waiting: undelivered stream entries plus the legacy list"""
+        waiting = 0
+        for group in self.redis.xinfo_groups(self.stream):
+            if group.get('name') == self.group:
+                lag = group.get('lag')
+                # Redis < 7 has no lag; every entry is either pending or waiting
+                waiting = lag if lag is not None else max(0, self.redis.xlen(self.stream) - group.get('pending', 0))
+        if self.legacy_list:
+            waiting += self.redis.llen(self.legacy_list)
+        return waiting
@@ -0,0 +1,218 @@
+import time
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; spans sub-second stages (layout) up to long renders and downloads
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+class Metrics:
+    """
+    In-process registry of counters, gauges and histograms rendered in the
+    Prometheus text format.
+    
+    Forked worker processes cannot share the registry, so after fork they
+    call forward_to_parent() and send every update over a queue to the
+    parent, which applies it to its own registry and serves the totals.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], List[Any]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._callbacks: Dict[str, Callable[[], float]] = {}
+        self._queue: Optional[Any] = None
+        self._forwarding = False
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    def describe(self, name: str, kind: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None) -> None:
+        """Declare a metric's type ('counter', 'gauge', 'histogram') and help text"""
+        self._help[name] = (kind, help_text)
+        if buckets:
+            self._buckets[name] = tuple(sorted(buckets))
+    
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+    
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increment a counter"""
+        self._record('inc', name, self._labels(labels), value)
+    
+    def add_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Add to a gauge (negative values decrement it)"""
+        self._record('add', name, self._labels(labels), value)
+    
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge"""
+        self._record('set', name, self._labels(labels), value)
+    
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a histogram observation"""
+        self._record('observe', name, self._labels(labels), value)
+    
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observe the duration of the block in seconds, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def gauge_callback(self, name: str, fn: Callable[[], float]) -> None:
+        """Register a gauge evaluated on each scrape (e.g. queue depth)"""
+        self._callbacks[name] = fn
+    
+    def _record(self, op: str, name: str, labels: LabelKey, value: float) -> None:
+        if self._forwarding:
+            try:
+                self._queue.put_nowait((op, name, labels, value))
+            except Exception:
+                pass
+            return
+        self._apply(op, name, labels, value)
+    
+    def _apply(self, op: str, name: str, labels: LabelKey, value: float) -> None:
+        key = (name, labels)
+        with self._lock:
+            if op == 'inc':
+                self._counters[key] = self._counters.get(key, 0) + value
+            elif op == 'add':
+                self._gauges[key] = self._gauges.get(key, 0) + value
+            elif op == 'set':
+                self._gauges[key] = value
+            elif op == 'observe':
+                buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+                state = self._histograms.get(key)
+                if state is None:
+                    state = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+                for i, bound in enumerate(buckets):
+                    if value <= bound:
+                        state[0][i] += 1
+                state[1] += value
+                state[2] += 1
+    
+    def start_collector(self) -> None:
+        """
+        Create the queue forked children forward to and a thread applying
+        their updates. Must run in the parent before forking.
+        """
+        if self._queue is not None:
+            return
+        self._queue = multiprocessing.get_context('fork').Queue()
+        
+        def drain():
+            while True:
+                try:
+                    self._apply(*self._queue.get())
+                except Exception:
+                    time.sleep(0.1)
+        
+        threading.Thread(target=drain, name='metrics-collector', daemon=True).start()
+    
+    def forward_to_parent(self) -> None:
+        """Switch a forked child to forwarding updates to the parent"""
+        # The collector thread may have held the lock at fork time
+        self._lock = threading.Lock()
+        self._counters.clear()
+        self._gauges.clear()
+        self._histograms.clear()
+        self._callbacks.clear()
+        if self._server:
+            self._server.socket.close()
+            self._server = None
+        self._forwarding = self._queue is not None
+    
+    @staticmethod
+    def _format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ''
+        escaped = (
+            f'{k}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for k, v in pairs
+        )
+        return '{' + ','.join(escaped) + '}'
+    
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(float(value))
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        gauges = {}
+        for name, fn in list(self._callbacks.items()):
+            try:
+                gauges[(name, ())] = float(fn())
+            except Exception:
+                pass
+        
+        with self._lock:
+            counters = dict(self._counters)
+            gauges.update(self._gauges)
+            histograms = {key: [list(s[0]), s[1], s[2]] for key, s in self._histograms.items()}
+        
+        by_name: Dict[str, List[str]] = {}
+        
+        def header(name: str, kind: str) -> List[str]:
+            if name not in by_name:
+                help_text = self._help.get(name, (kind, ''))[1]
+                by_name[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            return by_name[name]
+        
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter').append(f"{name}{self._format_labels(labels)} {self._format_value(value)}")
+        
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, 'gauge').append(f"{name}{self._format_labels(labels)} {self._format_value(value)}")
+        
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            lines = header(name, 'histogram')
+            buckets = self._buckets.get(name, DEFAULT_BUCKETS)
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{self._format_labels(labels, ('le', self._format_value(bound)))} {bucket_count}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {self._format_value(total)}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        
+        return '\n'.join(line for lines in by_name.values() for line in lines) + '\n'
+    
+    def serve(self, port: int, host: str = '0.0.0.0') -> None:
+        """Serve render() at /metrics from a background thread"""
+        metrics = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+
+_metrics: Optional[Metrics] = None
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics registry"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
@@ -1,14 +1,45 @@
 import os
 import sys
+import gc
 import time
+import shutil
+import threading
 import subprocess
-from typing import Optional, Dict, Any, List, Tuple, Callable
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterator, Union
+from dataclasses import dataclass, asdict
 import tempfile
+import wave
 
 import cv2
 import numpy as np
 
+from artifact_cache import ArtifactCache
+from metrics import get_metrics
+
+# Bump when face sampling/detection changes so cached analyses are not reused
+FACE_ANALYSIS_VERSION = 'yunet-2023mar-shots-50-boxes'
+
+# Frames sampled across a clip for face analysis without tracking
+FACE_SAMPLES = 50
+
+# Bump when shot detection changes so cached cut lists are not reused
+SHOT_DETECTION_VERSION = 'thumb64-hist16-sad'
+
+# Audio is decoded for ASR and VAD at this rate, mono
+AUDIO_SAMPLE_RATE = 16000
+
+# Chunked renders never split a clip into pieces shorter than this
+MIN_RENDER_CHUNK_SECONDS = 15.0
+
+get_metrics().describe('smartclip_encode_speed', 'histogram', 'FFmpeg speed (media seconds per wall second), by kind',
+                       buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32))
+get_metrics().describe('smartclip_encode_fps', 'histogram', 'FFmpeg frames per second, by kind',
+                       buckets=(5, 10, 20, 30, 60, 120, 240, 480))
+get_metrics().describe('smartclip_ffmpeg_stalls_total', 'counter', 'FFmpeg runs killed by the stall watchdog, by kind')
+
 @dataclass
 class FaceDetection:
     """Detected face with bounding box"""
@@ -25,6 +56,7 @@ class Speaker:
     id: int
     x_position: float  # Normalized 0-1 (0=left, 1=right)
     face_regions: List[Tuple[int, int, int, int]]  # Sample bounding boxes
+    y_position: float = 0.5  # Normalized 0-1 (0=top, 1=bottom)
 
 @dataclass
 class TimelineSegment:
@@ -32,12 +64,20 @@ class TimelineSegment:
     start_frame: int
     end_frame: int
     mode: str  # 'single' or 'split'
-    active_speaker: Optional[int] = None
+    active_speaker: Optional[int] = None  # Face track id, or speaker id when following speech
     crop_x: Optional[int] = None
     crop_y: Optional[int] = None
     crop_w: Optional[int] = None
     crop_h: Optional[int] = None
 
+@dataclass
+class FaceTrack:
+    """Face followed across frames"""
+    id: int
+    frames: List[int]  # Clip-relative frame numbers, ascending
+    boxes: List[Tuple[float, float, float, float]]  # Normalized x, y, w, h per frame
+    confidence: float  # Best detection score
+
 @dataclass
 class ProcessingResult:
     """Result of video processing"""
@@ -50,9 +90,16 @@ class ProcessingResult:
 class YuNetFaceDetector:
     """ONNX-based face detection using YuNet model"""
     
+    backend = 'opencv'
+    # Frames per detect_batch() call the engine should group
+    max_batch = 1
+    
     def __init__(self, models_dir: str):
         self.models_dir = models_dir
         self.detector = None
+        self.input_size = None
+        self.frames_detected = 0
+        self.detect_time_ms = 0.0
         self._load_model()
     
     def _load_model(self):
@@ -83,16 +130,37 @@ class YuNetFaceDetector:
         urllib.request.urlretrieve(url, path)
         print(f"✅ Model downloaded to {path}")
     
+    @property
+    def latency_ms_per_frame(self) -> float:
+        """Average detection time per frame since the detector was loaded"""
+        if not self.frames_detected:
+            return 0.0
+        return self.detect_time_ms / self.frames_detected
+    
+    def set_threads(self, threads: int) -> None:
+        """OpenCV DNN follows cv2.setNumThreads(); nothing to configure"""
+        pass
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[FaceDetection]]:
+        """Detect faces in several frames"""
+        return [self.detect(frame) for frame in frames]
+    
     def detect(self, frame: np.ndarray) -> List[FaceDetection]:
         """Detect faces in a frame"""
         if self.detector is None:
             return []
         
+        started = time.perf_counter()
         h, w = frame.shape[:2]
-        self.detector.setInputSize((w, h))
+        if self.input_size != (w, h):
+            self.detector.setInputSize((w, h))
+            self.input_size = (w, h)
         
         _, faces = self.detector.detect(frame)
         
+        self.frames_detected += 1
+        self.detect_time_ms += (time.perf_counter() - started) * 1000
+        
         if faces is None:
             return []
         
@@ -110,233 +178,1250 @@ class YuNetFaceDetector:
         
         return detections
 
-class SubtitleGenerator:
-    """Generate viral-style ASS subtitles"""
+class OnnxYuNetDetector(YuNetFaceDetector):
+    """
+    Batched YuNet face detection on ONNX Runtime.
     
-    STYLES = {
-        'chris_cinematic': {
-            'font': 'Montserrat Black',
-            'size': 105,
-            'primary': (255, 255, 255),  # White
-            'highlight': (0, 255, 90),   # Green
-            'border': 8,  # Thick border for 3D effect
-            'shadow': 4,  # Strong shadow for 3D depth
-            'shadow_color': (20, 20, 20),  # Dark shadow
-            'shadow_alpha': 200,  # Strong shadow visibility
-            'scale_normal': 90,
-            'scale_highlight': 120,
-            'italic': False,
-            'animation_type': 'scale_color',  # Scale + color change
-        },
-        'clean_pop': {
-            # Clean modern style with italic text and soft shadows
-            # Inspired by viral TikTok/Reels captions
-            'font': 'Outfit',  # Modern, clean sans-serif
-            'size': 95,
-            'primary': (255, 255, 255),  # Pure white
-            'highlight': (255, 255, 255),  # Keep white (brightness boost via scale)
-            'border': 0,  # No outline - clean look
-            'shadow': 8,  # Soft drop shadow for depth
-            'shadow_color': (0, 0, 0),  # Black shadow
-            'shadow_alpha': 80,  # Semi-transparent shadow
-            'scale_normal': 100,
-            'scale_highlight': 115,  # Pop effect on highlight
-            'italic': True,  # Slanted text style
-            'animation_type': 'pop_in',  # Words pop in with scale bounce
-            'blur_edge': True,  # Soft shadow edges
-            'spacing': 2,  # Letter spacing
-        },
-        'minimal_lowercase': {
-            # Ultra-clean minimal style - lowercase text with subtle shadow
-            # Inspired by chris.cinematic podcast captions
-            'font': 'Inter',  # Clean, highly readable sans-serif
-            'size': 85,
-            'primary': (255, 255, 255),  # Pure white
-            'highlight': (255, 255, 255),  # Keep white (no color change)
-            'border': 0,  # No outline - ultra clean
-            'shadow': 4,  # Subtle drop shadow
-            'shadow_color': (0, 0, 0),  # Black shadow
-            'shadow_alpha': 120,  # More visible shadow for dark backgrounds
-            'scale_normal': 100,
-            'scale_highlight': 100,  # No scale change - static text
-            'italic': False,  # Normal upright text
-            'animation_type': 'fade_in',  # Simple fade animation
-            'spacing': 1,  # Slight letter spacing
-            'lowercase': True,  # Keep text lowercase (not uppercase)
-        },
-        'bold_emphasis': {
-            # Bold two-tone style with red highlight - 3D effect
-            # Inspired by chris.cinematic emphasis captions
-            'font': 'Bebas Neue',  # Heavy, impactful display font
-            'size': 110,
-            'primary': (255, 255, 255),  # Pure white
-            'highlight': (255, 50, 50),  # Vibrant red for emphasis
-            'border': 6,  # Border for 3D effect
-            'shadow': 5,  # Strong shadow for 3D depth
-            'shadow_color': (30, 30, 30),  # Dark shadow
-            'shadow_alpha': 180,  # Strong visibility
-            'scale_normal': 100,
-            'scale_highlight': 108,  # Slight punch on highlight
-            'italic': False,  # Bold upright
-            'animation_type': 'punch_return',  # Word turns red then returns to white
-            'spacing': 3,  # Good letter spacing for readability
-            'lowercase': False,  # UPPERCASE for impact
-        },
-        'karaoke_snap': {
-            # Single word display - one word at a time, maximum impact
-            # Inspired by fast-paced TikTok/Reels karaoke captions
-            'font': 'Poppins',  # Clean, geometric sans-serif
-            'size': 130,  # Large for single word impact
-            'primary': (255, 255, 255),  # Pure white
-            'highlight': (255, 255, 255),  # Keep white
-            'border': 0,  # Clean look
-            'shadow': 5,  # Subtle shadow
-            'shadow_color': (0, 0, 0),  # Black shadow
-            'shadow_alpha': 100,  # Moderate visibility
-            'scale_normal': 100,
-            'scale_highlight': 100,  # No scale change after snap
-            'italic': False,  # Bold upright
-            'animation_type': 'snap_in',  # Quick snap appearance
-            'spacing': 4,  # Good letter spacing
-            'lowercase': False,  # UPPERCASE for impact
-            'words_per_display': 1,  # Single word at a time
-            'center_vertical': True,  # Center in frame
-        },
-        'warm_italic': {
-            # Warm italic style with green highlight
-            # Inspired by chris.cinematic premium captions
-            'font': 'Montserrat',  # Clean, versatile sans-serif
-            'size': 100,
-            'primary': (255, 255, 255),  # Pure white
-            'highlight': (0, 230, 120),  # Fresh green highlight
-            'border': 0,  # Clean look - no outline
-            'shadow': 6,  # Good shadow for depth
-            'shadow_color': (30, 30, 30),  # Dark gray shadow
-            'shadow_alpha': 120,  # Visible shadow
-            'scale_normal': 95,
-            'scale_highlight': 105,  # Subtle scale boost on highlight
-            'italic': True,  # Italic/slanted style
-            'animation_type': 'glow_highlight',  # Smooth color glow transition
-            'spacing': 2,  # Slight letter spacing
-            'lowercase': False,  # UPPERCASE for impact
-        }
-    }
+    The model is rewritten to a fixed input size with a symbolic batch
+    dimension so many sampled frames run through one inference call. Frames
+    are scaled to fit the input (never upscaled) and padded at the bottom
+    and right. Produces the same FaceDetection objects as the OpenCV backend.
+    """
     
-    def __init__(self, style_name: str = 'chris_cinematic'):
-        self.style_name = style_name
-        self.style = self.STYLES.get(style_name, self.STYLES['chris_cinematic'])
+    backend = 'onnx'
+    STRIDES = (8, 16, 32)
     
-    def generate(
+    def __init__(
         self,
-        audio_path: str,
-        output_ass_path: str,
-        video_width: int,
-        video_height: int,
-        layout_timeline: Optional[List[Dict]] = None,
-        whisper_model: str = 'base'
-    ) -> str:
-        """
-        Transcribe audio and generate ASS subtitle file
-        """
-        import whisper_timestamped as whisper
-        
-        print(f"🎙️ Transcribing with Whisper ({whisper_model})...")
-        model = whisper.load_model(whisper_model)
-        result = whisper.transcribe(model, audio_path, language="en")
-        
-        # Collect all words with timing
-        words = []
-        for segment in result.get('segments', []):
-            for word in segment.get('words', []):
-                words.append({
-                    'text': word['text'],
-                    'start': word['start'],
-                    'end': word['end']
-                })
+        models_dir: str,
+        input_size: Tuple[int, int] = (640, 384),
+        intra_op_threads: int = 0,
+        max_batch: int = 16,
+        score_threshold: float = 0.6,
+        nms_threshold: float = 0.3,
+        top_k: int = 5000
+    ):
+        # Both sides must be multiples of the largest stride
+        self.input_w, self.input_h = input_size
+        self.intra_op_threads = intra_op_threads
+        self.max_batch = max_batch
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.top_k = top_k
+        self.session = None
+        self._session_pid = None
+        self._model_bytes = None
+        super().__init__(models_dir)
+    
+    def _load_model(self):
+        """Rewrite the YuNet graph for batched input and check it runs"""
+        import onnx
         
-        print(f"   Found {len(words)} words")
+        model_path = os.path.join(self.models_dir, 'face_detection_yunet_2023mar.onnx')
+        if not os.path.exists(model_path):
+            print(f"⚠️ YuNet model not found at {model_path}")
+            print("   Downloading model...")
+            self._download_model(model_path)
         
-        # Generate ASS content
-        ass_content = self._generate_ass(
-            words, 
-            video_width, 
-            video_height,
-            layout_timeline
-        )
+        model = onnx.load(model_path)
+        for graph_input in model.graph.input:
+            dims = graph_input.type.tensor_type.shape.dim
+            dims[0].dim_param = 'batch'
+            dims[2].dim_value = self.input_h
+            dims[3].dim_value = self.input_w
+        # Shapes inferred for the original 640x640 input no longer hold
+        for graph_output in model.graph.output:
+            for dim in graph_output.type.tensor_type.shape.dim:
+                dim.dim_param = 'n'
+        del model.graph.value_info[:]
+        self._model_bytes = model.SerializeToString()
         
-        with open(output_ass_path, 'w', encoding='utf-8') as f:
-            f.write(ass_content)
+        # Verify a batch of 2 comes back intact; otherwise run frame by frame.
+        # A failing single-frame check raises so the caller can fall back.
+        try:
+            self._check_batch(2)
+        except Exception as e:
+            print(f"⚠️ Batched YuNet inference unavailable, using batch size 1: {e}")
+            self.max_batch = 1
+            self._check_batch(1)
         
-        print(f"📄 Generated: {output_ass_path}")
-        return output_ass_path
+        print(f"✅ YuNet face detector loaded (ONNX Runtime, {self.input_w}x{self.input_h}, batch {self.max_batch})")
     
-    def _rgb_to_ass(self, rgb: Tuple[int, int, int], alpha: int = 0) -> str:
-        """Convert RGB to ASS color format (BGR with &H prefix)"""
-        r, g, b = rgb
-        return f"&H{alpha:02X}{b:02X}{g:02X}{r:02X}"
+    def _check_batch(self, batch: int) -> None:
+        outputs = self._infer(np.zeros((batch, 3, self.input_h, self.input_w), dtype=np.float32))
+        anchors = (self.input_h // 8) * (self.input_w // 8)
+        if outputs['cls_8'].size != batch * anchors:
+            raise ValueError(f"unexpected output shape {outputs['cls_8'].shape}")
     
-    def _generate_ass(
-        self,
-        words: List[Dict],
-        video_width: int,
-        video_height: int,
-        layout_timeline: Optional[List[Dict]] = None
-    ) -> str:
-        """Generate ASS subtitle content with style-specific animations"""
-        
-        style = self.style
-        font = style['font']
-        size = style['size']
-        primary_color = self._rgb_to_ass(style['primary'])
-        highlight_color = self._rgb_to_ass(style['highlight'])
-        black = self._rgb_to_ass((0, 0, 0))
-        border = style['border']
-        shadow = style['shadow']
-        scale_normal = style['scale_normal']
-        scale_highlight = style['scale_highlight']
+    def set_threads(self, threads: int) -> None:
+        """Set the intra-op thread count used by inference sessions"""
+        if threads != self.intra_op_threads:
+            self.intra_op_threads = threads
+            self.session = None
+    
+    def _get_session(self):
+        # Inference thread pools do not survive fork; each process builds its own
+        if self.session is None or self._session_pid != os.getpid():
+            import onnxruntime as ort
+            
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.intra_op_threads
+            options.inter_op_num_threads = 1
+            options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            
+            self.session = ort.InferenceSession(
+                self._model_bytes,
+                sess_options=options,
+                providers=['CPUExecutionProvider']
+            )
+            self._session_pid = os.getpid()
+        return self.session
+    
+    def _infer(self, blob: np.ndarray) -> Dict[str, np.ndarray]:
+        session = self._get_session()
+        names = [output.name for output in session.get_outputs()]
+        values = session.run(names, {session.get_inputs()[0].name: blob})
+        return dict(zip(names, values))
+    
+    def detect(self, frame: np.ndarray) -> List[FaceDetection]:
+        """Detect faces in a frame"""
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[FaceDetection]]:
+        """Detect faces in several frames, max_batch frames per inference"""
+        results = []
+        for i in range(0, len(frames), self.max_batch):
+            results.extend(self._detect_batch(frames[i:i + self.max_batch]))
+        return results
+    
+    def _detect_batch(self, frames: List[np.ndarray]) -> List[List[FaceDetection]]:
+        started = time.perf_counter()
         
-        # New style properties with defaults
-        italic = style.get('italic', False)
-        animation_type = style.get('animation_type', 'scale_color')
-        spacing = style.get('spacing', 4)
-        shadow_alpha = style.get('shadow_alpha', 180)
-        use_lowercase = style.get('lowercase', False)  # Keep text lowercase if True
-        words_per_display_config = style.get('words_per_display', 5)  # Words shown at once
-        center_vertical = style.get('center_vertical', False)  # Center in frame
+        blob = np.zeros((len(frames), 3, self.input_h, self.input_w), dtype=np.float32)
+        scales = []
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            scale = min(1.0, self.input_w / w, self.input_h / h)
+            if scale < 1.0:
+                frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+            fh, fw = frame.shape[:2]
+            blob[i, :, :fh, :fw] = frame.transpose(2, 0, 1)
+            scales.append(scale)
         
-        margin_v_single = int(video_height * 0.14)
-        margin_v_split = int(video_height * 0.40)
+        outputs = self._infer(blob)
         
-        # Italic flag for ASS (1 = italic, 0 = normal)
-        italic_flag = 1 if italic else 0
+        results = []
+        for i, frame in enumerate(frames):
+            results.append(self._decode(outputs, i, len(frames), scales[i], frame.shape[1]))
         
-        # Shadow color with alpha
-        shadow_color = self._rgb_to_ass(style.get('shadow_color', (0, 0, 0)), shadow_alpha)
+        self.frames_detected += len(frames)
+        self.detect_time_ms += (time.perf_counter() - started) * 1000
+        return results
+    
+    def _decode(
+        self,
+        outputs: Dict[str, np.ndarray],
+        index: int,
+        batch: int,
+        scale: float,
+        frame_w: int
+    ) -> List[FaceDetection]:
+        """Turn the raw stride outputs of one batch item into detections"""
+        boxes = []
+        scores = []
+        for stride in self.STRIDES:
+            cols = self.input_w // stride
+            cls = outputs[f'cls_{stride}'].reshape(batch, -1)[index]
+            obj = outputs[f'obj_{stride}'].reshape(batch, -1)[index]
+            bbox = outputs[f'bbox_{stride}'].reshape(batch, -1, 4)[index]
+            
+            score = np.sqrt(np.clip(cls, 0, 1) * np.clip(obj, 0, 1))
+            keep = np.nonzero(score >= self.score_threshold)[0]
+            if keep.size == 0:
+                continue
+            
+            rows, columns = np.divmod(keep, cols)
+            cx = (columns + bbox[keep, 0]) * stride
+            cy = (rows + bbox[keep, 1]) * stride
+            w = np.exp(bbox[keep, 2]) * stride
+            h = np.exp(bbox[keep, 3]) * stride
+            boxes.append(np.stack([cx - w / 2, cy - h / 2, w, h], axis=1) / scale)
+            scores.append(score[keep])
         
-        def get_mode_at_time(t: float) -> str:
-            if not layout_timeline:
-                return 'single'
-            for seg in layout_timeline:
-                if seg['start'] <= t <= seg['end']:
-                    return seg.get('mode', 'single')
-            return 'single'
+        if not boxes:
+            return []
         
-        def format_time(seconds: float) -> str:
-            h = int(seconds // 3600)
-            m = int((seconds % 3600) // 60)
-            s = seconds % 60
-            return f"{h}:{m:02d}:{s:05.2f}"
+        boxes = np.concatenate(boxes)
+        scores = np.concatenate(scores)
+        kept = cv2.dnn.NMSBoxes(
+            boxes.tolist(), scores.tolist(),
+            self.score_threshold, self.nms_threshold, top_k=self.top_k
+        )
         
-        def smart_wrap(word_list, max_chars=14):
-            lines = []
-            current_line = []
-            current_length = 0
+        detections = []
+        for k in np.array(kept).flatten():
+            x, y, fw, fh = (int(v) for v in boxes[k])
+            detections.append(FaceDetection(
+                x=x, y=y, w=fw, h=fh,
+                confidence=float(scores[k]),
+                center_x=(x + fw / 2) / frame_w
+            ))
+        return detections
+
+class FrameSampler:
+    """Fetch only the frames needed for analysis from an open capture"""
+    
+    def __init__(self, cap: cv2.VideoCapture, seek_threshold: int = 60):
+        self.cap = cap
+        # Gaps longer than this many frames are crossed with a seek (decode
+        # from the nearest keyframe) instead of grabbing every frame
+        self.seek_threshold = max(1, seek_threshold)
+        self.position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    
+    def sample(self, frame_indices: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (frame_index, frame) for each requested frame, in ascending order"""
+        for frame_idx in sorted(set(frame_indices)):
+            gap = frame_idx - self.position
             
-            for word in word_list:
-                word_len = len(word['text'])
-                if current_length + word_len + (1 if current_line else 0) > max_chars and current_line:
-                    lines.append(current_line)
-                    current_line = [word]
+            if gap < 0 or gap > self.seek_threshold:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+                self.position = frame_idx
+            else:
+                # grab() skips the color conversion and copy of retrieve()
+                while self.position < frame_idx:
+                    if not self.cap.grab():
+                        return
+                    self.position += 1
+            
+            ret, frame = self.cap.read()
+            if not ret:
+                return
+            self.position += 1
+            
+            yield frame_idx, frame
+
+class FaceTracker:
+    """
+    Dense face tracks from sparse detections.
+    
+    The detector runs every detect_interval frames, after scene cuts and
+    when a track is lost. In between, each face box is moved with
+    Lucas-Kanade optical flow on corner features inside it, which costs a
+    small fraction of a detection. Every `step`-th frame is processed, at
+    analysis resolution.
+    """
+    
+    def __init__(
+        self,
+        detector: 'YuNetFaceDetector',
+        detect_interval: int = 30,
+        step: int = 3,
+        analysis_size: Tuple[int, int] = (640, 360),
+        cut_threshold: float = 0.5,
+        iou_threshold: float = 0.3,
+        min_track_frames: int = 3
+    ):
+        self.detector = detector
+        self.detect_interval = max(1, detect_interval)
+        self.step = max(1, step)
+        self.analysis_size = analysis_size
+        self.cut_threshold = cut_threshold
+        self.iou_threshold = iou_threshold
+        self.min_track_frames = min_track_frames
+    
+    def track(
+        self,
+        cap: cv2.VideoCapture,
+        start_frame: int,
+        end_frame: int,
+        report: Optional[Callable[[float], None]] = None,
+        cuts: Optional[List[int]] = None
+    ) -> List[FaceTrack]:
+        """
+        Track faces from start_frame to end_frame of an open capture. Known
+        clip-relative cut frames replace the built-in histogram cut check.
+        """
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        pending_cuts = sorted(cuts) if cuts is not None else None
+        
+        # Active tracks with the flow points inside their last box
+        active: List[Tuple[FaceTrack, np.ndarray]] = []
+        finished: List[FaceTrack] = []
+        next_id = 0
+        
+        prev_gray = None
+        prev_hist = None
+        last_detect = None
+        lost = False
+        frame_number = start_frame
+        
+        while frame_number < end_frame:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            rel = frame_number - start_frame
+            
+            small = cv2.resize(frame, self.analysis_size)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            
+            # Tracks never continue across a scene cut
+            if pending_cuts is not None:
+                # A cut on a skipped frame still ends the tracks
+                cut = False
+                while pending_cuts and pending_cuts[0] <= rel:
+                    cut = pending_cuts.pop(0) > 0 or cut
+                hist = None
+            else:
+                hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+                cv2.normalize(hist, hist)
+                cut = prev_hist is not None and cv2.compareHist(prev_hist, hist, cv2.HISTCMP_CORREL) < self.cut_threshold
+            if cut:
+                finished.extend(track for track, _ in active)
+                active = []
+            
+            # Without faces, look again sooner than the regular interval
+            interval = self.detect_interval if active else max(self.step, self.detect_interval // 4)
+            if cut or lost or last_detect is None or rel - last_detect >= interval:
+                active, ended, next_id = self._detect(active, small, gray, rel, next_id)
+                finished.extend(ended)
+                last_detect = rel
+                lost = False
+            else:
+                active, ended = self._follow(active, prev_gray, gray, rel)
+                finished.extend(ended)
+                lost = bool(ended)
+            
+            prev_gray = gray
+            prev_hist = hist
+            
+            # grab() decodes without the copy and color conversion of read()
+            frame_number += 1
+            for _ in range(self.step - 1):
+                if frame_number >= end_frame or not cap.grab():
+                    frame_number = end_frame
+                    break
+                frame_number += 1
+            
+            if report:
+                report((frame_number - start_frame) / max(1, end_frame - start_frame))
+        
+        finished.extend(track for track, _ in active)
+        tracks = [t for t in finished if len(t.frames) >= self.min_track_frames]
+        return sorted(tracks, key=lambda t: t.id)
+    
+    def _detect(
+        self,
+        active: List[Tuple[FaceTrack, np.ndarray]],
+        small: np.ndarray,
+        gray: np.ndarray,
+        rel: int,
+        next_id: int
+    ) -> Tuple[List[Tuple[FaceTrack, np.ndarray]], List[FaceTrack], int]:
+        """Run the detector and associate detections with active tracks by IoU"""
+        fw, fh = self.analysis_size
+        boxes = [
+            ((d.x / fw, d.y / fh, d.w / fw, d.h / fh), d.confidence)
+            for d in self.detector.detect(small)
+        ]
+        
+        pairs = sorted(
+            (
+                (self._iou(track.boxes[-1], box), t_idx, d_idx)
+                for t_idx, (track, _) in enumerate(active)
+                for d_idx, (box, _) in enumerate(boxes)
+            ),
+            reverse=True
+        )
+        
+        matched_tracks = {}
+        matched_detections = set()
+        for iou, t_idx, d_idx in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t_idx in matched_tracks or d_idx in matched_detections:
+                continue
+            matched_tracks[t_idx] = d_idx
+            matched_detections.add(d_idx)
+        
+        still_active = []
+        ended = []
+        for t_idx, (track, _) in enumerate(active):
+            if t_idx not in matched_tracks:
+                ended.append(track)
+                continue
+            box, confidence = boxes[matched_tracks[t_idx]]
+            track.frames.append(rel)
+            track.boxes.append(box)
+            track.confidence = max(track.confidence, confidence)
+            still_active.append((track, self._features(gray, box)))
+        
+        for d_idx, (box, confidence) in enumerate(boxes):
+            if d_idx in matched_detections:
+                continue
+            track = FaceTrack(id=next_id, frames=[rel], boxes=[box], confidence=confidence)
+            next_id += 1
+            still_active.append((track, self._features(gray, box)))
+        
+        return still_active, ended, next_id
+    
+    def _follow(
+        self,
+        active: List[Tuple[FaceTrack, np.ndarray]],
+        prev_gray: np.ndarray,
+        gray: np.ndarray,
+        rel: int
+    ) -> Tuple[List[Tuple[FaceTrack, np.ndarray]], List[FaceTrack]]:
+        """Move each track's box by the median optical flow of its points"""
+        fw, fh = self.analysis_size
+        still_active = []
+        lost = []
+        
+        for track, points in active:
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(
+                prev_gray, gray, points, None, winSize=(15, 15), maxLevel=2
+            )
+            good = status.flatten() == 1 if moved is not None else np.zeros(len(points), dtype=bool)
+            if good.sum() < max(3, len(points) // 3):
+                lost.append(track)
+                continue
+            
+            dx, dy = np.median((moved[good] - points[good]).reshape(-1, 2), axis=0)
+            x, y, w, h = track.boxes[-1]
+            x += dx / fw
+            y += dy / fh
+            
+            # Mostly out of frame counts as lost
+            if x + w / 2 < 0 or x + w / 2 > 1 or y + h / 2 < 0 or y + h / 2 > 1:
+                lost.append(track)
+                continue
+            
+            track.frames.append(rel)
+            track.boxes.append((float(x), float(y), w, h))
+            still_active.append((track, moved[good].reshape(-1, 1, 2)))
+        
+        return still_active, lost
+    
+    def _features(self, gray: np.ndarray, box: Tuple[float, float, float, float]) -> np.ndarray:
+        """Corner features inside the central part of a face box"""
+        fh, fw = gray.shape[:2]
+        x, y, w, h = box
+        x0 = int(max(0, (x + w * 0.15) * fw))
+        y0 = int(max(0, (y + h * 0.15) * fh))
+        x1 = int(min(fw, (x + w * 0.85) * fw))
+        y1 = int(min(fh, (y + h * 0.85) * fh))
+        
+        mask = np.zeros_like(gray)
+        mask[y0:y1, x0:x1] = 255
+        points = cv2.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01, minDistance=3, mask=mask)
+        
+        if points is None or len(points) < 3:
+            # Flat faces: follow a small grid around the centre instead
+            cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+            dx, dy = (x1 - x0) / 4, (y1 - y0) / 4
+            points = np.array(
+                [[[cx, cy]], [[cx - dx, cy]], [[cx + dx, cy]], [[cx, cy - dy]], [[cx, cy + dy]]]
+            )
+        return points.astype(np.float32)
+    
+    @staticmethod
+    def _iou(a: Tuple[float, float, float, float], b: Tuple[float, float, float, float]) -> float:
+        ix = max(0.0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+        iy = max(0.0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+        inter = ix * iy
+        union = a[2] * a[3] + b[2] * b[3] - inter
+        return inter / union if union > 0 else 0.0
+
+class ShotDetector:
+    """
+    Scene cut detection on a tiny luma stream decoded once by FFmpeg.
+    
+    Every frame is scaled to 64x36 grayscale by the decoder, so a 5-minute
+    clip is a few MB of pixels. A cut is a frame whose mean absolute
+    difference to the previous frame jumps well above the average of the
+    preceding second, backed by a change in the 16-bin luma histogram
+    (or by a much larger jump alone, for cuts between similar-looking
+    cameras). Everything after decoding is vectorized NumPy.
+    """
+    
+    THUMB_W = 64
+    THUMB_H = 36
+    
+    def __init__(self, hist_threshold: float = 0.15, sad_ratio: float = 3.0, min_shot_seconds: float = 0.5):
+        self.hist_threshold = hist_threshold
+        self.sad_ratio = sad_ratio
+        self.min_shot_seconds = min_shot_seconds
+    
+    def detect(
+        self,
+        input_path: str,
+        start_time: float,
+        duration: float,
+        fps: float,
+        runner: Optional['FFmpegRunner'] = None
+    ) -> List[int]:
+        """Clip-relative frame numbers where a new shot starts"""
+        cmd = [
+            'ffmpeg', '-v', 'error',
+            '-ss', str(start_time),
+            '-t', str(duration),
+            '-i', input_path,
+            '-an',
+            '-vf', f"scale={self.THUMB_W}:{self.THUMB_H}:flags=fast_bilinear,format=gray",
+            '-f', 'rawvideo',
+            '-pix_fmt', 'gray',
+            'pipe:1'
+        ]
+        chunks = []
+        returncode, stderr = (runner or FFmpegRunner()).run(cmd, duration, on_stdout=chunks.append, kind='shots')
+        if returncode != 0:
+            print(f"⚠️ Shot detection failed: {stderr[-300:]}")
+            return []
+        
+        data = b''.join(chunks)
+        pixels = self.THUMB_W * self.THUMB_H
+        count = len(data) // pixels
+        frames = np.frombuffer(data, dtype=np.uint8)[:count * pixels].reshape(count, pixels)
+        return self.cuts(frames, fps)
+    
+    def cuts(self, frames: np.ndarray, fps: float) -> List[int]:
+        """Cut positions in an (N, pixels) uint8 luma array"""
+        count, pixels = frames.shape
+        if count < 2:
+            return []
+        
+        quantized = frames >> 4
+        hist = np.stack([(quantized == b).sum(axis=1) for b in range(16)], axis=1) / pixels
+        hist_diff = 0.5 * np.abs(np.diff(hist, axis=0)).sum(axis=1)
+        sad = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=1)
+        
+        # Mean SAD over the preceding second
+        window = max(1, int(round(fps)))
+        csum = np.concatenate(([0.0], np.cumsum(sad)))
+        idx = np.arange(len(sad))
+        lo = np.maximum(0, idx - window)
+        recent = (csum[idx] - csum[lo]) / np.maximum(1, idx - lo)
+        
+        jump = sad > self.sad_ratio * recent + 8
+        big_jump = sad > 2 * self.sad_ratio * recent + 16
+        candidates = np.flatnonzero(jump & ((hist_diff > self.hist_threshold) | big_jump)) + 1
+        
+        min_gap = max(1, int(self.min_shot_seconds * fps))
+        cuts = []
+        for frame in candidates.tolist():
+            if frame < min_gap or count - frame < min_gap:
+                continue
+            if cuts and frame - cuts[-1] < min_gap:
+                continue
+            cuts.append(frame)
+        return cuts
+
+class VoiceActivityDetector:
+    """
+    Energy-based voice activity detection on 16 kHz mono PCM.
+    
+    20 ms frames well above an adaptive noise floor are speech; short
+    pauses are closed and short blips dropped. Long regions whose energy
+    envelope stays flat are treated as music beds: speech dips between
+    syllables, sustained music does not.
+    """
+    
+    def __init__(
+        self,
+        frame_ms: int = 20,
+        threshold_db: float = 10.0,
+        min_speech_ms: int = 300,
+        min_gap_ms: int = 300,
+        min_envelope_std_db: float = 4.0
+    ):
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.min_speech_ms = min_speech_ms
+        self.min_gap_ms = min_gap_ms
+        self.min_envelope_std_db = min_envelope_std_db
+    
+    @staticmethod
+    def read_pcm(audio_path: str) -> Tuple[np.ndarray, int]:
+        """Load 16-bit mono PCM WAV samples as float32 in [-1, 1]"""
+        with wave.open(audio_path, 'rb') as wav:
+            sample_rate = wav.getframerate()
+            data = wav.readframes(wav.getnframes())
+        return np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0, sample_rate
+    
+    def utterances(self, samples: np.ndarray, sample_rate: int) -> List[Dict]:
+        """
+        Speech regions as {'start', 'end', 'peaks'} dicts in seconds; peaks
+        are the times of the loudest frames, loudest first.
+        """
+        hop = int(sample_rate * self.frame_ms / 1000)
+        frames = len(samples) // hop
+        if frames == 0:
+            return []
+        
+        energy_db = 10 * np.log10(np.mean(samples[:frames * hop].reshape(frames, hop) ** 2, axis=1) + 1e-10)
+        
+        # Speech is well above the noise floor and not near-silence
+        noise_floor = np.percentile(energy_db, 10)
+        speech = (energy_db > noise_floor + self.threshold_db) & (energy_db > -50)
+        
+        # Close short pauses, then drop short blips
+        gap = self.min_gap_ms // self.frame_ms
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        
+        regions = []
+        for start, end in zip(starts, ends):
+            if regions and start - regions[-1][1] <= gap:
+                regions[-1][1] = end
+            else:
+                regions.append([start, end])
+        
+        min_frames = self.min_speech_ms // self.frame_ms
+        music_frames = 2000 // self.frame_ms
+        frame_s = self.frame_ms / 1000
+        utterances = []
+        for start, end in regions:
+            if end - start < min_frames:
+                continue
+            if end - start >= music_frames and np.std(energy_db[start:end]) < self.min_envelope_std_db:
+                continue
+            loudest = start + np.argsort(-energy_db[start:end])[:5]
+            utterances.append({
+                'start': start * frame_s,
+                'end': end * frame_s,
+                'peaks': [float((i + 0.5) * frame_s) for i in loudest]
+            })
+        return utterances
+
+class ActiveSpeakerDetector:
+    """
+    Who is talking, from audio energy and mouth motion.
+    
+    Utterances come from the VoiceActivityDetector over the 16 kHz PCM
+    already extracted for Whisper. Each utterance is probed at its loudest
+    moments: a frame pair a couple of frames apart is decoded and, per
+    speaker, the motion in the mouth region (minus the motion of the upper
+    face, to cancel head movement) is measured. The speaker whose mouth
+    moves most is active. Decoding a few dozen frame pairs keeps this cheap.
+    """
+    
+    def __init__(self, max_probes: int = 60):
+        self.max_probes = max_probes
+    
+    def assign(
+        self,
+        input_path: str,
+        utterances: List[Dict],
+        speakers: List[Speaker],
+        start_time: float,
+        fps: float
+    ) -> List[Optional[int]]:
+        """Active speaker id per utterance, None where no mouth clearly moves"""
+        if len(speakers) < 2 or not utterances:
+            return [None] * len(utterances)
+        
+        # Spread the probe budget over utterances, loudest moments first
+        per_utterance = max(1, self.max_probes // len(utterances))
+        probes = {}
+        for index, utterance in enumerate(utterances):
+            for t in utterance['peaks'][:per_utterance]:
+                probes.setdefault(int((start_time + t) * fps), []).append(index)
+        
+        lag = max(1, int(round(fps / 15)))  # ~66 ms between the pair
+        wanted = sorted({f for frame in probes for f in (frame, frame + lag)})
+        
+        cap = cv2.VideoCapture(input_path)
+        try:
+            gray = {
+                index: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                for index, frame in FrameSampler(cap, seek_threshold=int(fps)).sample(wanted)
+            }
+        finally:
+            cap.release()
+        
+        scores = np.zeros((len(utterances), len(speakers)))
+        counts = np.zeros(len(utterances))
+        for frame, owners in probes.items():
+            if frame not in gray or frame + lag not in gray:
+                continue
+            diff = cv2.absdiff(gray[frame], gray[frame + lag]).astype(np.float32)
+            motion = np.array([self._mouth_motion(diff, speaker) for speaker in speakers])
+            for index in owners:
+                scores[index] += motion
+                counts[index] += 1
+        
+        assignments = []
+        for index in range(len(utterances)):
+            if not counts[index]:
+                assignments.append(None)
+                continue
+            ranked = np.sort(scores[index])[::-1]
+            best = int(np.argmax(scores[index]))
+            # Require a clear winner; crosstalk or stillness keeps the layout
+            if ranked[0] / counts[index] > 1.0 and ranked[0] > 1.3 * ranked[1]:
+                assignments.append(speakers[best].id)
+            else:
+                assignments.append(None)
+        return assignments
+    
+    @staticmethod
+    def _mouth_motion(diff: np.ndarray, speaker: Speaker) -> float:
+        """Mean frame difference in the mouth region minus the upper face"""
+        height, width = diff.shape[:2]
+        if speaker.face_regions:
+            face_w = int(np.median([r[2] for r in speaker.face_regions]))
+            face_h = int(np.median([r[3] for r in speaker.face_regions]))
+        else:
+            face_w, face_h = width // 8, height // 4
+        
+        cx = int(speaker.x_position * width)
+        cy = int(speaker.y_position * height)
+        x0, x1 = max(0, cx - face_w // 3), min(width, cx + face_w // 3)
+        mouth = diff[max(0, cy + face_h // 8):min(height, cy + face_h // 2), x0:x1]
+        upper = diff[max(0, cy - face_h // 2):max(0, cy - face_h // 8), x0:x1]
+        
+        if mouth.size == 0:
+            return 0.0
+        head = float(upper.mean()) if upper.size else 0.0
+        return max(0.0, float(mouth.mean()) - head)
+
+# Approximate resident size of Whisper weights, used for the pool memory budget
+WHISPER_MODEL_SIZES_MB = {
+    'tiny': 75,
+    'base': 145,
+    'small': 485,
+    'medium': 1530,
+    'large': 3090,
+}
+
+class AsrBackend(ABC):
+    """
+    Speech recognizer producing {'text', 'start', 'end'} word dicts.
+    
+    Audio is a file path or 16 kHz mono float32 samples.
+    """
+    
+    name = 'base'
+    
+    @abstractmethod
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = 'en') -> List[Dict]:
+        """Word dicts with times in seconds from the start of the audio"""
+
+class WhisperTimestampedBackend(AsrBackend):
+    """OpenAI Whisper on PyTorch with whisper_timestamped word alignment"""
+    
+    name = 'whisper-timestamped'
+    
+    def __init__(self, model_name: str):
+        import whisper_timestamped as whisper
+        
+        print(f"📦 Loading Whisper model ({model_name})...")
+        self.model_name = model_name
+        self.model = whisper.load_model(model_name)
+    
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = 'en') -> List[Dict]:
+        import whisper_timestamped as whisper
+        
+        result = whisper.transcribe(self.model, audio, language=language)
+        
+        # Collect all words with timing
+        words = []
+        for segment in result.get('segments', []):
+            for word in segment.get('words', []):
+                words.append({
+                    'text': word['text'],
+                    'start': word['start'],
+                    'end': word['end']
+                })
+        return words
+
+class FasterWhisperBackend(AsrBackend):
+    """
+    Whisper on CTranslate2 (faster-whisper) with int8 weights on CPU.
+    
+    CTranslate2 thread pools do not survive fork, so a forked process
+    loads its own copy of the model on first use.
+    """
+    
+    name = 'faster-whisper'
+    
+    def __init__(self, model_name: str, cpu_threads: int = 0, compute_type: str = 'int8'):
+        self.model_name = model_name
+        self.cpu_threads = cpu_threads
+        self.compute_type = compute_type
+        self.model = None
+        self._model_pid = None
+        self._load()
+    
+    def _load(self) -> None:
+        from faster_whisper import WhisperModel
+        
+        print(f"📦 Loading faster-whisper model ({self.model_name}, {self.compute_type})...")
+        self.model = WhisperModel(
+            self.model_name,
+            device='cpu',
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads
+        )
+        self._model_pid = os.getpid()
+    
+    def set_threads(self, threads: int) -> None:
+        """Use a different CPU thread count from the next transcription on"""
+        if threads != self.cpu_threads:
+            self.cpu_threads = threads
+            self._model_pid = None
+    
+    def transcribe(self, audio: Union[str, np.ndarray], language: str = 'en') -> List[Dict]:
+        if self._model_pid != os.getpid():
+            self._load()
+        
+        segments, _ = self.model.transcribe(audio, language=language, word_timestamps=True)
+        
+        words = []
+        for segment in segments:
+            for word in segment.words or []:
+                words.append({
+                    'text': word.word,
+                    'start': word.start,
+                    'end': word.end
+                })
+        return words
+
+def parse_asr_model(whisper_model: str) -> Tuple[str, str]:
+    """
+    Split a job's whisper_model into (backend, model name):
+    'base' -> whisper-timestamped, 'faster-whisper:small' -> faster-whisper.
+    """
+    backend, sep, model_name = whisper_model.partition(':')
+    if sep and backend in ('faster-whisper', 'whisper-timestamped'):
+        return backend, model_name
+    return 'whisper-timestamped', whisper_model
+
+class ModelPool:
+    """
+    Process-level registry that keeps models resident across jobs.
+    
+    Models are keyed by (kind, name) and evicted least-recently-used once
+    their estimated size exceeds the memory budget.
+    """
+    
+    def __init__(self, budget_mb: int = 2048, asr_threads: int = 0):
+        self.budget_mb = budget_mb
+        # CPU threads for CTranslate2 ASR models (0 = library default)
+        self.asr_threads = asr_threads
+        self._models: 'OrderedDict[Tuple[str, str], Tuple[Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+    
+    def get(self, kind: str, name: str, loader: Callable[[], Any], size_mb: int) -> Any:
+        """Return a resident model, loading it on first use"""
+        key = (kind, name)
+        
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        
+        # Only one caller loads a given model; others wait for it
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+            
+            model = loader()
+            
+            with self._lock:
+                self._models[key] = (model, size_mb)
+                self._evict(keep=key)
+        
+        return model
+    
+    def resident_mb(self) -> int:
+        """Estimated size of all resident models"""
+        return sum(size for _, size in self._models.values())
+    
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """Drop least recently used models until within budget"""
+        evicted = False
+        while self.resident_mb() > self.budget_mb:
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            _, size = self._models.pop(oldest)
+            evicted = True
+            print(f"♻️ Evicted {oldest[0]} model '{oldest[1]}' ({size} MB)")
+        
+        if evicted:
+            gc.collect()
+    
+    def face_detector(self, models_dir: str, backend: str = 'onnx') -> 'YuNetFaceDetector':
+        """
+        Resident YuNet detector for a models directory. The 'onnx' backend
+        falls back to OpenCV DNN when ONNX Runtime cannot load the model.
+        """
+        def load():
+            if backend == 'onnx':
+                try:
+                    return OnnxYuNetDetector(models_dir)
+                except Exception as e:
+                    print(f"⚠️ ONNX Runtime face detector unavailable, using OpenCV: {e}")
+                    get_metrics().inc('smartclip_fallbacks_total', kind='opencv_face_detector')
+            return YuNetFaceDetector(models_dir)
+        
+        return self.get(
+            'yunet',
+            f"{backend}:{os.path.abspath(models_dir)}",
+            load,
+            size_mb=1
+        )
+    
+    def asr(self, whisper_model: str) -> AsrBackend:
+        """Resident ASR backend for a job's whisper_model setting"""
+        backend, model_name = parse_asr_model(whisper_model)
+        base_name = model_name.split('.')[0].split('-')[0]
+        size_mb = WHISPER_MODEL_SIZES_MB.get(base_name, 500)
+        
+        if backend == 'faster-whisper':
+            model = self.get(
+                'faster-whisper',
+                model_name,
+                lambda: FasterWhisperBackend(model_name, cpu_threads=self.asr_threads),
+                # int8 weights are about a quarter of the fp32 size
+                size_mb=max(1, size_mb // 4)
+            )
+            model.set_threads(self.asr_threads)
+            return model
+        
+        return self.get(
+            'whisper',
+            model_name,
+            lambda: WhisperTimestampedBackend(model_name),
+            size_mb=size_mb
+        )
+
+_model_pool = None
+
+def get_model_pool() -> ModelPool:
+    """Get or create the process-wide model pool"""
+    global _model_pool
+    if _model_pool is None:
+        _model_pool = ModelPool(
+            budget_mb=int(os.environ.get('MODEL_POOL_BUDGET_MB', '2048')),
+            asr_threads=int(os.environ.get('ASR_CPU_THREADS', '0'))
+        )
+    return _model_pool
+
+class SubtitleGenerator:
+    """Generate viral-style ASS subtitles"""
+    
+    STYLES = {
+        'chris_cinematic': {
+            'font': 'Montserrat Black',
+            'size': 105,
+            'primary': (255, 255, 255),  # White
+            'highlight': (0, 255, 90),   # Green
+            'border': 8,  # Thick border for 3D effect
+            'shadow': 4,  # Strong shadow for 3D depth
+            'shadow_color': (20, 20, 20),  # Dark shadow
+            'shadow_alpha': 200,  # Strong shadow visibility
+            'scale_normal': 90,
+            'scale_highlight': 120,
+            'italic': False,
+            'animation_type': 'scale_color',  # Scale + color change
+        },
+        'clean_pop': {
+            # Clean modern style with italic text and soft shadows
+            # Inspired by viral TikTok/Reels captions
+            'font': 'Outfit',  # Modern, clean sans-serif
+            'size': 95,
+            'primary': (255, 255, 255),  # Pure white
+            'highlight': (255, 255, 255),  # Keep white (brightness boost via scale)
+            'border': 0,  # No outline - clean look
+            'shadow': 8,  # Soft drop shadow for depth
+            'shadow_color': (0, 0, 0),  # Black shadow
+            'shadow_alpha': 80,  # Semi-transparent shadow
+            'scale_normal': 100,
+            'scale_highlight': 115,  # Pop effect on highlight
+            'italic': True,  # Slanted text style
+            'animation_type': 'pop_in',  # Words pop in with scale bounce
+            'blur_edge': True,  # Soft shadow edges
+            'spacing': 2,  # Letter spacing
+        },
+        'minimal_lowercase': {
+            # Ultra-clean minimal style - lowercase text with subtle shadow
+            # Inspired by chris.cinematic podcast captions
+            'font': 'Inter',  # Clean, highly readable sans-serif
+            'size': 85,
+            'primary': (255, 255, 255),  # Pure white
+            'highlight': (255, 255, 255),  # Keep white (no color change)
+            'border': 0,  # No outline - ultra clean
+            'shadow': 4,  # Subtle drop shadow
+            'shadow_color': (0, 0, 0),  # Black shadow
+            'shadow_alpha': 120,  # More visible shadow for dark backgrounds
+            'scale_normal': 100,
+            'scale_highlight': 100,  # No scale change - static text
+            'italic': False,  # Normal upright text
+            'animation_type': 'fade_in',  # Simple fade animation
+            'spacing': 1,  # Slight letter spacing
+            'lowercase': True,  # Keep text lowercase (not uppercase)
+        },
+        'bold_emphasis': {
+            # Bold two-tone style with red highlight - 3D effect
+            # Inspired by chris.cinematic emphasis captions
+            'font': 'Bebas Neue',  # Heavy, impactful display font
+            'size': 110,
+            'primary': (255, 255, 255),  # Pure white
+            'highlight': (255, 50, 50),  # Vibrant red for emphasis
+            'border': 6,  # Border for 3D effect
+            'shadow': 5,  # Strong shadow for 3D depth
+            'shadow_color': (30, 30, 30),  # Dark shadow
+            'shadow_alpha': 180,  # Strong visibility
+            'scale_normal': 100,
+            'scale_highlight': 108,  # Slight punch on highlight
+            'italic': False,  # Bold upright
+            'animation_type': 'punch_return',  # Word turns red then returns to white
+            'spacing': 3,  # Good letter spacing for readability
+            'lowercase': False,  # UPPERCASE for impact
+        },
+        'karaoke_snap': {
+            # Single word display - one word at a time, maximum impact
+            # Inspired by fast-paced TikTok/Reels karaoke captions
+            'font': 'Poppins',  # Clean, geometric sans-serif
+            'size': 130,  # Large for single word impact
+            'primary': (255, 255, 255),  # Pure white
+            'highlight': (255, 255, 255),  # Keep white
+            'border': 0,  # Clean look
+            'shadow': 5,  # Subtle shadow
+            'shadow_color': (0, 0, 0),  # Black shadow
+            'shadow_alpha': 100,  # Moderate visibility
+            'scale_normal': 100,
+            'scale_highlight': 100,  # No scale change after snap
+            'italic': False,  # Bold upright
+            'animation_type': 'snap_in',  # Quick snap appearance
+            'spacing': 4,  # Good letter spacing
+            'lowercase': False,  # UPPERCASE for impact
+            'words_per_display': 1,  # Single word at a time
+            'center_vertical': True,  # Center in frame
+        },
+        'warm_italic': {
+            # Warm italic style with green highlight
+            # Inspired by chris.cinematic premium captions
+            'font': 'Montserrat',  # Clean, versatile sans-serif
+            'size': 100,
+            'primary': (255, 255, 255),  # Pure white
+            'highlight': (0, 230, 120),  # Fresh green highlight
+            'border': 0,  # Clean look - no outline
+            'shadow': 6,  # Good shadow for depth
+            'shadow_color': (30, 30, 30),  # Dark gray shadow
+            'shadow_alpha': 120,  # Visible shadow
+            'scale_normal': 95,
+            'scale_highlight': 105,  # Subtle scale boost on highlight
+            'italic': True,  # Italic/slanted style
+            'animation_type': 'glow_highlight',  # Smooth color glow transition
+            'spacing': 2,  # Slight letter spacing
+            'lowercase': False,  # UPPERCASE for impact
+        }
+    }
+    
+    def __init__(self, style_name: str = 'chris_cinematic'):
+        self.style_name = style_name
+        self.style = self.STYLES.get(style_name, self.STYLES['chris_cinematic'])
+    
+    def generate(
+        self,
+        audio_path: str,
+        output_ass_path: str,
+        video_width: int,
+        video_height: int,
+        layout_timeline: Optional[List[Dict]] = None,
+        whisper_model: str = 'base'
+    ) -> str:
+        """
+        Transcribe audio and generate ASS subtitle file
+        """
+        words = self.transcribe(audio_path, whisper_model)
+        return self.write_ass(words, output_ass_path, video_width, video_height, layout_timeline)
+    
+    def transcribe(
+        self,
+        audio: Union[str, np.ndarray],
+        whisper_model: str = 'base',
+        vad_gating: bool = False
+    ) -> List[Dict]:
+        """
+        Transcribe audio (a WAV path or 16 kHz mono float32 samples) into a
+        list of {'text', 'start', 'end'} words.
+        
+        whisper_model picks the backend as well as the model, e.g. 'base'
+        (whisper_timestamped) or 'faster-whisper:base' (int8 CTranslate2).
+        With vad_gating only detected speech is transcribed.
+        """
+        backend = get_model_pool().asr(whisper_model)
+        print(f"🎙️ Transcribing with {backend.name} ({backend.model_name})...")
+        
+        if vad_gating:
+            if isinstance(audio, str):
+                audio, _ = VoiceActivityDetector.read_pcm(audio)
+            words = self._transcribe_speech(backend, audio)
+        else:
+            words = backend.transcribe(audio, language="en")
+        
+        print(f"   Found {len(words)} words")
+        return words
+    
+    def _transcribe_speech(
+        self,
+        backend: AsrBackend,
+        samples: np.ndarray,
+        pad: float = 0.2,
+        join_gap: float = 1.0,
+        separator: float = 0.3
+    ) -> List[Dict]:
+        """
+        Transcribe only the speech regions, concatenated into one shorter
+        recording with short silences between them, and map the word
+        timestamps back onto the clip timeline.
+        """
+        vad = VoiceActivityDetector()
+        sample_rate = AUDIO_SAMPLE_RATE
+        total = len(samples) / sample_rate
+        
+        # Padded regions; close gaps too short to be worth skipping
+        regions = []
+        for utterance in vad.utterances(samples, sample_rate):
+            start = max(0.0, utterance['start'] - pad)
+            end = min(total, utterance['end'] + pad)
+            if regions and start - regions[-1][1] <= join_gap:
+                regions[-1][1] = end
+            else:
+                regions.append([start, end])
+        
+        speech = sum(end - start for start, end in regions)
+        if not regions:
+            print("   No speech detected, skipping transcription")
+            return []
+        if speech > 0.9 * total:
+            return backend.transcribe(samples, language="en")
+        
+        print(f"   Transcribing {speech:.1f}s of speech out of {total:.1f}s")
+        
+        gap = np.zeros(int(separator * sample_rate), dtype=np.float32)
+        pieces = []
+        offsets = []  # (start in gated audio, start in clip, end in clip)
+        position = 0.0
+        for start, end in regions:
+            piece = samples[int(start * sample_rate):int(end * sample_rate)]
+            offsets.append((position, start, end))
+            pieces.extend([piece, gap])
+            position += (len(piece) + len(gap)) / sample_rate
+        
+        words = backend.transcribe(np.concatenate(pieces), language="en")
+        
+        gated_starts = np.array([o[0] for o in offsets])
+        
+        def to_clip(t: float) -> float:
+            index = max(0, int(np.searchsorted(gated_starts, t, side='right')) - 1)
+            gated_start, clip_start, clip_end = offsets[index]
+            # Times inside a separator belong to the end of the region
+            return min(clip_start + (t - gated_start), clip_end)
+        
+        for word in words:
+            word['start'] = to_clip(word['start'])
+            word['end'] = max(word['start'], to_clip(word['end']))
+        return words
+    
+    def write_ass(
+        self,
+        words: List[Dict],
+        output_ass_path: str,
+        video_width: int,
+        video_height: int,
+        layout_timeline: Optional[List[Dict]] = None
+    ) -> str:
+        """Generate the ASS subtitle file for transcribed words"""
+        ass_content = self._generate_ass(
+            words, 
+            video_width, 
+            video_height,
+            layout_timeline
+        )
+        
+        with open(output_ass_path, 'w', encoding='utf-8') as f:
+            f.write(ass_content)
+        
+        print(f"📄 Generated: {output_ass_path}")
+        return output_ass_path
+    
+    def _rgb_to_ass(self, rgb: Tuple[int, int, int], alpha: int = 0) -> str:
+        """Convert RGB to ASS color format (BGR with &H prefix)"""
+        r, g, b = rgb
+        return f"&H{alpha:02X}{b:02X}{g:02X}{r:02X}"
+    
+    def _generate_ass(
+        self,
+        words: List[Dict],
+        video_width: int,
+        video_height: int,
+        layout_timeline: Optional[List[Dict]] = None
+    ) -> str:
+        """Generate ASS subtitle content with style-specific animations"""
+        
+        style = self.style
+        font = style['font']
+        size = style['size']
+        primary_color = self._rgb_to_ass(style['primary'])
+        highlight_color = self._rgb_to_ass(style['highlight'])
+        black = self._rgb_to_ass((0, 0, 0))
+        border = style['border']
+        shadow = style['shadow']
+        scale_normal = style['scale_normal']
+        scale_highlight = style['scale_highlight']
+        
+        # New style properties with defaults
+        italic = style.get('italic', False)
+        animation_type = style.get('animation_type', 'scale_color')
+        spacing = style.get('spacing', 4)
+        shadow_alpha = style.get('shadow_alpha', 180)
+        use_lowercase = style.get('lowercase', False)  # Keep text lowercase if True
+        words_per_display_config = style.get('words_per_display', 5)  # Words shown at once
+        center_vertical = style.get('center_vertical', False)  # Center in frame
+        
+        margin_v_single = int(video_height * 0.14)
+        margin_v_split = int(video_height * 0.40)
+        
+        # Italic flag for ASS (1 = italic, 0 = normal)
+        italic_flag = 1 if italic else 0
+        
+        # Shadow color with alpha
+        shadow_color = self._rgb_to_ass(style.get('shadow_color', (0, 0, 0)), shadow_alpha)
+        
+        def get_mode_at_time(t: float) -> str:
+            if not layout_timeline:
+                return 'single'
+            for seg in layout_timeline:
+                if seg['start'] <= t <= seg['end']:
+                    return seg.get('mode', 'single')
+            return 'single'
+        
+        def format_time(seconds: float) -> str:
+            h = int(seconds // 3600)
+            m = int((seconds % 3600) // 60)
+            s = seconds % 60
+            return f"{h}:{m:02d}:{s:05.2f}"
+        
+        def smart_wrap(word_list, max_chars=14):
+            lines = []
+            current_line = []
+            current_length = 0
+            
+            for word in word_list:
+                word_len = len(word['text'])
+                if current_length + word_len + (1 if current_line else 0) > max_chars and current_line:
+                    lines.append(current_line)
+                    current_line = [word]
                     current_length = word_len
                 else:
                     current_line.append(word)
@@ -510,306 +1595,1582 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
                 
                 line_texts.append(" ".join(word_parts))
             
-            stacked_text = "\\N".join(line_texts)
+            stacked_text = "\\N".join(line_texts)
+            
+            start_str = format_time(chunk_start)
+            end_str = format_time(chunk_end)
+            
+            ass_content += f"Dialogue: 0,{start_str},{end_str},{style_name},,0,0,0,,{stacked_text}\n"
+        
+        return ass_content
+
+def probe_start_time(source: str, timeout: float = 60) -> Optional[float]:
+    """Container start_time of `source` in seconds, via ffprobe; None on failure"""
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-show_entries', 'format=start_time',
+        '-of', 'csv=p=0',
+        source
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    try:
+        return float(result.stdout.strip().rstrip(','))
+    except ValueError:
+        # N/A: the container has no start time, timestamps begin at 0
+        return 0.0
+
+def probe_keyframes(source: str, start_time: float, end_time: float, timeout: float = 60) -> Optional[List[float]]:
+    """
+    Video keyframe times between start_time and end_time, via ffprobe;
+    None on failure.
+    
+    Times are relative to the start of the file, like -ss. ffprobe reports
+    absolute pts and -read_intervals takes absolute times (e.g. MPEG-TS
+    starts at 1.4s or more), so the container start_time is added to the
+    interval and subtracted from the keyframes.
+    """
+    offset = probe_start_time(source, timeout)
+    if offset is None:
+        return None
+    
+    cmd = [
+        'ffprobe', '-v', 'error',
+        '-select_streams', 'v:0',
+        '-skip_frame', 'nokey',
+        '-show_entries', 'frame=best_effort_timestamp_time',
+        '-of', 'csv=p=0',
+        '-read_intervals', f"{offset + start_time}%{offset + end_time}",
+        source
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    if result.returncode != 0:
+        return None
+    
+    keyframes = []
+    for line in result.stdout.splitlines():
+        try:
+            keyframes.append(float(line.strip().rstrip(',')) - offset)
+        except ValueError:
+            continue
+    return [t for t in keyframes if start_time <= t <= end_time]
+
+class StageCancelled(Exception):
+    """Work stopped because another stage of the same job failed"""
+
+class FFmpegStalled(Exception):
+    """An encode was killed by the stall watchdog; retrying the same input won't help"""
+
+class FFmpegRunner:
+    """
+    Run FFmpeg with machine-readable progress (-progress) and a stall watchdog.
+    
+    Progress goes to stdout, or to stderr when stdout carries media, and
+    each progress block reports out_time / duration to on_progress. A run
+    whose output advances less than min_speed x realtime over a
+    stall_seconds window is killed; time spent blocked in on_stdout (e.g.
+    waiting for upload slots) does not count towards the window. Every
+    run's fps and speed are kept in `stats` and recorded as metrics.
+    
+    Setting `cancel` kills running processes and makes further runs raise
+    StageCancelled; StageGraph sets it when a stage fails.
+    """
+    
+    PROGRESS_KEYS = ('frame', 'fps', 'out_time_us', 'out_time_ms', 'speed', 'progress')
+    
+    def __init__(self, stall_seconds: float = 120.0, min_speed: float = 0.05):
+        self.stall_seconds = stall_seconds
+        self.min_speed = min_speed
+        self.stats: List[Dict[str, Any]] = []
+        self.cancel = threading.Event()
+        self._local = threading.local()
+    
+    def run(
+        self,
+        cmd: List[str],
+        duration: Optional[float] = None,
+        on_progress: Optional[Callable[[float], None]] = None,
+        on_stdout: Optional[Callable[[bytes], None]] = None,
+        kind: str = 'encode'
+    ) -> Tuple[int, str]:
+        """
+        Run cmd (starting with 'ffmpeg'), passing stdout chunks to on_stdout
+        when given. Returns the exit code and the tail of stderr.
+        """
+        if self.cancel.is_set():
+            raise StageCancelled(f"FFmpeg {kind} cancelled")
+        
+        progress_target = 'pipe:2' if on_stdout else 'pipe:1'
+        cmd = [cmd[0], '-progress', progress_target, '-nostats'] + cmd[1:]
+        
+        state = {'out_time': 0.0, 'frame': 0, 'fps': 0.0, 'speed': 0.0}
+        # Seconds spent inside on_stdout, and when the current call started
+        blocked = {'total': 0.0, 'since': None}
+        stderr_tail: deque = deque(maxlen=200)
+        done = threading.Event()
+        stalled = [False]
+        cancelled = [False]
+        
+        def parse(line: str) -> bool:
+            """Apply a progress line; False if it is not one"""
+            key, sep, value = line.partition('=')
+            if not sep or key not in self.PROGRESS_KEYS:
+                return False
+            value = value.strip()
+            try:
+                if key in ('out_time_us', 'out_time_ms'):
+                    state['out_time'] = int(value) / 1_000_000
+                elif key == 'frame':
+                    state['frame'] = int(value)
+                elif key == 'fps':
+                    state['fps'] = float(value)
+                elif key == 'speed':
+                    state['speed'] = float(value.rstrip('x'))
+                elif key == 'progress' and on_progress and duration:
+                    on_progress(1.0 if value == 'end' else min(1.0, state['out_time'] / duration))
+            except ValueError:
+                # N/A before the first frame
+                pass
+            return True
+        
+        started = time.time()
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        
+        def read_stderr():
+            for raw in iter(process.stderr.readline, b''):
+                line = raw.decode('utf-8', errors='replace').rstrip()
+                if on_stdout and parse(line):
+                    continue
+                stderr_tail.append(line)
+        
+        def kill():
+            try:
+                process.kill()
+            except OSError:
+                pass
+        
+        def blocked_seconds(now: float) -> float:
+            since = blocked['since']
+            return blocked['total'] + (now - since if since is not None else 0.0)
+        
+        def watchdog():
+            window_start, window_out_time, window_blocked = time.time(), 0.0, 0.0
+            while not done.wait(0.5):
+                if self.cancel.is_set():
+                    cancelled[0] = True
+                    kill()
+                    return
+                now = time.time()
+                # FFmpeg can't make progress while its output isn't consumed
+                active = (now - window_start) - (blocked_seconds(now) - window_blocked)
+                if self.stall_seconds <= 0 or active < self.stall_seconds:
+                    continue
+                if state['out_time'] - window_out_time < self.min_speed * active:
+                    stalled[0] = True
+                    kill()
+                    return
+                window_start, window_out_time, window_blocked = now, state['out_time'], blocked_seconds(now)
+        
+        stderr_reader = threading.Thread(target=read_stderr, daemon=True)
+        stderr_reader.start()
+        threading.Thread(target=watchdog, daemon=True).start()
+        
+        try:
+            if on_stdout:
+                while True:
+                    chunk = process.stdout.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    blocked['since'] = time.time()
+                    try:
+                        on_stdout(chunk)
+                    finally:
+                        blocked['total'] += time.time() - blocked['since']
+                        blocked['since'] = None
+            else:
+                for raw in iter(process.stdout.readline, b''):
+                    parse(raw.decode('utf-8', errors='replace').strip())
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            done.set()
+        
+        process.wait()
+        stderr_reader.join()
+        if cancelled[0]:
+            raise StageCancelled(f"FFmpeg {kind} cancelled")
+        self._local.stalled = stalled[0]
+        
+        wall = time.time() - started
+        fps = state['fps'] or (state['frame'] / wall if wall > 0 else 0.0)
+        speed = state['speed'] or (state['out_time'] / wall if wall > 0 else 0.0)
+        self.stats.append({
+            'kind': kind,
+            'media_seconds': round(state['out_time'], 3),
+            'wall_seconds': round(wall, 3),
+            'fps': round(fps, 1),
+            'speed': round(speed, 2),
+            'stalled': stalled[0]
+        })
+        
+        metrics = get_metrics()
+        if stalled[0]:
+            metrics.inc('smartclip_ffmpeg_stalls_total', kind=kind)
+            stderr_tail.append(
+                f"Killed: output advanced less than {self.min_speed}x realtime for {self.stall_seconds:.0f}s "
+                f"(at {state['out_time']:.1f}s)"
+            )
+        elif process.returncode == 0 and state['out_time'] > 0:
+            metrics.observe('smartclip_encode_speed', speed, kind=kind)
+            if state['frame']:
+                metrics.observe('smartclip_encode_fps', fps, kind=kind)
+        
+        return process.returncode, '\n'.join(stderr_tail)
+    
+    def last_stalled(self) -> bool:
+        """Whether the calling thread's last run was killed by the stall watchdog"""
+        return getattr(self._local, 'stalled', False)
+
+class StageGraph:
+    """
+    Run named stages as a dependency graph on a thread pool.
+    
+    A stage starts as soon as all of its dependencies have finished and
+    receives their results as keyword arguments named after them, so
+    independent branches (e.g. face analysis and transcription) overlap.
+    
+    When a stage fails, stages not started yet are dropped and `cancel` is
+    set so running ones can stop early (FFmpegRunner kills its process);
+    run() re-raises only once no stage is running any more.
+    """
+    
+    def __init__(self, max_workers: int = 3, cancel: Optional[threading.Event] = None):
+        self.max_workers = max_workers
+        self.cancel = cancel or threading.Event()
+        self.stages: 'OrderedDict[str, Tuple[Callable[..., Any], List[str]]]' = OrderedDict()
+        self.timings_ms: Dict[str, int] = {}
+    
+    def add(self, name: str, fn: Callable[..., Any], deps: Optional[List[str]] = None) -> None:
+        """Register a stage; dependencies must already be registered"""
+        deps = deps or []
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (fn, deps)
+    
+    def _run_stage(self, name: str, fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        stage_start = time.time()
+        try:
+            return fn(**kwargs)
+        finally:
+            self.timings_ms[name] = int((time.time() - stage_start) * 1000)
+    
+    def run(self) -> Dict[str, Any]:
+        """Run all stages and return their results by name"""
+        results: Dict[str, Any] = {}
+        pending = OrderedDict(self.stages)
+        running: Dict[Future, str] = {}
+        self.cancel.clear()
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                for name, (fn, deps) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        kwargs = {dep: results[dep] for dep in deps}
+                        running[executor.submit(self._run_stage, name, fn, kwargs)] = name
+                        del pending[name]
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+        except BaseException:
+            # Callers clean up the stages' files once this returns, so
+            # stop what can be stopped and wait for the rest
+            self.cancel.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        
+        executor.shutdown(wait=True)
+        return results
+
+class SmartClipEngine:
+    """
+    Main video processing engine
+    """
+    
+    def __init__(
+        self,
+        models_dir: str = './models',
+        temp_dir: str = './temp',
+        output_dir: str = './output',
+        artifact_cache: Optional[ArtifactCache] = None,
+        render_chunks: int = 1,
+        face_backend: str = 'onnx',
+        face_tracking: bool = False,
+        active_speaker: bool = False,
+        vad_gating: bool = True,
+        ffmpeg_stall_seconds: float = 120.0,
+        ffmpeg_min_speed: float = 0.05,
+        cpu_threads: Optional[int] = None
+    ):
+        self.models_dir = models_dir
+        self.temp_dir = temp_dir
+        self.output_dir = output_dir
+        self.artifact_cache = artifact_cache
+        # >1 encodes long clips as that many chunks in parallel FFmpeg processes
+        self.render_chunks = render_chunks
+        # Detect-then-track faces on every few frames instead of ~50 samples
+        self.face_tracking = face_tracking
+        # Follow whoever is talking instead of split screen
+        self.active_speaker = active_speaker
+        # Transcribe only detected speech, skipping silence and music beds
+        self.vad_gating = vad_gating
+        # Kills FFmpeg runs that stop making progress; keeps per-run fps/speed
+        self.ffmpeg = FFmpegRunner(ffmpeg_stall_seconds, ffmpeg_min_speed)
+        # Cores this engine may use; a worker running several jobs passes its share
+        self.cpu_threads = cpu_threads or os.cpu_count() or 1
+        
+        os.makedirs(models_dir, exist_ok=True)
+        os.makedirs(temp_dir, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        # Shared across engines in this process so models load once per worker
+        self.face_detector = get_model_pool().face_detector(models_dir, face_backend)
+        self.subtitle_gen = SubtitleGenerator()
+    
+    def process(
+        self,
+        input_path: str,
+        output_path: str,
+        start_time: float = 0,
+        end_time: float = 300,
+        subtitle_style: Optional[str] = 'chris_cinematic',
+        whisper_model: str = 'base',
+        progress_callback: Optional[Callable[[float, str], None]] = None,
+        single_pass: bool = True,
+        source_id: Optional[str] = None,
+        output_sink: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Process a video clip
+        
+        Stages run as a dependency graph: Whisper starts on the input audio
+        while faces are analyzed. With single_pass (default) the layout
+        filter graph and the subtitle burn-in share one libx264 encode.
+        Otherwise the clip is rendered while transcription runs and
+        subtitles are burned in with a second encode.
+        
+        When the engine has an artifact cache and a stable source_id is
+        given, the shot list, face analysis and transcript are cached. The
+        un-subtitled render only exists, and is only cached, in two-pass
+        mode or without subtitles; there a style-only change regenerates
+        just the ASS and burn-in.
+        
+        With an output_sink (an object with write(bytes) and reset()), the
+        final encode streams fragmented MP4 into the sink instead of writing
+        output_path, e.g. to upload parts while encoding continues.
+        """
+        # Each call works in its own directory so concurrent jobs sharing a
+        # temp_dir never collide on intermediate file names
+        work_dir = tempfile.mkdtemp(prefix='smartclip_', dir=self.temp_dir)
+        
+        try:
+            result = self._process(
+                work_dir=work_dir,
+                input_path=input_path,
+                output_path=output_path,
+                start_time=start_time,
+                end_time=end_time,
+                subtitle_style=subtitle_style,
+                whisper_model=whisper_model,
+                progress_callback=progress_callback,
+                single_pass=single_pass,
+                source_id=source_id,
+                output_sink=output_sink
+            )
+            
+            # Keep the subtitle file next to the output
+            if result['subtitle_path']:
+                subtitle_path = os.path.splitext(output_path)[0] + '.ass'
+                shutil.move(result['subtitle_path'], subtitle_path)
+                result['subtitle_path'] = subtitle_path
+            
+            return result
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def _process(
+        self,
+        work_dir: str,
+        input_path: str,
+        output_path: str,
+        start_time: float,
+        end_time: float,
+        subtitle_style: Optional[str],
+        whisper_model: str,
+        progress_callback: Optional[Callable[[float, str], None]],
+        single_pass: bool,
+        source_id: Optional[str] = None,
+        output_sink: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """Run the processing pipeline with intermediates in work_dir"""
+        start_timestamp = time.time()
+        
+        # Stages report from several threads; keep the reported progress monotonic
+        report_lock = threading.Lock()
+        last_progress = [0.0]
+        
+        def report(progress: float, message: str):
+            with report_lock:
+                progress = max(progress, last_progress[0])
+                last_progress[0] = progress
+                print(f"   [{int(progress*100):3d}%] {message}")
+                if progress_callback:
+                    progress_callback(progress, message)
+        
+        def encode_progress(low: float, high: float, message: str) -> Callable[[float], None]:
+            """Map an encode's completed fraction onto [low, high], reporting each whole percent once"""
+            last_percent = [-1]
+            
+            def on_progress(fraction: float):
+                percent = int((low + (high - low) * fraction) * 100)
+                if percent > last_percent[0]:
+                    last_percent[0] = percent
+                    report(percent / 100, f"{message} ({int(fraction * 100)}%)")
+            return on_progress
+        
+        report(0.0, "Loading video...")
+        
+        # Open video
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            raise Exception(f"Cannot open video: {input_path}")
+        
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        
+        start_frame = int(start_time * fps)
+        end_frame = min(int(end_time * fps), total_frames)
+        clip_frames = end_frame - start_frame
+        duration = end_time - start_time
+        
+        report(0.05, f"Clip: {start_time:.1f}s - {end_time:.1f}s ({clip_frames} frames)")
+        
+        temp_video = os.path.join(work_dir, 'temp_clip.mp4')
+        ass_path = os.path.join(work_dir, 'subtitles.ass') if subtitle_style else None
+        if subtitle_style:
+            self.subtitle_gen = SubtitleGenerator(subtitle_style)
+        
+        # Artifacts are only cached for sources with a stable identity
+        cache = self.artifact_cache if source_id else None
+        clip_params = {'source': source_id, 'start': start_time, 'end': end_time}
+        cached_faces = None
+        cached_words = None
+        if cache:
+            faces_key = ArtifactCache.make_key(
+                'faces',
+                analysis=FACE_ANALYSIS_VERSION,
+                backend=self.face_detector.backend,
+                tracking=self.face_tracking,
+                **clip_params
+            )
+            words_key = ArtifactCache.make_key(
+                'words',
+                whisper_model=whisper_model,
+                vad_gating=self.vad_gating,
+                **clip_params
+            )
+            cached_faces = cache.get_json(faces_key)
+            if subtitle_style:
+                cached_words = cache.get_json(words_key)
+        
+        shots_key = ArtifactCache.make_key('shots', detection=SHOT_DETECTION_VERSION, **clip_params)
+        
+        def render_key(layout):
+            return ArtifactCache.make_key('render', layout=layout['filter_complex'], **clip_params)
+        
+        # Face analysis branch
+        def detect_shots():
+            if cache:
+                cached_cuts = cache.get_json(shots_key)
+                if cached_cuts is not None:
+                    return cached_cuts
+            
+            started = time.perf_counter()
+            cuts = ShotDetector().detect(input_path, start_time, duration, fps, self.ffmpeg)
+            report(0.08, f"Found {len(cuts)} shot cut(s) in {time.perf_counter() - started:.1f}s")
+            
+            if cache:
+                cache.put_json(shots_key, cuts)
+            return cuts
+        
+        def analyze_faces(shots):
+            if cached_faces is not None:
+                cap.release()
+                report(0.3, "Using cached face analysis")
+                return cached_faces
+            
+            report(0.1, "Analyzing faces...")
+            try:
+                if self.face_tracking:
+                    faces = [asdict(t) for t in self._track_faces(cap, start_frame, end_frame, fps, report, shots)]
+                else:
+                    plan = self._face_sample_plan(clip_frames, shots)
+                    faces = self._analyze_faces(cap, start_frame, end_frame, fps, report, plan)
+            finally:
+                cap.release()
+            
+            if cache:
+                cache.put_json(faces_key, faces)
+            return faces
+        
+        def plan_layout(faces, shots, speech=None):
+            report(0.3, "Identifying speakers...")
+            tracks = None
+            if self.face_tracking:
+                tracks = [FaceTrack(**t) for t in faces]
+                detections = self._detections_from_tracks(tracks)
+            else:
+                detections = self._detection_array(faces)
+            
+            speakers = self._identify_speakers(detections, width, height)
+            
+            report(0.4, "Generating crop timeline...")
+            if tracks is not None:
+                timeline = self._timeline_from_tracks(tracks, clip_frames, fps, width, height, cuts=shots)
+            else:
+                # Each sample stands for its span of the shot; within a shot a
+                # layout switch needs about three samples to agree
+                plan = self._face_sample_plan(clip_frames, shots)
+                timeline = self._timeline_from_tracks(
+                    self._tracks_from_samples(faces, plan),
+                    clip_frames, fps, width, height,
+                    min_segment_seconds=3 * self._face_sample_interval(clip_frames) / fps,
+                    cuts=shots
+                )
+            
+            # Split segments need at least two speakers to show
+            if len(speakers) < 2:
+                for segment in timeline:
+                    segment.mode = 'single'
+            elif speech:
+                assignments = ActiveSpeakerDetector().assign(input_path, speech, speakers, start_time, fps)
+                timeline = self._follow_active_speaker(timeline, speech, assignments, speakers, clip_frames, fps, width)
+            timeline = self._merge_segments(timeline)
+            
+            layout_mode = 'split' if any(seg.mode == 'split' for seg in timeline) else 'single'
+            report(0.35, f"Detected {len(speakers)} speaker(s), mode: {layout_mode}, {len(timeline)} segment(s)")
+            
+            return {
+                'speakers': speakers,
+                'layout_mode': layout_mode,
+                'timeline': timeline,
+                'filter_complex': self._timeline_filter(timeline, speakers, fps, width, height)
+            }
+        
+        # Transcription branch: only needs the source audio
+        def extract_audio():
+            return self._load_audio(input_path, start_time, duration)
+        
+        def transcribe(audio):
+            report(0.1, "Transcribing audio...")
+            words = self.subtitle_gen.transcribe(audio, whisper_model, self.vad_gating)
+            
+            if cache:
+                cache.put_json(words_key, words)
+            return words
+        
+        def detect_speech(audio):
+            utterances = VoiceActivityDetector().utterances(audio, AUDIO_SAMPLE_RATE)
+            report(0.2, f"Found {len(utterances)} utterance(s)")
+            return utterances
+        
+        def write_subtitles(words, layout):
+            report(0.6, "Generating subtitles...")
+            # Subtitle timeline should be relative to 0 (the render starts at 0)
+            subtitle_timeline = [{
+                'start': segment.start_frame / fps,
+                'end': segment.end_frame / fps,
+                'mode': segment.mode
+            } for segment in layout['timeline']] or [{
+                'start': 0,
+                'end': duration,
+                'mode': layout['layout_mode']
+            }]
+            return self.subtitle_gen.write_ass(words, ass_path, 1080, 1920, subtitle_timeline)
+        
+        # Render branch
+        def render_with_subtitles(layout, subtitles):
+            # Single pass: layout and subtitle burn-in in one encode. There is
+            # no un-subtitled render to cache, so the render cache is not used
+            report(0.65, "Rendering video with subtitles...")
+            self._render(
+                input_path, output_path, start_time, duration,
+                layout['filter_complex'], subtitles, output_sink,
+                encode_progress(0.65, 0.95, "Rendering video with subtitles")
+            )
+        
+        def render(layout):
+            # Without subtitles this is the final encode
+            is_final = not subtitle_style
+            
+            if is_final and output_sink and not cache:
+                report(0.45, "Rendering video...")
+                self._render(
+                    input_path, None, start_time, duration,
+                    layout['filter_complex'], output_sink=output_sink,
+                    on_progress=encode_progress(0.45, 0.6, "Rendering video")
+                )
+                report(0.6, "Video rendered")
+                return None
+            
+            target = output_path if is_final and not output_sink else temp_video
+            
+            if cache and cache.fetch_file(render_key(layout), target):
+                report(0.6, "Using cached render")
+            else:
+                report(0.45, "Rendering video...")
+                self._render(
+                    input_path, target, start_time, duration, layout['filter_complex'],
+                    on_progress=encode_progress(0.45, 0.6, "Rendering video")
+                )
+                report(0.6, "Video rendered")
+                
+                if cache:
+                    cache.put_file(render_key(layout), target)
+            
+            if is_final and output_sink:
+                self._stream_file(target, output_sink)
+                os.remove(target)
+            return target
+        
+        def burn(render, subtitles):
+            report(0.8, "Burning subtitles...")
+            self._burn_subtitles(
+                render, subtitles, output_path, output_sink,
+                duration, encode_progress(0.8, 0.95, "Burning subtitles")
+            )
+            os.remove(render)
+        
+        graph = StageGraph(cancel=self.ffmpeg.cancel)
+        graph.add('shots', detect_shots)
+        graph.add('faces', analyze_faces, deps=['shots'])
+        
+        needs_audio = self.active_speaker or (subtitle_style and cached_words is None)
+        if needs_audio:
+            graph.add('audio', extract_audio)
+        
+        if self.active_speaker:
+            # Speech detection is quick; layout waits for it and the faces
+            graph.add('speech', detect_speech, deps=['audio'])
+            graph.add('layout', plan_layout, deps=['faces', 'shots', 'speech'])
+        else:
+            graph.add('layout', plan_layout, deps=['faces', 'shots'])
+        
+        if subtitle_style:
+            if cached_words is not None:
+                graph.add('words', lambda: cached_words)
+            else:
+                graph.add('words', transcribe, deps=['audio'])
+            graph.add('subtitles', write_subtitles, deps=['words', 'layout'])
+            
+            if single_pass:
+                graph.add('render', render_with_subtitles, deps=['layout', 'subtitles'])
+            else:
+                # Base render overlaps transcription, burn-in waits for both
+                graph.add('render', render, deps=['layout'])
+                graph.add('burn', burn, deps=['render', 'subtitles'])
+        else:
+            graph.add('render', render, deps=['layout'])
+        
+        try:
+            results = graph.run()
+        finally:
+            # Face analysis releases the capture, but never runs if an earlier
+            # stage failed; no stage is running once run() returns or raises
+            cap.release()
+        layout = results['layout']
+        
+        report(1.0, "Complete!")
+        
+        processing_time = int((time.time() - start_timestamp) * 1000)
+        
+        return {
+            'output_path': output_path,
+            'speakers_detected': len(layout['speakers']),
+            'layout_mode': layout['layout_mode'],
+            'timeline': [asdict(segment) for segment in layout['timeline']],
+            'processing_time_ms': processing_time,
+            'subtitle_path': ass_path,
+            'stage_timings_ms': graph.timings_ms,
+            'ffmpeg_runs': self.ffmpeg.stats
+        }
+    
+    def _analyze_faces(
+        self,
+        cap: cv2.VideoCapture,
+        start_frame: int,
+        end_frame: int,
+        fps: float,
+        report: Callable[[float, str], None],
+        plan: List[Tuple[int, int, int]]
+    ) -> List[Dict]:
+        """Detect faces on the frames of a sample plan (see _face_sample_plan)"""
+        clip_frames = end_frame - start_frame
+        
+        face_detections = []
+        sample_frames = [start_frame + frame for frame, _, _ in plan]
+        
+        # Only the sampled frames are decoded, so analysis time scales
+        # with the number of samples rather than the clip length
+        sampler = FrameSampler(cap, seek_threshold=int(fps * 2))
+        detector = self.face_detector
+        detected_before = (detector.frames_detected, detector.detect_time_ms)
+        
+        batch_numbers = []
+        batch_frames = []
+        scanned = 0
+        
+        def flush():
+            for frame_number, faces in zip(batch_numbers, detector.detect_batch(batch_frames)):
+                for face in faces:
+                    face_detections.append({
+                        'frame': frame_number - start_frame,
+                        'center_x': face.center_x,
+                        'confidence': face.confidence,
+                        # Box normalized to the analysis frame
+                        'x': face.x / 640,
+                        'y': face.y / 360,
+                        'w': face.w / 640,
+                        'h': face.h / 360
+                    })
+            batch_numbers.clear()
+            batch_frames.clear()
+        
+        for frame_number, frame in sampler.sample(sample_frames):
+            # Resize for faster detection
+            batch_numbers.append(frame_number)
+            batch_frames.append(cv2.resize(frame, (640, 360)))
+            if len(batch_frames) >= detector.max_batch:
+                flush()
+            
+            scanned += 1
+            if scanned % 10 == 0:
+                report(
+                    0.1 + 0.2 * (scanned / len(sample_frames)),
+                    f"Scanning frame {frame_number - start_frame}/{clip_frames}"
+                )
+        flush()
+        
+        frames = detector.frames_detected - detected_before[0]
+        if frames:
+            latency = (detector.detect_time_ms - detected_before[1]) / frames
+            print(f"   Face detection ({detector.backend}, batch {detector.max_batch}): {latency:.1f} ms/frame")
+        
+        return face_detections
+    
+    def _track_faces(
+        self,
+        cap: cv2.VideoCapture,
+        start_frame: int,
+        end_frame: int,
+        fps: float,
+        report: Callable[[float, str], None],
+        cuts: Optional[List[int]] = None
+    ) -> List[FaceTrack]:
+        """Dense face tracks: detection once a second, optical flow in between"""
+        step = max(1, int(round(fps / 10)))  # ~10 tracked frames per second
+        tracker = FaceTracker(
+            self.face_detector,
+            detect_interval=max(step, int(round(fps))),
+            step=step
+        )
+        
+        reported = [0]
+        
+        def progress(fraction: float) -> None:
+            # Report in 10% steps rather than on every tracked frame
+            decile = int(fraction * 10)
+            if decile > reported[0]:
+                reported[0] = decile
+                report(0.1 + 0.2 * fraction, f"Tracking faces ({decile * 10}%)")
+        
+        detected_before = self.face_detector.frames_detected
+        tracks = tracker.track(cap, start_frame, end_frame, progress, cuts)
+        detections = self.face_detector.frames_detected - detected_before
+        print(f"   Tracked {len(tracks)} face track(s) with {detections} detector calls")
+        return tracks
+    
+    def _face_sample_interval(self, clip_frames: int) -> int:
+        return max(1, clip_frames // FACE_SAMPLES)
+    
+    def _face_sample_plan(self, clip_frames: int, cuts: List[int]) -> List[Tuple[int, int, int]]:
+        """
+        Spread FACE_SAMPLES samples over the shots in proportion to their
+        length, at least one per shot. Each entry is (frame, span_start,
+        span_end): the sample frame sits in the middle of the span of the
+        shot it stands for.
+        """
+        if clip_frames <= 0:
+            return []
+        
+        bounds = [0, *[c for c in cuts if 0 < c < clip_frames], clip_frames]
+        plan = []
+        for shot_start, shot_end in zip(bounds, bounds[1:]):
+            count = max(1, int(round(FACE_SAMPLES * (shot_end - shot_start) / clip_frames)))
+            edges = np.linspace(shot_start, shot_end, count + 1).astype(np.int64)
+            for span_start, span_end in zip(edges[:-1].tolist(), edges[1:].tolist()):
+                if span_end > span_start:
+                    plan.append(((span_start + span_end) // 2, span_start, span_end))
+        return plan
+    
+    def _tracks_from_samples(self, face_detections: List[Dict], plan: List[Tuple[int, int, int]]) -> List[FaceTrack]:
+        """Treat each sampled detection as a face visible over its sample's span"""
+        spans = {frame: (span_start, span_end) for frame, span_start, span_end in plan}
+        tracks = []
+        for i, d in enumerate(face_detections):
+            box = (d['x'], d['y'], d['w'], d['h'])
+            span_start, span_end = spans.get(d['frame'], (d['frame'], d['frame'] + 1))
+            tracks.append(FaceTrack(id=i, frames=[span_start, span_end - 1], boxes=[box, box], confidence=d['confidence']))
+        return tracks
+    
+    def _follow_active_speaker(
+        self,
+        timeline: List[TimelineSegment],
+        utterances: List[Dict],
+        assignments: List[Optional[int]],
+        speakers: List[Speaker],
+        clip_frames: int,
+        fps: float,
+        width: int,
+        min_segment_seconds: float = 1.0
+    ) -> List[TimelineSegment]:
+        """
+        Replace split segments with single crops on the active speaker.
+        
+        The last active speaker is held through pauses and unclear speech;
+        speaker turns shorter than min_segment_seconds are absorbed by the
+        previous turn.
+        """
+        labels = np.full(clip_frames, -1, dtype=np.int64)
+        for utterance, speaker_id in zip(utterances, assignments):
+            if speaker_id is not None:
+                labels[int(utterance['start'] * fps):int(utterance['end'] * fps)] = speaker_id
+        
+        known = labels >= 0
+        if not known.any():
+            return timeline
+        
+        # Forward-fill, then back-fill the start of the clip
+        filled = np.maximum.accumulate(np.where(known, np.arange(clip_frames), 0))
+        labels = labels[filled]
+        first = int(np.argmax(known))
+        labels[:first] = labels[first]
+        
+        by_id = {speaker.id: speaker for speaker in speakers}
+        min_frames = int(min_segment_seconds * fps)
+        
+        result = []
+        for segment in timeline:
+            if segment.mode != 'split':
+                result.append(segment)
+                continue
             
-            start_str = format_time(chunk_start)
-            end_str = format_time(chunk_end)
+            run_labels = labels[segment.start_frame:segment.end_frame]
+            changes = np.flatnonzero(np.diff(run_labels)) + 1
+            bounds = [0, *changes.tolist(), len(run_labels)]
             
-            ass_content += f"Dialogue: 0,{start_str},{end_str},{style_name},,0,0,0,,{stacked_text}\n"
+            turns = []
+            for a, b in zip(bounds, bounds[1:]):
+                if turns and b - a < min_frames:
+                    turns[-1][1] = b
+                else:
+                    turns.append([a, b, int(run_labels[a])])
+            
+            for a, b, speaker_id in turns:
+                speaker = by_id[speaker_id]
+                crop_x = int(speaker.x_position * width - segment.crop_w / 2)
+                result.append(TimelineSegment(
+                    start_frame=segment.start_frame + a,
+                    end_frame=segment.start_frame + b,
+                    mode='single',
+                    active_speaker=speaker_id,
+                    crop_x=max(0, min(crop_x, width - segment.crop_w)),
+                    crop_y=segment.crop_y,
+                    crop_w=segment.crop_w,
+                    crop_h=segment.crop_h
+                ))
         
-        return ass_content
-
-class SmartClipEngine:
-    """
-    Main video processing engine
-    """
+        return result
     
-    def __init__(
+    def _merge_segments(self, timeline: List[TimelineSegment]) -> List[TimelineSegment]:
+        """Join neighbouring segments with the same mode and crop"""
+        merged = []
+        for segment in timeline:
+            previous = merged[-1] if merged else None
+            if previous and (previous.mode, previous.crop_x, previous.crop_y) == (segment.mode, segment.crop_x, segment.crop_y):
+                previous.end_frame = segment.end_frame
+            else:
+                merged.append(segment)
+        return merged
+    
+    def _detections_from_tracks(self, tracks: List[FaceTrack]) -> np.ndarray:
+        """Flatten tracks into an (N, 5) frame, x, y, w, h detection array"""
+        if not tracks:
+            return np.zeros((0, 5))
+        return np.concatenate([
+            np.column_stack([np.asarray(track.frames, dtype=np.float64), np.asarray(track.boxes, dtype=np.float64)])
+            for track in tracks
+        ])
+    
+    def _detection_array(self, face_detections: List[Dict]) -> np.ndarray:
+        """Sampled detection dicts as an (N, 5) frame, x, y, w, h array"""
+        return np.array(
+            [[d['frame'], d['x'], d['y'], d['w'], d['h']] for d in face_detections],
+            dtype=np.float64
+        ).reshape(-1, 5)
+    
+    def _timeline_from_tracks(
         self,
-        models_dir: str = './models',
-        temp_dir: str = './temp',
-        output_dir: str = './output'
-    ):
-        self.models_dir = models_dir
-        self.temp_dir = temp_dir
-        self.output_dir = output_dir
+        tracks: List[FaceTrack],
+        clip_frames: int,
+        fps: float,
+        width: int,
+        height: int,
+        min_segment_seconds: float = 2.0,
+        cuts: Optional[List[int]] = None
+    ) -> List[TimelineSegment]:
+        """
+        Turn face tracks into layout segments: 'split' while two or more
+        faces are on screen, otherwise 'single'. Every segment gets a 9:16
+        crop on its most visible face, used whenever it is shown single.
+        Segments shorter than min_segment_seconds are merged into the
+        previous one so the layout does not flicker, except across shot
+        cuts: every cut starts a new segment.
+        """
+        if clip_frames <= 0:
+            return []
         
-        os.makedirs(models_dir, exist_ok=True)
-        os.makedirs(temp_dir, exist_ok=True)
-        os.makedirs(output_dir, exist_ok=True)
+        frames = np.arange(clip_frames)
+        visible = np.zeros((len(tracks), clip_frames), dtype=bool)
+        centers = np.full((len(tracks), clip_frames), 0.5)
+        for i, track in enumerate(tracks):
+            first, last = track.frames[0], min(track.frames[-1], clip_frames - 1)
+            visible[i, first:last + 1] = True
+            track_centers = [x + w / 2 for x, _, w, _ in track.boxes]
+            centers[i] = np.interp(frames, track.frames, track_centers)
         
-        self.face_detector = YuNetFaceDetector(models_dir)
-        self.subtitle_gen = SubtitleGenerator()
+        split = visible.sum(axis=0) >= 2
+        
+        # Run-length encode the per-frame mode, breaking at every cut
+        cut_set = {c for c in (cuts or []) if 0 < c < clip_frames}
+        changes = set((np.flatnonzero(np.diff(split.astype(np.int8))) + 1).tolist()) | cut_set
+        bounds = [0, *sorted(changes), clip_frames]
+        runs = [[a, b, bool(split[a])] for a, b in zip(bounds, bounds[1:])]
+        
+        min_frames = int(min_segment_seconds * fps)
+        merged = []
+        for run in runs:
+            if merged and run[0] not in cut_set and (run[1] - run[0] < min_frames or run[2] == merged[-1][2]):
+                merged[-1][1] = run[1]
+            else:
+                merged.append(run)
+        if len(merged) > 1 and merged[0][1] - merged[0][0] < min_frames and merged[1][0] not in cut_set:
+            merged[1][0] = merged[0][0]
+            merged.pop(0)
+        
+        # 9:16 crop window, as in the single speaker layout
+        if width / height > 9 / 16:
+            crop_w, crop_h = int(height * 9 / 16), height
+        else:
+            crop_w, crop_h = width, int(width * 16 / 9)
+        
+        segments = []
+        for start, end, is_split in merged:
+            segment = TimelineSegment(
+                start_frame=start, end_frame=end, mode='split' if is_split else 'single',
+                crop_y=(height - crop_h) // 2, crop_w=crop_w, crop_h=crop_h
+            )
+            coverage = visible[:, start:end].sum(axis=1) if len(tracks) else np.array([])
+            if coverage.size and coverage.max() > 0:
+                best = int(np.argmax(coverage))
+                center = float(np.median(centers[best, start:end][visible[best, start:end]]))
+                if not is_split:
+                    segment.active_speaker = tracks[best].id
+            else:
+                center = 0.5
+            segment.crop_x = int(max(0, min(center * width - crop_w / 2, width - crop_w)))
+            segments.append(segment)
+        
+        return segments
     
-    def process(
+    def _identify_speakers(
         self,
-        input_path: str,
-        output_path: str,
-        start_time: float = 0,
-        end_time: float = 300,
-        subtitle_style: Optional[str] = 'chris_cinematic',
-        whisper_model: str = 'base',
-        progress_callback: Optional[Callable[[float, str], None]] = None
-    ) -> Dict[str, Any]:
+        detections: np.ndarray,
+        width: int,
+        height: int,
+        max_speakers: int = 3,
+        min_presence: float = 0.15
+    ) -> List[Speaker]:
         """
-        Process a video clip
+        Cluster face detections into speakers.
+        
+        detections is an (N, 5) array of frame, x, y, w, h (normalized).
+        Peaks of the smoothed histogram of face centres seed a 1-D k-means,
+        so the number of speakers follows the data. A cluster counts as a
+        speaker only if it has a face in at least min_presence of the
+        frames with faces, which drops passers-by and false positives.
         """
-        start_timestamp = time.time()
+        if len(detections) == 0:
+            return []
         
-        def report(progress: float, message: str):
-            print(f"   [{int(progress*100):3d}%] {message}")
-            if progress_callback:
-                progress_callback(progress, message)
+        started = time.perf_counter()
+        frames = detections[:, 0].astype(np.int64)
+        cx = detections[:, 1] + detections[:, 3] / 2
         
-        report(0.0, "Loading video...")
+        bins = 128
+        hist = np.bincount(np.clip((cx * bins).astype(np.int64), 0, bins - 1), minlength=bins).astype(np.float64)
+        kernel = np.exp(-0.5 * (np.arange(-6, 7) / 2.0) ** 2)
+        smooth = np.convolve(hist, kernel, mode='same')
+        padded = np.concatenate(([-1.0], smooth, [-1.0]))
+        peaks = np.flatnonzero((smooth > padded[:-2]) & (smooth >= padded[2:]) & (smooth > 0))
         
-        # Open video
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
-            raise Exception(f"Cannot open video: {input_path}")
+        # Peaks closer than about a face width are the same person
+        min_gap = max(0.08, float(np.median(detections[:, 3])))
+        seeds = []
+        for peak in peaks[np.argsort(-smooth[peaks])]:
+            center = (peak + 0.5) / bins
+            if all(abs(center - seed) >= min_gap for seed in seeds):
+                seeds.append(center)
+        centers = np.sort(np.array(seeds))
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # In 1-D, nearest-centre assignment is a search over the midpoints
+        for _ in range(10):
+            labels = np.searchsorted((centers[:-1] + centers[1:]) / 2, cx)
+            counts = np.bincount(labels, minlength=len(centers))
+            sums = np.bincount(labels, weights=cx, minlength=len(centers))
+            updated = np.where(counts > 0, sums / np.maximum(counts, 1), centers)
+            if np.allclose(updated, centers, atol=1e-4):
+                break
+            centers = updated
+        labels = np.searchsorted((centers[:-1] + centers[1:]) / 2, cx)
         
-        start_frame = int(start_time * fps)
-        end_frame = min(int(end_time * fps), total_frames)
-        clip_frames = end_frame - start_frame
+        # Presence: share of frames with faces in which each cluster appears
+        first_frame = frames.min()
+        seen = np.zeros((len(centers), frames.max() - first_frame + 1), dtype=bool)
+        seen[labels, frames - first_frame] = True
+        presence = seen.sum(axis=1) / max(1, int(seen.any(axis=0).sum()))
         
-        report(0.05, f"Clip: {start_time:.1f}s - {end_time:.1f}s ({clip_frames} frames)")
+        ranked = [k for k in np.argsort(-presence) if presence[k] >= min_presence]
+        if not ranked:
+            ranked = [int(np.argmax(presence))]
+        kept = sorted(ranked[:max_speakers], key=lambda k: centers[k])
         
-        report(0.1, "Analyzing faces...")
+        speakers = []
+        for speaker_id, k in enumerate(kept):
+            members = np.flatnonzero(labels == k)
+            samples = detections[members[np.linspace(0, len(members) - 1, min(10, len(members))).astype(np.int64)]]
+            speakers.append(Speaker(
+                id=speaker_id,
+                x_position=float(centers[k]),
+                y_position=float(np.median(detections[members, 2] + detections[members, 4] / 2)),
+                face_regions=[
+                    (int(x * width), int(y * height), int(w * width), int(h * height))
+                    for _, x, y, w, h in samples
+                ]
+            ))
         
-        face_detections = []
-        sample_interval = max(1, clip_frames // 50)  # Sample ~50 frames
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"   Clustered {len(detections)} detections into {len(speakers)} speaker(s) in {elapsed_ms:.2f} ms")
+        return speakers
+    
+    def _timeline_filter(
+        self,
+        timeline: List[TimelineSegment],
+        speakers: List[Speaker],
+        fps: float,
+        width: int,
+        height: int
+    ) -> str:
+        """
+        Build one filter graph that follows a multi-segment timeline.
         
-        frame_idx = 0
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        Single segments share one crop whose x position is a piecewise
+        expression of t; split segments overlay the speaker panel layout,
+        enabled only during those segments. Layout changes therefore cost
+        no extra encodes or concatenation.
+        """
+        split = [seg for seg in timeline if seg.mode == 'split']
+        if not timeline or len(split) == len(timeline) or timeline[0].crop_w is None:
+            return self._layout_filter(speakers, width, height)
         
-        while frame_idx < clip_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_idx % sample_interval == 0:
-                # Resize for faster detection
-                small = cv2.resize(frame, (640, 360))
-                faces = self.face_detector.detect(small)
-                
-                for face in faces:
-                    face_detections.append({
-                        'frame': frame_idx,
-                        'center_x': face.center_x,
-                        'confidence': face.confidence
-                    })
+        crop_w = timeline[0].crop_w
+        crop_h = timeline[0].crop_h
+        crop_y = timeline[0].crop_y
+        
+        # Piecewise crop x over segment end times
+        x_expr = str(timeline[-1].crop_x)
+        for segment in reversed(timeline[:-1]):
+            x_expr = f"if(lt(t,{segment.end_frame / fps:.3f}),{segment.crop_x},{x_expr})"
+        
+        single_graph = f"crop={crop_w}:{crop_h}:'{x_expr}':{crop_y},scale=1080:1920"
+        
+        if not split:
+            return f"[0:v]{single_graph}[v]"
+        
+        enable = '+'.join(
+            f"gte(t,{seg.start_frame / fps:.3f})*lt(t,{seg.end_frame / fps:.3f})"
+            for seg in split
+        )
+        panel_graph = self._relabel_input(self._layout_filter(speakers, width, height), 'panel_in')
+        return (
+            f"[0:v]split=2[single_in][panel_in];"
+            f"[single_in]{single_graph}[single];"
+            f"{panel_graph[:-len('[v]')]}[panel];"
+            f"[single][panel]overlay=enable='{enable}'[v]"
+        )
+    
+    def _layout_filter(self, speakers: List[Speaker], width: int, height: int) -> str:
+        """Build the FFmpeg layout filter graph for the detected speakers"""
+        if len(speakers) >= 3:
+            # Panel: three stacked 1080x640 crops, one per speaker
+            crop_w = width // 3
+            crop_h = min(height, int(crop_w * 640 / 1080))
             
-            frame_idx += 1
+            graph = ""
+            for i, speaker in enumerate(sorted(speakers[:3], key=lambda sp: sp.x_position)):
+                crop_x = int(speaker.x_position * width - crop_w / 2)
+                crop_y = int(speaker.y_position * height - crop_h / 2)
+                crop_x = max(0, min(crop_x, width - crop_w))
+                crop_y = max(0, min(crop_y, height - crop_h))
+                graph += f"[0:v]crop={crop_w}:{crop_h}:{crop_x}:{crop_y},scale=1080:640[p{i}];"
             
-            if frame_idx % 100 == 0:
-                report(0.1 + 0.2 * (frame_idx / clip_frames), f"Scanning frame {frame_idx}/{clip_frames}")
+            return graph + "[p0][p1][p2]vstack=inputs=3[v]"
         
-        report(0.3, "Identifying speakers...")
-        
-        speakers = []
-        if face_detections:
-            # Cluster face X positions
-            x_positions = [d['center_x'] for d in face_detections]
+        if len(speakers) >= 2:
+            # Split screen: side by side speakers
+            s0 = speakers[0].x_position
+            s1 = speakers[1].x_position
+            
+            # Determine left/right
+            if s0 < s1:
+                left_x = s0
+                right_x = s1
+            else:
+                left_x = s1
+                right_x = s0
+            
+            # Calculate crop regions
+            crop_w = width // 2
+            crop_h = height
             
-            # Simple clustering: left half vs right half
-            left_faces = [x for x in x_positions if x < 0.5]
-            right_faces = [x for x in x_positions if x >= 0.5]
+            left_crop_x = int(left_x * width - crop_w // 2)
+            right_crop_x = int(right_x * width - crop_w // 2)
             
-            if left_faces:
-                avg_left = sum(left_faces) / len(left_faces)
-                speakers.append(Speaker(id=0, x_position=avg_left, face_regions=[]))
+            left_crop_x = max(0, min(left_crop_x, width - crop_w))
+            right_crop_x = max(0, min(right_crop_x, width - crop_w))
             
-            if right_faces:
-                avg_right = sum(right_faces) / len(right_faces)
-                speakers.append(Speaker(id=1, x_position=avg_right, face_regions=[]))
+            # FFmpeg split screen filter (no trim)
+            return (
+                f"[0:v]crop={crop_w}:{crop_h}:{left_crop_x}:0[left];"
+                f"[0:v]crop={crop_w}:{crop_h}:{right_crop_x}:0[right];"
+                f"[left][right]vstack=inputs=2,scale=1080:1920[v]"
+            )
         
-        num_speakers = len(speakers)
-        is_split = num_speakers >= 2
-        layout_mode = 'split' if is_split else 'single'
+        # Single speaker mode - center crop
+        return self._single_speaker_filter(width, height)
+    
+    def _load_audio(
+        self,
+        input_path: str,
+        start_time: Optional[float] = None,
+        duration: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        Decode 16kHz mono audio for Whisper and VAD straight into memory.
         
-        report(0.35, f"Detected {num_speakers} speaker(s), mode: {layout_mode}")
-
-        report(0.4, "Generating crop timeline...")
+        FFmpeg streams s16le samples over a pipe into a float32 buffer
+        preallocated from the clip duration, so no WAV is written to disk
+        or parsed again.
+        """
+        cmd = ['ffmpeg', '-v', 'error']
+        if start_time is not None:
+            cmd += ['-ss', str(start_time)]
+        if duration is not None:
+            cmd += ['-t', str(duration)]
+        cmd += [
+            '-i', input_path,
+            '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ar', str(AUDIO_SAMPLE_RATE), '-ac', '1',
+            'pipe:1'
+        ]
         
+        expected = int((duration or 60) * AUDIO_SAMPLE_RATE) + AUDIO_SAMPLE_RATE
+        buffer = {'samples': np.empty(expected, dtype=np.float32), 'count': 0, 'pending': b''}
         
-        timeline = [{
-            'start': start_time,
-            'end': end_time,
-            'mode': layout_mode,
-            'speakers': num_speakers
-        }]
+        def consume(chunk: bytes) -> None:
+            # Keep an odd trailing byte for the next read
+            data = buffer['pending'] + chunk
+            usable = len(data) - len(data) % 2
+            buffer['pending'] = data[usable:]
+            decoded = np.frombuffer(data[:usable], dtype=np.int16)
+            
+            samples, count = buffer['samples'], buffer['count']
+            if count + len(decoded) > len(samples):
+                samples = buffer['samples'] = np.resize(samples, max(2 * len(samples), count + len(decoded)))
+            samples[count:count + len(decoded)] = decoded
+            buffer['count'] = count + len(decoded)
         
-        report(0.45, "Rendering video...")
+        returncode, stderr = self.ffmpeg.run(cmd, duration, on_stdout=consume, kind='audio')
+        if returncode != 0:
+            raise Exception(f"Audio decode failed: {stderr[-500:]}")
         
-        temp_video = os.path.join(self.temp_dir, 'temp_clip.mp4')
-        duration = end_time - start_time
+        samples = buffer['samples'][:buffer['count']]
+        samples /= 32768.0
+        return samples
+    
+    def _escape_filter_path(self, path: str) -> str:
+        """Escape a file path for use inside an FFmpeg filter argument"""
+        return path.replace('\\', '/').replace(':', '\\:')
+    
+    def _with_subtitles(self, filter_complex: str, ass_path: str, filter_name: str = 'ass') -> str:
+        """Append a subtitle burn-in to a filter graph ending in [v]"""
+        ass_escaped = self._escape_filter_path(ass_path)
+        return f"{filter_complex[:-len('[v]')]},{filter_name}='{ass_escaped}'[v]"
+    
+    def _relabel_input(self, filter_complex: str, label: str) -> str:
+        """Feed a graph reading [0:v] (possibly several times) from [label] instead"""
+        parts = filter_complex.split('[0:v]')
+        uses = len(parts) - 1
+        if uses <= 1:
+            return filter_complex.replace('[0:v]', f"[{label}]")
         
-        if is_split:
-            # Split screen: side by side speakers
-            if num_speakers >= 2:
-                s0 = speakers[0].x_position
-                s1 = speakers[1].x_position
-                
-                # Determine left/right
-                if s0 < s1:
-                    left_x = s0
-                    right_x = s1
-                else:
-                    left_x = s1
-                    right_x = s0
-                
-                # Calculate crop regions
-                crop_w = width // 2
-                crop_h = height
-                
-                left_crop_x = int(left_x * width - crop_w // 2)
-                right_crop_x = int(right_x * width - crop_w // 2)
-                
-                left_crop_x = max(0, min(left_crop_x, width - crop_w))
-                right_crop_x = max(0, min(right_crop_x, width - crop_w))
-                
-                # FFmpeg split screen filter (no trim)
-                filter_complex = (
-                    f"[0:v]crop={crop_w}:{crop_h}:{left_crop_x}:0[left];"
-                    f"[0:v]crop={crop_w}:{crop_h}:{right_crop_x}:0[right];"
-                    f"[left][right]vstack=inputs=2,scale=1080:1920[v]"
-                )
-            else:
-                # Single speaker - center crop
-                filter_complex = self._single_speaker_filter(width, height)
+        inputs = [f"[{label}{i}]" for i in range(uses)]
+        graph = parts[0] + ''.join(inputs[i] + part for i, part in enumerate(parts[1:]))
+        return f"[{label}]split={uses}{''.join(inputs)};{graph}"
+    
+    def _with_time_offset(self, filter_complex: str, time_offset: float) -> str:
+        """
+        Run a graph ending in [v] as if its input started time_offset seconds
+        into the clip, so time-based expressions and subtitles line up for a
+        chunk; output timestamps start at zero again.
+        """
+        graph = self._relabel_input(filter_complex, 'shifted')
+        return (
+            f"[0:v]setpts=PTS+{time_offset:.6f}/TB[shifted];"
+            f"{graph[:-len('[v]')]},setpts=PTS-STARTPTS[v]"
+        )
+    
+    def _run_encode(
+        self,
+        cmd: List[str],
+        output_path: Optional[str],
+        output_sink: Optional[Any] = None,
+        duration: Optional[float] = None,
+        on_progress: Optional[Callable[[float], None]] = None,
+        kind: str = 'render'
+    ) -> Tuple[int, str]:
+        """
+        Run an FFmpeg encode whose output target is appended to cmd.
+        
+        Without a sink the output goes to output_path. With one, FFmpeg emits
+        fragmented MP4 on stdout and every chunk is handed to
+        output_sink.write() while encoding continues; a failed attempt calls
+        output_sink.reset() so a retry starts from a clean stream.
+        
+        Raises FFmpegStalled when the watchdog killed the encode, so callers
+        don't try fallback graphs on an input that stalls.
+        """
+        if output_sink is None:
+            returncode, stderr = self.ffmpeg.run(cmd + [output_path], duration, on_progress, kind=kind)
         else:
-            # Single speaker mode - center on speaker
-            filter_complex = self._single_speaker_filter(width, height)
+            cmd = cmd + ['-f', 'mp4', '-movflags', 'frag_keyframe+empty_moov+default_base_moof', 'pipe:1']
+            returncode, stderr = self.ffmpeg.run(cmd, duration, on_progress, on_stdout=output_sink.write, kind=kind)
+            if returncode != 0:
+                output_sink.reset()
         
-        # Run FFmpeg with Input Seeking (faster and safe for filters)
-        cmd = [
-            'ffmpeg', '-y',
-            '-ss', str(start_time),
-            '-t', str(duration),
-            '-i', input_path,
-            '-filter_complex', filter_complex,
-            '-map', '[v]',
-            '-map', '0:a?',
-            '-c:v', 'libx264',
-            '-preset', 'fast',
-            '-crf', '18',
-            '-c:a', 'aac',
-            '-b:a', '192k',
-            temp_video
-        ]
+        if returncode != 0 and self.ffmpeg.last_stalled():
+            raise FFmpegStalled(f"FFmpeg {kind} stalled: {stderr[-500:]}")
+        return returncode, stderr
+    
+    def _stream_file(self, path: str, output_sink: Any) -> None:
+        """Copy an already rendered file into an output sink"""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(1024 * 1024)
+                if not chunk:
+                    break
+                output_sink.write(chunk)
+    
+    def _render(
+        self,
+        input_path: str,
+        output_path: Optional[str],
+        start_time: float,
+        duration: float,
+        filter_complex: str,
+        ass_path: Optional[str] = None,
+        output_sink: Optional[Any] = None,
+        on_progress: Optional[Callable[[float], None]] = None
+    ) -> None:
+        """
+        Encode the clip with the layout filter graph, burning in subtitles
+        in the same encode when an ASS file is given. on_progress receives
+        the encoded fraction of the clip.
+        """
+        if self.render_chunks > 1 and duration >= 2 * MIN_RENDER_CHUNK_SECONDS:
+            try:
+                self._render_chunked(
+                    input_path, output_path, start_time, duration,
+                    filter_complex, ass_path, output_sink, on_progress
+                )
+                return
+            except (StageCancelled, FFmpegStalled):
+                raise
+            except Exception as e:
+                print(f"⚠️ Chunked render failed, falling back to a single encode: {e}")
+                get_metrics().inc('smartclip_fallbacks_total', kind='single_encode')
+                if output_sink:
+                    output_sink.reset()
+        
+        # Fallback: simple scale/crop without advanced layout
+        fallback_filter = "[0:v]scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920[v]"
+        
+        graphs = []
+        for layout, fallback in ((filter_complex, None), (fallback_filter, 'simple_layout')):
+            if ass_path:
+                graphs.append((self._with_subtitles(layout, ass_path, 'ass'), fallback))
+                # Try subtitles filter if ass is unavailable
+                graphs.append((self._with_subtitles(layout, ass_path, 'subtitles'), fallback or 'subtitles_filter'))
+            else:
+                graphs.append((layout, fallback))
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"⚠️ FFmpeg Error: {result.stderr}")
-            # Fallback: simple copy/scale without advanced crop
+        stderr = ''
+        for graph, fallback in graphs:
+            # Run FFmpeg with Input Seeking (faster and safe for filters)
             cmd = [
                 'ffmpeg', '-y',
                 '-ss', str(start_time),
                 '-t', str(duration),
                 '-i', input_path,
-                '-vf', 'scale=1080:1920:force_original_aspect_ratio=increase,crop=1080:1920',
+                '-filter_complex', graph,
+                '-map', '[v]',
+                '-map', '0:a?',
                 '-c:v', 'libx264',
                 '-preset', 'fast',
                 '-crf', '18',
                 '-c:a', 'aac',
-                '-b:a', '192k',
-                temp_video
+                '-b:a', '192k'
             ]
-            subprocess.run(cmd, check=True, capture_output=True)
+            
+            returncode, stderr = self._run_encode(cmd, output_path, output_sink, duration, on_progress)
+            if returncode == 0:
+                if fallback:
+                    get_metrics().inc('smartclip_fallbacks_total', kind=fallback)
+                return
+            
+            print(f"⚠️ FFmpeg Error: {stderr}")
+        
+        raise Exception(f"FFmpeg render failed: {stderr[-500:]}")
+    
+    def _keyframe_times(self, input_path: str, start_time: float, end_time: float) -> List[float]:
+        """Timestamps of the video keyframes strictly between start_time and end_time"""
+        keyframes = probe_keyframes(input_path, start_time, end_time) or []
+        return [t for t in keyframes if start_time < t < end_time]
+    
+    def _plan_chunks(
+        self,
+        input_path: str,
+        start_time: float,
+        duration: float,
+        fps: float,
+        chunks: int
+    ) -> List[Tuple[int, int]]:
+        """
+        Split a clip into (first_frame, frame_count) chunks, counted from the
+        first frame of the clip.
         
-        report(0.6, "Video rendered")
+        Boundaries move to the nearest source keyframe (GOP or scene cut)
+        within a quarter chunk of the even split, so chunk seeks decode
+        little and joins land where the picture changes anyway.
+        """
+        total_frames = int(round(duration * fps))
+        chunk_length = duration / chunks
+        keyframes = [t - start_time for t in self._keyframe_times(input_path, start_time, start_time + duration)]
         
-        ass_path = None
-        if subtitle_style:
-            report(0.65, "Generating subtitles...")
-            
-            # Extract audio
-            temp_audio = os.path.join(self.temp_dir, 'temp_audio.wav')
-            cmd = [
+        boundaries = [0]
+        for i in range(1, chunks):
+            target = i * chunk_length
+            nearby = [t for t in keyframes if abs(t - target) <= chunk_length / 4]
+            if nearby:
+                target = min(nearby, key=lambda t: abs(t - target))
+            frame = int(round(target * fps))
+            if boundaries[-1] < frame < total_frames:
+                boundaries.append(frame)
+        boundaries.append(total_frames)
+        
+        return [(a, b - a) for a, b in zip(boundaries, boundaries[1:])]
+    
+    def _render_chunked(
+        self,
+        input_path: str,
+        output_path: Optional[str],
+        start_time: float,
+        duration: float,
+        filter_complex: str,
+        ass_path: Optional[str] = None,
+        output_sink: Optional[Any] = None,
+        on_progress: Optional[Callable[[float], None]] = None
+    ) -> None:
+        """
+        Encode the clip as several chunks in parallel FFmpeg processes and
+        join them losslessly with the concat demuxer.
+        
+        Each chunk runs the same layout graph shifted by the chunk's offset,
+        so timeline expressions and subtitles stay on the clip timeline. Chunks are
+        video-only and the audio is encoded once alongside them, so there
+        are no audio priming gaps at the joins.
+        """
+        cap = cv2.VideoCapture(input_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        if not fps or fps <= 0:
+            raise Exception(f"Cannot determine frame rate of {input_path}")
+        
+        chunks = min(self.render_chunks, int(duration // MIN_RENDER_CHUNK_SECONDS))
+        plan = self._plan_chunks(input_path, start_time, duration, fps, chunks)
+        threads = max(1, self.cpu_threads // len(plan))
+        
+        chunk_dir = tempfile.mkdtemp(prefix='chunks_', dir=self.temp_dir)
+        try:
+            audio_path = os.path.join(chunk_dir, 'audio.m4a')
+            audio_cmd = [
                 'ffmpeg', '-y',
-                '-i', temp_video,
-                '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
-                temp_audio
+                '-ss', str(start_time),
+                '-t', str(duration),
+                '-i', input_path,
+                '-map', '0:a:0?',
+                '-vn',
+                '-c:a', 'aac',
+                '-b:a', '192k',
+                audio_path
             ]
-            subprocess.run(cmd, check=True, capture_output=True)
             
-            # Subtitle timeline should be relative to 0 (since temp_video starts at 0)
-            subtitle_timeline = [{
-                'start': 0, 
-                'end': duration, 
-                'mode': layout_mode
-            }]
+            # Progress is the share of all chunk frames encoded so far
+            chunk_done = [0.0] * len(plan)
             
-            # Generate subtitles
-            self.subtitle_gen = SubtitleGenerator(subtitle_style)
-            ass_path = os.path.join(self.temp_dir, 'subtitles.ass')
-            
-            self.subtitle_gen.generate(
-                audio_path=temp_audio,
-                output_ass_path=ass_path,
-                video_width=1080,
-                video_height=1920,
-                layout_timeline=subtitle_timeline,
-                whisper_model=whisper_model
-            )
+            def chunk_progress(index: int, fraction: float) -> None:
+                chunk_done[index] = fraction * plan[index][1]
+                if on_progress:
+                    on_progress(sum(chunk_done) / max(1, sum(count for _, count in plan)))
+            
+            def encode_chunk(index: int, first_frame: int, frame_count: int) -> str:
+                graph = filter_complex
+                if ass_path:
+                    graph = self._with_subtitles(graph, ass_path, 'ass')
+                if first_frame:
+                    graph = self._with_time_offset(graph, first_frame / fps)
+                
+                # Seek half a frame early: input seeking keeps frames at or
+                # after the seek point, so this lands exactly on first_frame
+                seek = start_time + (first_frame - 0.5) / fps if first_frame else start_time
+                chunk_path = os.path.join(chunk_dir, f"chunk_{index:03d}.mp4")
+                cmd = [
+                    'ffmpeg', '-y',
+                    '-ss', f"{seek:.6f}",
+                    '-i', input_path,
+                    '-filter_complex', graph,
+                    '-map', '[v]',
+                    '-frames:v', str(frame_count),
+                    '-an',
+                    '-c:v', 'libx264',
+                    '-preset', 'fast',
+                    '-crf', '18',
+                    '-threads', str(threads),
+                    chunk_path
+                ]
+                returncode, stderr = self.ffmpeg.run(
+                    cmd, frame_count / fps,
+                    lambda fraction: chunk_progress(index, fraction),
+                    kind='render_chunk'
+                )
+                if returncode != 0:
+                    if self.ffmpeg.last_stalled():
+                        raise FFmpegStalled(f"chunk {index} stalled: {stderr[-500:]}")
+                    raise Exception(f"chunk {index} failed: {stderr[-500:]}")
+                return chunk_path
             
-            # Clean up audio
-            os.remove(temp_audio)
+            # One FFmpeg process per chunk, plus one for the audio
+            with ThreadPoolExecutor(max_workers=len(plan) + 1) as pool:
+                audio_future = pool.submit(self.ffmpeg.run, audio_cmd, duration, kind='audio_encode')
+                chunk_futures = [
+                    pool.submit(encode_chunk, i, first_frame, frame_count)
+                    for i, (first_frame, frame_count) in enumerate(plan)
+                ]
+                chunk_paths = [future.result() for future in chunk_futures]
+                audio_returncode, _ = audio_future.result()
             
-            report(0.8, "Burning subtitles...")
+            has_audio = audio_returncode == 0 and os.path.exists(audio_path)
             
-            # Burn subtitles
-            ass_escaped = ass_path.replace('\\', '/').replace(':', '\\:')
+            list_path = os.path.join(chunk_dir, 'chunks.txt')
+            with open(list_path, 'w') as f:
+                for path in chunk_paths:
+                    f.write(f"file '{path}'\n")
+            
+            cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_path]
+            if has_audio:
+                cmd += ['-i', audio_path, '-map', '0:v', '-map', '1:a']
+            cmd += ['-c', 'copy']
+            
+            returncode, stderr = self._run_encode(cmd, output_path, output_sink, duration, kind='concat')
+            if returncode != 0:
+                raise Exception(f"concat failed: {stderr[-500:]}")
+            
+            print(f"   Rendered {len(plan)} chunks in parallel")
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+    
+    def _burn_subtitles(
+        self,
+        video_path: str,
+        ass_path: str,
+        output_path: Optional[str],
+        output_sink: Optional[Any] = None,
+        duration: Optional[float] = None,
+        on_progress: Optional[Callable[[float], None]] = None
+    ) -> None:
+        """Burn subtitles into an already rendered clip (second encode)"""
+        ass_escaped = self._escape_filter_path(ass_path)
+        
+        stderr = ''
+        for filter_name in ('ass', 'subtitles'):
             cmd = [
                 'ffmpeg', '-y',
-                '-i', temp_video,
-                '-vf', f"ass='{ass_escaped}'",
+                '-i', video_path,
+                '-vf', f"{filter_name}='{ass_escaped}'",
                 '-c:v', 'libx264',
                 '-preset', 'fast',
                 '-crf', '18',
-                '-c:a', 'copy',
-                output_path
+                '-c:a', 'copy'
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                # Try subtitles filter
-                cmd = [
-                    'ffmpeg', '-y',
-                    '-i', temp_video,
-                    '-vf', f"subtitles='{ass_escaped}'",
-                    '-c:v', 'libx264',
-                    '-preset', 'fast',
-                    '-crf', '18',
-                    '-c:a', 'copy',
-                    output_path
-                ]
-                subprocess.run(cmd, check=True, capture_output=True)
-        else:
-            # No subtitles - just copy
-            import shutil
-            shutil.move(temp_video, output_path)
-        
-        # Cleanup
-        if os.path.exists(temp_video):
-            os.remove(temp_video)
-        
-        report(1.0, "Complete!")
-        
-        processing_time = int((time.time() - start_timestamp) * 1000)
+            returncode, stderr = self._run_encode(cmd, output_path, output_sink, duration, on_progress, kind='burn')
+            if returncode == 0:
+                return
         
-        return {
-            'output_path': output_path,
-            'speakers_detected': num_speakers,
-            'layout_mode': layout_mode,
-            'processing_time_ms': processing_time,
-            'subtitle_path': ass_path
-        }
+        raise Exception(f"FFmpeg subtitle burn-in failed: {stderr[-500:]}")
     
     def _single_speaker_filter(
         self,
@@ -854,19 +3215,28 @@ if __name__ == '__main__':
     parser.add_argument('--subtitles', default='chris_cinematic', help='Subtitle style')
     parser.add_argument('--whisper', default='base', help='Whisper model')
     parser.add_argument('--no-subtitles', action='store_true', help='Disable subtitles')
+    parser.add_argument('--two-pass', action='store_true', help='Render first, then burn subtitles in a second encode')
+    parser.add_argument('--chunks', type=int, default=1, help='Encode long clips as N chunks in parallel')
+    parser.add_argument('--track-faces', action='store_true', help='Detect-then-track faces for a time-varying timeline')
+    parser.add_argument('--follow-speaker', action='store_true', help='Follow the active speaker instead of split screen')
     
     args = parser.parse_args()
     
     output = args.output or 'output/processed.mp4'
     
-    engine = SmartClipEngine()
+    engine = SmartClipEngine(
+        render_chunks=args.chunks,
+        face_tracking=args.track_faces,
+        active_speaker=args.follow_speaker
+    )
     result = engine.process(
         input_path=args.input,
         output_path=output,
         start_time=args.start,
         end_time=args.end,
         subtitle_style=None if args.no_subtitles else args.subtitles,
-        whisper_model=args.whisper
+        whisper_model=args.whisper,
+        single_pass=not args.two_pass
     )
     
     print(f"\nDone!")
@@ -0,0 +1,111 @@
+import os
+import fcntl
+import hashlib
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+
+class SourceCache:
+    """
+    Shared on-disk cache of downloaded source media.
+    
+    Entries are keyed by a normalized source identity (video ID, S3 object
+    + ETag, ...). Each entry has a lock file: fetching holds it exclusively,
+    so concurrent requests for the same source - from threads or forked
+    worker processes - wait for a single download. Readers hold it shared
+    while they use the file, which protects the entry from eviction.
+    Unused entries are evicted least-recently-used beyond max_bytes.
+    """
+    
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+    
+    def _entry_path(self, key: str, ext: str) -> str:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.root, digest + ext)
+    
+    def contains(self, key: str, ext: str = '.mp4') -> bool:
+        """Whether a source is currently cached"""
+        return os.path.exists(self._entry_path(key, ext))
+    
+    @contextmanager
+    def lease(self, key: str, fetch: Callable[[str], None], ext: str = '.mp4') -> Iterator[str]:
+        """
+        Yield the local path of a cached source, calling fetch(path) to
+        download it first if needed. The entry cannot be evicted until
+        the context exits.
+        """
+        path = self._entry_path(key, ext)
+        lock_fd = os.open(path + '.lock', os.O_CREAT | os.O_RDWR, 0o644)
+        
+        try:
+            while True:
+                # Exclusive while checking/fetching: single flight per key
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                
+                if os.path.exists(path):
+                    os.utime(path)
+                else:
+                    part_path = os.path.join(self.root, f".{os.path.basename(path)}.{os.getpid()}.part{ext}")
+                    try:
+                        fetch(part_path)
+                        os.replace(part_path, path)
+                    finally:
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+                
+                # Downgrading is not atomic, so re-check the entry survived
+                fcntl.flock(lock_fd, fcntl.LOCK_SH)
+                if os.path.exists(path):
+                    break
+            
+            self._evict()
+            yield path
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+        
+        self._evict()
+    
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.is_file() or entry.name.startswith('.') or entry.name.endswith('.lock'):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+    
+    def size_bytes(self) -> int:
+        """Total size of all cached sources"""
+        return sum(size for _, size, _ in self._entries())
+    
+    def _evict(self) -> None:
+        """Delete least recently used entries that are not in use until within budget"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            
+            lock_fd = os.open(path + '.lock', os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Leased or being fetched
+                os.close(lock_fd)
+                continue
+            
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+            finally:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+                os.close(lock_fd)
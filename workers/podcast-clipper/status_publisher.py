@@ -0,0 +1,170 @@
+import json
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any, Callable, List
+
+import redis
+
+logger = logging.getLogger('podcast_clipper_worker')
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+class StatusPublisher:
+    """
+    Coalescing, rate-limited job status writer.
+    
+    update() only records the latest status of a project and returns; a
+    background thread writes each project at most once per min_interval,
+    so a burst of progress ticks costs one write. A flush covers every due
+    project in a single pipeline:
+    
+    - HSET of the fields that changed (HDEL of removed ones) on
+      <hash_prefix><project_id>
+    - SET of the full status JSON on the key the API polls
+      (<key_prefix><project_id>), unless legacy_key is off
+    - PUBLISH of the status on <channel_prefix><project_id>, so clients can
+      be pushed updates instead of polling
+    
+    Stage changes skip the rate limit, and terminal statuses (completed,
+    failed) also block update() until they are written.
+    """
+    
+    def __init__(
+        self,
+        redis_factory: Callable[[], redis.Redis],
+        key_prefix: str,
+        hash_prefix: str,
+        channel_prefix: str,
+        ttl: int = 1800,
+        min_interval: float = 1.0,
+        legacy_key: bool = True,
+        flush_timeout: float = 10.0
+    ):
+        self.redis = redis_factory()
+        self.key_prefix = key_prefix
+        self.hash_prefix = hash_prefix
+        self.channel_prefix = channel_prefix
+        self.ttl = ttl
+        self.min_interval = min_interval
+        self.legacy_key = legacy_key
+        self.flush_timeout = flush_timeout
+        
+        self._cond = threading.Condition()
+        # project_id -> latest status, last written status, version, written version, last flush time
+        self._projects: Dict[str, Dict[str, Any]] = {}
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='status-publisher', daemon=True)
+        self._thread.start()
+    
+    def update(self, project_id: str, status: Dict[str, Any]) -> None:
+        """Replace a project's status; waits for terminal statuses to be written"""
+        with self._cond:
+            state = self._projects.setdefault(project_id, {
+                'status': None, 'written': {}, 'version': 0, 'written_version': 0, 'flushed_at': 0.0
+            })
+            previous = state['status'] or state['written']
+            urgent = status.get('status') in TERMINAL_STATUSES or status.get('stage') != previous.get('stage')
+            state['status'] = dict(status)
+            state['version'] += 1
+            if urgent:
+                state['flushed_at'] = 0.0
+            version = state['version']
+            self._cond.notify_all()
+            
+            if status.get('status') not in TERMINAL_STATUSES:
+                return
+            
+            deadline = time.time() + self.flush_timeout
+            while state['written_version'] < version:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"Status for {project_id} not written: {self._error}")
+                self._cond.wait(remaining)
+    
+    def _due(self, now: float) -> List[str]:
+        return [
+            project_id for project_id, state in self._projects.items()
+            if state['version'] > state['written_version'] and now - state['flushed_at'] >= self.min_interval
+        ]
+    
+    def _next_due(self, now: float) -> Optional[float]:
+        waits = [
+            self.min_interval - (now - state['flushed_at'])
+            for state in self._projects.values()
+            if state['version'] > state['written_version']
+        ]
+        return max(0.0, min(waits)) if waits else None
+    
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    due = self._due(now)
+                    if due or (self._closed and self._next_due(now) is None):
+                        break
+                    self._cond.wait(self._next_due(now))
+                if not due:
+                    return
+                batch = {
+                    project_id: (
+                        dict(self._projects[project_id]['status']),
+                        self._projects[project_id]['version'],
+                        self._projects[project_id]['written']
+                    )
+                    for project_id in due
+                }
+            
+            try:
+                self._write(batch)
+                error = None
+            except redis.RedisError as e:
+                logger.warning(f"Status publish failed, retrying: {e}")
+                error = e
+            
+            with self._cond:
+                self._error = error
+                now = time.time()
+                for project_id, (status, version, _) in batch.items():
+                    state = self._projects[project_id]
+                    state['flushed_at'] = now
+                    if error is None:
+                        state['written'] = status
+                        state['written_version'] = max(state['written_version'], version)
+                        if status.get('status') in TERMINAL_STATUSES and state['version'] == version:
+                            del self._projects[project_id]
+                self._cond.notify_all()
+    
+    def _write(self, batch: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for project_id, (status, _, written) in batch.items():
+            hash_key = f"{self.hash_prefix}{project_id}"
+            
+            changed = {
+                field: value if isinstance(value, str) else json.dumps(value)
+                for field, value in status.items()
+                if written.get(field) != value
+            }
+            removed = [field for field in written if field not in status]
+            if changed:
+                pipe.hset(hash_key, mapping=changed)
+            if removed:
+                pipe.hdel(hash_key, *removed)
+            pipe.expire(hash_key, self.ttl)
+            
+            payload = json.dumps(status)
+            if self.legacy_key:
+                pipe.set(f"{self.key_prefix}{project_id}", payload, ex=self.ttl)
+            pipe.publish(f"{self.channel_prefix}{project_id}", payload)
+        pipe.execute()
+    
+    def close(self, timeout: float = 5.0) -> None:
+        """Write pending statuses and stop the background thread"""
+        with self._cond:
+            self._closed = True
+            for state in self._projects.values():
+                state['flushed_at'] = 0.0
+            self._cond.notify_all()
+        self._thread.join(timeout)
@@ -14,10 +14,13 @@ import traceback
 import subprocess
 import shutil
 import gc
+import multiprocessing
+import threading
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Iterator, Tuple, List
 from urllib.parse import urlparse, parse_qs
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
 
 import redis
 import boto3
@@ -25,7 +28,13 @@ from botocore.config import Config
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from smartclip_engine import SmartClipEngine
+from smartclip_engine import SmartClipEngine, get_model_pool, probe_keyframes
+from artifact_cache import ArtifactCache
+from checkpoints import JobCheckpoint
+from source_cache import SourceCache
+from metrics import get_metrics
+from job_queue import StreamJobQueue, QueuedJob
+from status_publisher import StatusPublisher
 
 logging.basicConfig(
     level=logging.INFO,
@@ -39,11 +48,72 @@ logger = logging.getLogger('podcast_clipper_worker')
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 AWS_REGION = os.environ.get('AWS_REGION', 'ap-south-1')
 AWS_S3_BUCKET = os.environ.get('AWS_S3_BUCKET_NAME', 'smart-clip-temp')
+# Optional S3-compatible endpoint (MinIO, LocalStack, moto) for local testing
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL') or None
+STREAMING_UPLOAD = os.environ.get('STREAMING_UPLOAD', 'true').lower() == 'true'
 WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', '1'))
 MAX_TEMP_SIZE_MB = int(os.environ.get('MAX_TEMP_SIZE_MB', '500'))
+S3_STREAMING_INPUT = os.environ.get('S3_STREAMING_INPUT', 'true').lower() == 'true'
+STREAM_COPY_EXTRACTION = os.environ.get('STREAM_COPY_EXTRACTION', 'true').lower() == 'true'
+MAX_KEYFRAME_LEAD_IN = float(os.environ.get('MAX_KEYFRAME_LEAD_IN', '10'))  # seconds
+# Parallel FFmpeg chunks per render; worth raising when cores outnumber concurrent jobs
+RENDER_CHUNKS = int(os.environ.get('RENDER_CHUNKS', '1'))
+FACE_DETECTOR_BACKEND = os.environ.get('FACE_DETECTOR_BACKEND', 'onnx')  # 'onnx' (batched) or 'opencv'
+# Intra-op threads for ONNX face detection; 0 uses the per-process thread budget
+FACE_DETECTOR_THREADS = int(os.environ.get('FACE_DETECTOR_THREADS', '0'))
+# Detect-then-track faces for a time-varying layout timeline instead of ~50 static samples
+FACE_TRACKING = os.environ.get('FACE_TRACKING', 'false').lower() == 'true'
+# Follow the active speaker (audio VAD + mouth motion) instead of split screen
+ACTIVE_SPEAKER = os.environ.get('ACTIVE_SPEAKER', 'false').lower() == 'true'
+# Transcribe only detected speech (skips silence and music beds)
+VAD_GATED_ASR = os.environ.get('VAD_GATED_ASR', 'true').lower() == 'true'
+# CPU threads for faster-whisper ASR models; 0 uses the per-process thread budget
+ASR_CPU_THREADS = int(os.environ.get('ASR_CPU_THREADS', '0'))
+# FFmpeg runs advancing less than FFMPEG_MIN_SPEED x realtime for
+# FFMPEG_STALL_SECONDS are killed (0 disables the watchdog)
+FFMPEG_STALL_SECONDS = float(os.environ.get('FFMPEG_STALL_SECONDS', '120'))
+FFMPEG_MIN_SPEED = float(os.environ.get('FFMPEG_MIN_SPEED', '0.05'))
+PRELOAD_WHISPER_MODELS = [m.strip() for m in os.environ.get('PRELOAD_WHISPER_MODELS', 'base').split(',') if m.strip()]
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'models')
+SOURCE_CACHE_DIR = os.environ.get('SOURCE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'podcast_clipper_sources'))
+# Must hold a few full episodes: a source bigger than this is evicted as soon
+# as its job releases it, so later clips of it download it again
+SOURCE_CACHE_MAX_MB = int(os.environ.get('SOURCE_CACHE_MAX_MB', '10240'))
+ARTIFACT_CACHE_DIR = os.environ.get('ARTIFACT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'podcast_clipper_artifacts'))
+ARTIFACT_CACHE_MAX_MB = int(os.environ.get('ARTIFACT_CACHE_MAX_MB', '2048'))
+# Per-job stage checkpoints (clipped input, faces, words, base render) that
+# retries resume from; use a shared volume to resume on another node
+JOB_CHECKPOINTS = os.environ.get('JOB_CHECKPOINTS', 'true').lower() == 'true'
+CHECKPOINT_DIR = os.environ.get('CHECKPOINT_DIR', os.path.join(tempfile.gettempdir(), 'podcast_clipper_checkpoints'))
+CHECKPOINT_TTL_HOURS = float(os.environ.get('CHECKPOINT_TTL_HOURS', '24'))
 JOB_QUEUE_KEY = 'podcast_clipper_jobs'
+# 'streams': consumer group with acks, reclaim and retries; 'list': legacy BRPOP
+JOB_QUEUE_BACKEND = os.environ.get('JOB_QUEUE_BACKEND', 'streams')
+JOB_STREAM_KEY = 'podcast_clipper_jobs:stream'
+JOB_CONSUMER_GROUP = 'podcast_clipper_workers'
+# A job whose worker stops heartbeating for this long is reclaimed by another worker
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get('JOB_VISIBILITY_TIMEOUT', '300'))  # seconds
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
 STATUS_KEY_PREFIX = 'podcast_clipper_status:'
+STATUS_HASH_PREFIX = 'podcast_clipper_state:'
+STATUS_CHANNEL_PREFIX = 'podcast_clipper_events:'
+# Coalesce status updates and write them off the job thread (HSET + PUBLISH)
+STATUS_PUBLISHER = os.environ.get('STATUS_PUBLISHER', 'true').lower() == 'true'
+STATUS_MIN_INTERVAL = float(os.environ.get('STATUS_MIN_INTERVAL', '1.0'))  # seconds per project
+# Keep writing the full JSON status key the API polls
+STATUS_LEGACY_KEY = os.environ.get('STATUS_LEGACY_KEY', 'true').lower() == 'true'
 POLL_INTERVAL = 2  # seconds
+# Prometheus scrape endpoint (/metrics); 0 disables it
+METRICS_PORT = int(os.environ.get('METRICS_PORT', '9100'))
+
+metrics = get_metrics()
+metrics.describe('smartclip_jobs_total', 'counter', 'Jobs finished, by status')
+metrics.describe('smartclip_jobs_in_flight', 'gauge', 'Jobs currently being processed')
+metrics.describe('smartclip_queue_depth', 'gauge', 'Jobs waiting in the Redis queue')
+metrics.describe('smartclip_job_seconds', 'histogram', 'End-to-end job duration')
+metrics.describe('smartclip_stage_seconds', 'histogram', 'Duration of each pipeline stage')
+metrics.describe('smartclip_fallbacks_total', 'counter', 'Fallback paths taken, by kind')
+metrics.describe('smartclip_worker_rss_bytes', 'gauge', 'Resident memory of each worker process')
 
 @contextmanager
 def managed_temp_dir(prefix: str = 'podcast_clipper_'):
@@ -58,6 +128,17 @@ def managed_temp_dir(prefix: str = 'podcast_clipper_'):
     finally:
         cleanup_temp_dir(temp_dir)
 
+@contextmanager
+def timed_stage(timings: Dict[str, int], stage: str):
+    """Record a worker stage in the job's stage timings and the stage histogram."""
+    started = time.time()
+    try:
+        yield
+    finally:
+        elapsed = time.time() - started
+        timings[stage] = timings.get(stage, 0) + int(elapsed * 1000)
+        metrics.observe('smartclip_stage_seconds', elapsed, stage=stage)
+
 def cleanup_temp_dir(temp_dir: str) -> None:
     """Aggressively cleanup temporary directory."""
     if temp_dir and os.path.exists(temp_dir):
@@ -120,21 +201,101 @@ def get_s3_client():
         config = Config(
             region_name=AWS_REGION,
             retries={'max_attempts': 3, 'mode': 'adaptive'},
-            s3={'addressing_style': 'virtual'},
+            s3={'addressing_style': 'path' if AWS_S3_ENDPOINT_URL else 'virtual'},
             max_pool_connections=10
         )
         _s3_client = boto3.client(
             's3',
             config=config,
+            endpoint_url=AWS_S3_ENDPOINT_URL,
             aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
             aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
         )
     return _s3_client
 
-def download_from_s3(s3_url: str, local_path: str) -> None:
-    """Download a file from S3 to local path."""
-    s3 = get_s3_client()
+_artifact_cache = None
+
+def get_artifact_cache() -> Optional[ArtifactCache]:
+    """Get or create the shared artifact cache (None when disabled)."""
+    global _artifact_cache
+    if _artifact_cache is None and ARTIFACT_CACHE_MAX_MB > 0:
+        _artifact_cache = ArtifactCache(ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+    return _artifact_cache
+
+_source_cache = None
+
+def get_job_checkpoint(job_id: str) -> Optional[JobCheckpoint]:
+    """Stage checkpoint for a job, backed by the shared artifact cache."""
+    if not JOB_CHECKPOINTS:
+        return None
+    return JobCheckpoint(CHECKPOINT_DIR, job_id, shared=get_artifact_cache())
+
+def get_source_cache() -> Optional[SourceCache]:
+    """Get or create the shared source media cache (None when disabled)."""
+    global _source_cache
+    if _source_cache is None and SOURCE_CACHE_MAX_MB > 0:
+        _source_cache = SourceCache(SOURCE_CACHE_DIR, SOURCE_CACHE_MAX_MB * 1024 * 1024)
+    return _source_cache
+
+@contextmanager
+def cached_source(cache_key: str, fetch: Callable[[str], None], temp_dir: str, filename: str) -> Iterator[str]:
+    """
+    Yield a local path for a source, fetched through the shared source cache
+    when it is enabled, or into temp_dir (and deleted afterwards) otherwise.
+    """
+    cache = get_source_cache()
+    if cache is None:
+        path = os.path.join(temp_dir, filename)
+        try:
+            fetch(path)
+            yield path
+        finally:
+            cleanup_file(path)
+    else:
+        with cache.lease(cache_key, fetch) as path:
+            yield path
+
+def link_or_copy(src_path: str, dst_path: str) -> None:
+    """Hard link a file into place, copying when linking is not possible."""
+    cleanup_file(dst_path)
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
+
+def normalize_source_url(url: str) -> str:
+    """Normalize a source URL so different forms of the same video share a key."""
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    
+    video_id = None
+    if host == 'youtu.be':
+        video_id = parsed.path.lstrip('/').split('/')[0]
+    elif host == 'youtube.com' or host.endswith('.youtube.com'):
+        if parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+        elif parsed.path.startswith(('/shorts/', '/live/', '/embed/')):
+            video_id = parsed.path.split('/')[2]
     
+    if video_id:
+        return f"youtube:{video_id}"
+    
+    return f"{parsed.scheme.lower()}://{host}{parsed.path}" + (f"?{parsed.query}" if parsed.query else '')
+
+def source_identity(job_data: Dict[str, Any], s3_etag: Optional[str] = None) -> str:
+    """Stable identity of a job's source clip, used as the artifact cache key."""
+    if job_data.get('source_type', 'youtube') == 'youtube':
+        source = normalize_source_url(job_data['source_url'])
+    else:
+        bucket, key = parse_s3_url(job_data['video_path'])
+        source = f"s3://{bucket}/{key}@{s3_etag}"
+    return f"{source}#{job_data['clip_start_time']}-{job_data['clip_end_time']}"
+
+def parse_s3_url(s3_url: str) -> Tuple[str, str]:
+    """Resolve an S3 URL, HTTPS object URL or bare key to (bucket, key)."""
     if s3_url.startswith('s3://'):
         parts = s3_url[5:].split('/', 1)
         bucket = parts[0]
@@ -151,6 +312,18 @@ def download_from_s3(s3_url: str, local_path: str) -> None:
         bucket = AWS_S3_BUCKET
         key = s3_url
     
+    return bucket, key
+
+def get_s3_etag(s3_url: str) -> str:
+    """ETag of an S3 object, identifying its current content."""
+    bucket, key = parse_s3_url(s3_url)
+    return get_s3_client().head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+
+def download_from_s3(s3_url: str, local_path: str) -> None:
+    """Download a file from S3 to local path."""
+    s3 = get_s3_client()
+    bucket, key = parse_s3_url(s3_url)
+    
     logger.info(f"Downloading from S3: bucket={bucket}, key={key}")
     s3.download_file(bucket, key, local_path)
     logger.info(f"Downloaded to: {local_path} ({os.path.getsize(local_path) / 1024 / 1024:.2f} MB)")
@@ -184,10 +357,142 @@ def upload_to_s3(local_path: str, s3_key: str, content_type: str = 'video/mp4')
             ExtraArgs={'ContentType': content_type}
         )
     
-    url = f"https://{AWS_S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
+    url = get_s3_object_url(s3_key)
     logger.info(f"Uploaded to: {url}")
     return url
 
+def get_s3_object_url(s3_key: str) -> str:
+    """Public URL of an object in the output bucket."""
+    if AWS_S3_ENDPOINT_URL:
+        return f"{AWS_S3_ENDPOINT_URL.rstrip('/')}/{AWS_S3_BUCKET}/{s3_key}"
+    return f"https://{AWS_S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
+
+class S3MultipartSink:
+    """
+    Output sink that uploads a byte stream to S3 while it is being produced.
+    
+    Bytes written are cut into parts that are uploaded concurrently with S3
+    multipart upload, so by the time the encoder exits most of the output is
+    already uploaded and no full copy of it needs to exist on disk.
+    """
+    
+    # S3 requires every part except the last to be at least 5 MB
+    MIN_PART_SIZE = 5 * 1024 * 1024
+    
+    def __init__(self, s3_key: str, content_type: str = 'video/mp4', part_size: int = 8 * 1024 * 1024, max_concurrency: int = 4):
+        self.s3 = get_s3_client()
+        self.s3_key = s3_key
+        self.content_type = content_type
+        self.part_size = max(part_size, self.MIN_PART_SIZE)
+        self.bytes_written = 0
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        # Bounds the parts held in memory while uploads are in flight
+        self._slots = threading.BoundedSemaphore(max_concurrency * 2)
+        self._buffer = bytearray()
+        self._futures: List[Future] = []
+        self._upload_id: Optional[str] = None
+    
+    def write(self, data: bytes) -> None:
+        """Buffer data and upload every complete part in the background."""
+        self._raise_failed_parts()
+        
+        self._buffer += data
+        self.bytes_written += len(data)
+        
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit(part)
+    
+    def _submit(self, body: bytes) -> None:
+        if self._upload_id is None:
+            response = self.s3.create_multipart_upload(
+                Bucket=AWS_S3_BUCKET,
+                Key=self.s3_key,
+                ContentType=self.content_type
+            )
+            self._upload_id = response['UploadId']
+        
+        part_number = len(self._futures) + 1
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._upload_part, part_number, body))
+    
+    def _upload_part(self, part_number: int, body: bytes) -> Dict[str, Any]:
+        try:
+            response = self.s3.upload_part(
+                Bucket=AWS_S3_BUCKET,
+                Key=self.s3_key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=body
+            )
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        finally:
+            self._slots.release()
+    
+    def _raise_failed_parts(self) -> None:
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+    
+    def close(self) -> str:
+        """Upload the remaining bytes, complete the upload and return the URL."""
+        if self._buffer or not self._futures:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        
+        try:
+            parts = [future.result() for future in self._futures]
+            self.s3.complete_multipart_upload(
+                Bucket=AWS_S3_BUCKET,
+                Key=self.s3_key,
+                UploadId=self._upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except Exception:
+            # An incomplete multipart upload keeps its parts (and billing) until aborted
+            self.abort()
+            raise
+        self._executor.shutdown()
+        
+        url = get_s3_object_url(self.s3_key)
+        logger.info(f"Streamed upload complete: {url} ({self.bytes_written / 1024 / 1024:.2f} MB in {len(parts)} parts)")
+        return url
+    
+    def reset(self) -> None:
+        """Discard everything written so far; the next write starts a new upload."""
+        for future in self._futures:
+            # A part cancelled before it started never releases its slot
+            if future.cancel():
+                self._slots.release()
+        for future in self._futures:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+        
+        if self._upload_id is not None:
+            try:
+                self.s3.abort_multipart_upload(
+                    Bucket=AWS_S3_BUCKET,
+                    Key=self.s3_key,
+                    UploadId=self._upload_id
+                )
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload {self._upload_id}: {e}")
+        
+        self._upload_id = None
+        self._futures = []
+        self._buffer.clear()
+        self.bytes_written = 0
+    
+    def abort(self) -> None:
+        """Abort the upload and release the upload threads."""
+        self.reset()
+        self._executor.shutdown()
+
 
 def download_youtube_clip(url: str, start_time: float, end_time: float, output_path: str) -> None:
     """
@@ -245,7 +550,7 @@ def download_youtube_clip(url: str, start_time: float, end_time: float, output_p
         
         if not os.path.exists(output_path):
             for ext in ['.mp4', '.webm', '.mkv']:
-                alt_path = output_path.replace('.mp4', '') + ext
+                alt_path = os.path.splitext(output_path)[0] + ext
                 if os.path.exists(alt_path):
                     if alt_path != output_path:
                         os.rename(alt_path, output_path)
@@ -259,86 +564,333 @@ def download_youtube_clip(url: str, start_time: float, end_time: float, output_p
     except subprocess.TimeoutExpired:
         raise Exception("YouTube download timed out after 5 minutes")
 
-def download_youtube_full_and_trim(url: str, start_time: float, end_time: float, output_path: str, temp_dir: str) -> None:
+def download_youtube_full(url: str, output_path: str) -> None:
+    """Download the full video (720p max) from YouTube using yt-dlp."""
+    cmd = [
+        'yt-dlp',
+        '--no-playlist',
+        '-f', 'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]/best[height<=720]',
+        '--merge-output-format', 'mp4',
+        '-o', output_path,
+        '--no-warnings',
+        '--no-cache-dir',
+        url
+    ]
+    
+    logger.info("Downloading full video (720p max)...")
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=1200)
+    
+    if result.returncode != 0:
+        raise Exception(f"yt-dlp failed: {result.stderr}")
+    
+    if not os.path.exists(output_path):
+        if os.path.exists(output_path + '.mp4'):
+            os.rename(output_path + '.mp4', output_path)
+        else:
+            raise Exception("Downloaded video not found")
+    
+    logger.info(f"Downloaded full video: {os.path.getsize(output_path) / 1024 / 1024:.2f} MB")
+
+def trim_clip(source: str, start_time: float, end_time: float, output_path: str, input_options: Optional[list] = None) -> None:
+    """
+    Cut the [start_time, end_time] range out of a video. The source may be a
+    local path or an HTTP(S) URL, in which case FFmpeg seeks through the
+    container index and only fetches the byte ranges it needs.
+    """
+    duration = end_time - start_time
+    ffmpeg_cmd = [
+        'ffmpeg', '-y',
+        *(input_options or []),
+        '-ss', str(start_time),
+        '-i', source,
+        '-t', str(duration),
+        '-c:v', 'libx264',
+        '-preset', 'veryfast',
+        '-crf', '23',
+        '-c:a', 'aac',
+        '-b:a', '128k',
+        '-avoid_negative_ts', 'make_zero',
+        '-movflags', '+faststart',
+        output_path
+    ]
+    
+    logger.info(f"Trimming: {start_time}s - {end_time}s")
+    result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=300)
+    
+    if result.returncode != 0:
+        raise Exception(f"FFmpeg trim failed: {result.stderr}")
+    
+    clip_size = os.path.getsize(output_path)
+    if os.path.exists(source):
+        source_size = os.path.getsize(source)
+        logger.info(f"Trimmed clip: {clip_size / 1024 / 1024:.2f} MB (saved {(source_size - clip_size) / 1024 / 1024:.2f} MB)")
+    else:
+        logger.info(f"Trimmed clip: {clip_size / 1024 / 1024:.2f} MB")
+
+def find_keyframe_before(source: str, timestamp: float, window: float = 30) -> Optional[float]:
+    """
+    Timestamp of the last video keyframe at or before `timestamp`, via
+    ffprobe; both relative to the start of the file, like -ss.
+    """
+    keyframes = probe_keyframes(source, max(0.0, timestamp - window), timestamp + 0.001)
+    return max(keyframes) if keyframes else None
+
+def copy_clip(source: str, start_time: float, end_time: float, output_path: str, input_options: Optional[list] = None) -> Optional[float]:
+    """
+    Stream-copy (-c copy) a clip starting at the keyframe at or before
+    start_time, so no intermediate encode happens.
+    
+    Returns the lead-in between that keyframe and start_time, which the
+    engine trims precisely in its final encode, or None when the nearest
+    keyframe is too far back or the copy fails.
+    """
+    keyframe = find_keyframe_before(source, start_time)
+    if keyframe is None or start_time - keyframe > MAX_KEYFRAME_LEAD_IN:
+        return None
+    
+    ffmpeg_cmd = [
+        'ffmpeg', '-y',
+        *(input_options or []),
+        '-ss', str(keyframe),
+        '-i', source,
+        '-t', str(end_time - keyframe),
+        '-map', '0:v:0',
+        '-map', '0:a:0?',
+        '-c', 'copy',
+        '-avoid_negative_ts', 'make_zero',
+        '-movflags', '+faststart',
+        output_path
+    ]
+    
+    logger.info(f"Stream-copying: {keyframe}s - {end_time}s (lead-in {start_time - keyframe:.3f}s)")
+    result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=300)
+    
+    if result.returncode != 0:
+        logger.warning(f"Stream copy failed: {result.stderr[-500:]}")
+        metrics.inc('smartclip_fallbacks_total', kind='reencode_extraction')
+        return None
+    
+    return start_time - keyframe
+
+def extract_clip(source: str, start_time: float, end_time: float, output_path: str, input_options: Optional[list] = None) -> float:
+    """
+    Extract a clip, stream-copying from a nearby keyframe when possible and
+    re-encoding otherwise. Returns the lead-in before start_time contained in
+    the output (0 when re-encoded).
+    """
+    if STREAM_COPY_EXTRACTION:
+        lead_in = copy_clip(source, start_time, end_time, output_path, input_options)
+        if lead_in is not None:
+            return lead_in
+    
+    trim_clip(source, start_time, end_time, output_path, input_options)
+    return 0.0
+
+def get_presigned_url(s3_url: str, expires_in: int = 3600) -> str:
+    """Presigned GET URL for an S3 object."""
+    bucket, key = parse_s3_url(s3_url)
+    return get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=expires_in
+    )
+
+def stream_clip_from_s3(s3_url: str, start_time: float, end_time: float, output_path: str) -> float:
+    """
+    Extract a clip by letting FFmpeg read the S3 object over a presigned URL.
+    FFmpeg issues ranged GETs for the container index and the samples in
+    the requested range, so the rest of the upload never crosses the network.
+    """
+    logger.info(f"Streaming clip from S3: {start_time}s - {end_time}s")
+    return extract_clip(
+        get_presigned_url(s3_url),
+        start_time,
+        end_time,
+        output_path,
+        input_options=['-reconnect', '1', '-reconnect_on_network_error', '1', '-reconnect_delay_max', '5']
+    )
+
+def download_youtube_full_and_trim(url: str, start_time: float, end_time: float, output_path: str, temp_dir: str) -> float:
     """
     Fallback: Download full video and trim. Used if clip download fails.
-    Immediately deletes full video after trimming to save space.
+    The full video goes through the source cache so later clips of the
+    same episode reuse it; without the cache it is deleted after trimming.
+    Returns the keyframe lead-in of the extracted clip.
     """
     logger.info(f"Fallback: Downloading full video and trimming")
     
-    full_video_path = os.path.join(temp_dir, 'full_video_temp.mp4')
+    video_key = normalize_source_url(url)
+    fetch = lambda path: download_youtube_full(url, path)
+    
+    with cached_source(video_key, fetch, temp_dir, 'full_video_temp.mp4') as full_video_path:
+        return extract_clip(full_video_path, start_time, end_time, output_path)
+
+def fetch_youtube_clip(url: str, start_time: float, end_time: float, output_path: str, temp_dir: str) -> float:
+    """
+    Get a YouTube clip into output_path, reusing cached downloads:
+    a full video cached by an earlier fallback is trimmed locally, and
+    identical clip requests share one clip download.
+    Returns the lead-in before start_time contained in the clip.
+    """
+    video_key = normalize_source_url(url)
+    cache = get_source_cache()
+    
+    if cache and cache.contains(video_key):
+        logger.info(f"Using cached full video for {video_key}")
+        return download_youtube_full_and_trim(url, start_time, end_time, output_path, temp_dir)
+    
+    clip_key = f"{video_key}#{start_time}-{end_time}"
+    fetch = lambda path: download_youtube_clip(url, start_time, end_time, path)
     
     try:
-        cmd = [
-            'yt-dlp',
-            '--no-playlist',
-            '-f', 'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]/best[height<=720]',
-            '--merge-output-format', 'mp4',
-            '-o', full_video_path,
-            '--no-warnings',
-            '--no-cache-dir',
-            url
-        ]
-        
-        logger.info("Downloading full video (720p max)...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1200)
-        
-        if result.returncode != 0:
-            raise Exception(f"yt-dlp failed: {result.stderr}")
+        with cached_source(clip_key, fetch, temp_dir, 'clip_download.mp4') as clip_path:
+            link_or_copy(clip_path, output_path)
+        # yt-dlp cuts exactly at the requested range
+        return 0.0
+    except Exception as e:
+        logger.warning(f"Clip download failed, using fallback: {e}")
+        metrics.inc('smartclip_fallbacks_total', kind='youtube_full_download')
+        return download_youtube_full_and_trim(url, start_time, end_time, output_path, temp_dir)
+
+def get_redis_client() -> redis.Redis:
+    """Create Redis client from URL."""
+    return redis.from_url(REDIS_URL, decode_responses=True)
+
+def get_job_queue(redis_client: redis.Redis) -> Optional[StreamJobQueue]:
+    """Stream-backed job queue, or None with the legacy list backend."""
+    if JOB_QUEUE_BACKEND != 'streams':
+        return None
+    return StreamJobQueue(
+        redis_client,
+        JOB_STREAM_KEY,
+        JOB_CONSUMER_GROUP,
+        legacy_list=JOB_QUEUE_KEY,
+        visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+        max_attempts=JOB_MAX_ATTEMPTS
+    )
+
+_status_publisher = None
+
+def get_status_publisher() -> Optional[StatusPublisher]:
+    """Get or create this process's status publisher (None when disabled)."""
+    global _status_publisher
+    if _status_publisher is None and STATUS_PUBLISHER:
+        _status_publisher = StatusPublisher(
+            get_redis_client,
+            STATUS_KEY_PREFIX,
+            STATUS_HASH_PREFIX,
+            STATUS_CHANNEL_PREFIX,
+            ttl=1800,
+            min_interval=STATUS_MIN_INTERVAL,
+            legacy_key=STATUS_LEGACY_KEY
+        )
+    return _status_publisher
+
+def update_status(redis_client: redis.Redis, project_id: str, status: Dict[str, Any]) -> None:
+    """
+    Update job status in Redis with short expiry. With the status publisher
+    the write is coalesced and happens off this thread (terminal statuses
+    are still written before this returns).
+    """
+    publisher = get_status_publisher()
+    if publisher:
+        publisher.update(project_id, status)
+    else:
+        key = f"{STATUS_KEY_PREFIX}{project_id}"
+        redis_client.set(key, json.dumps(status), ex=1800)
+    logger.debug(f"Updated status for {project_id}: {status.get('stage', 'unknown')}")
+
+def fetch_job_input(
+    job_data: Dict[str, Any],
+    redis_client: redis.Redis,
+    clipped_video_path: str,
+    temp_dir: str,
+    stage_timings_ms: Dict[str, int]
+) -> Tuple[float, str]:
+    """
+    Download or extract the job's clip into clipped_video_path.
+    Returns the clip's keyframe lead-in and the source identity.
+    """
+    project_id = job_data['project_id']
+    job_id = job_data['job_id']
+    source_type = job_data.get('source_type', 'youtube')
+    clip_start = job_data['clip_start_time']
+    clip_end = job_data['clip_end_time']
+    
+    if source_type == 'youtube':
+        update_status(redis_client, project_id, {
+            'status': 'processing',
+            'stage': 'downloading_youtube',
+            'progress': 5
+        })
         
-        if not os.path.exists(full_video_path):
-            if os.path.exists(full_video_path + '.mp4'):
-                full_video_path = full_video_path + '.mp4'
-            else:
-                raise Exception("Downloaded video not found")
+        source_url = job_data['source_url']
+        with timed_stage(stage_timings_ms, 'download'):
+            clip_offset = fetch_youtube_clip(source_url, clip_start, clip_end, clipped_video_path, temp_dir)
+        source_id = source_identity(job_data)
         
-        full_size = os.path.getsize(full_video_path)
-        logger.info(f"Downloaded full video: {full_size / 1024 / 1024:.2f} MB")
+    else:
+        update_status(redis_client, project_id, {
+            'status': 'processing',
+            'stage': 'downloading_video',
+            'progress': 5
+        })
         
-        duration = end_time - start_time
-        ffmpeg_cmd = [
-            'ffmpeg', '-y',
-            '-ss', str(start_time),
-            '-i', full_video_path,
-            '-t', str(duration),
-            '-c:v', 'libx264',
-            '-preset', 'veryfast',
-            '-crf', '23',
-            '-c:a', 'aac',
-            '-b:a', '128k',
-            '-avoid_negative_ts', 'make_zero',
-            '-movflags', '+faststart',
-            output_path
-        ]
+        video_path = job_data['video_path']
+        etag = get_s3_etag(video_path)
+        bucket, key = parse_s3_url(video_path)
+        source_key = f"s3://{bucket}/{key}@{etag}"
+        source_cache = get_source_cache()
         
-        logger.info(f"Trimming: {start_time}s - {end_time}s")
-        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True, timeout=300)
+        update_status(redis_client, project_id, {
+            'status': 'processing',
+            'stage': 'extracting_clip',
+            'progress': 15
+        })
         
-        if result.returncode != 0:
-            raise Exception(f"FFmpeg trim failed: {result.stderr}")
+        streamed = False
+        if S3_STREAMING_INPUT and not (source_cache and source_cache.contains(source_key)):
+            try:
+                with timed_stage(stage_timings_ms, 'extract'):
+                    clip_offset = stream_clip_from_s3(video_path, clip_start, clip_end, clipped_video_path)
+                streamed = True
+            except Exception as e:
+                logger.warning(f"[{job_id}] Streaming extraction failed, downloading full video: {e}")
+                metrics.inc('smartclip_fallbacks_total', kind='s3_full_download')
         
-        clip_size = os.path.getsize(output_path)
-        logger.info(f"Trimmed clip: {clip_size / 1024 / 1024:.2f} MB (saved {(full_size - clip_size) / 1024 / 1024:.2f} MB)")
+        if not streamed:
+            def fetch(path: str) -> None:
+                with timed_stage(stage_timings_ms, 'download'):
+                    download_from_s3(video_path, path)
+            
+            with cached_source(source_key, fetch, temp_dir, 'full_video.mp4') as full_video_path:
+                logger.info(f"[{job_id}] Extracting clip: {clip_start}s - {clip_end}s")
+                with timed_stage(stage_timings_ms, 'extract'):
+                    clip_offset = extract_clip(full_video_path, clip_start, clip_end, clipped_video_path)
         
-    finally:
-        cleanup_file(full_video_path)
-        for f in os.listdir(temp_dir):
-            if f.startswith('full_video_temp') and f != os.path.basename(output_path):
-                cleanup_file(os.path.join(temp_dir, f))
-
-def get_redis_client() -> redis.Redis:
-    """Create Redis client from URL."""
-    return redis.from_url(REDIS_URL, decode_responses=True)
+        source_id = source_identity(job_data, s3_etag=etag)
+    
+    return clip_offset, source_id
 
-def update_status(redis_client: redis.Redis, project_id: str, status: Dict[str, Any]) -> None:
-    """Update job status in Redis with short expiry."""
-    key = f"{STATUS_KEY_PREFIX}{project_id}"
-    redis_client.set(key, json.dumps(status), ex=1800)
-    logger.debug(f"Updated status for {project_id}: {status.get('stage', 'unknown')}")
+class JobSuperseded(Exception):
+    """Another delivery of the job took it over or already completed it"""
 
-def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str, Any]:
+def process_job(
+    job_data: Dict[str, Any],
+    redis_client: redis.Redis,
+    final_attempt: bool = True,
+    superseded: Optional[Callable[[], bool]] = None
+) -> Dict[str, Any]:
     """
     Process a single podcast clipper job with optimized resource usage.
+    
+    A failure on a non-final attempt is reported as 'retrying' rather than
+    'failed', since the API treats 'failed' as terminal.
+    
+    superseded is polled with every progress update and before the upload
+    and the final status write. Once it returns True (another delivery
+    reclaimed or finished the job) this one stops with JobSuperseded and
+    writes no status, leaving the job's status to the other delivery.
     """
     project_id = job_data['project_id']
     job_id = job_data['job_id']
@@ -346,67 +898,35 @@ def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str
     logger.info(f"[{job_id}] Processing job for project {project_id}")
     
     start_time = time.time()
+    stage_timings_ms: Dict[str, int] = {}
+    metrics.add_gauge('smartclip_jobs_in_flight', 1)
+    
+    # Survives the temp dir so a retry of this job resumes its stages
+    checkpoint = get_job_checkpoint(job_id)
+    
+    def check_superseded():
+        if superseded and superseded():
+            raise JobSuperseded(f"Job {job_id} was taken over by another delivery")
     
     with managed_temp_dir(f'podcast_{project_id[:8]}_') as temp_dir:
         try:
-            source_type = job_data.get('source_type', 'youtube')
             clip_start = job_data['clip_start_time']
             clip_end = job_data['clip_end_time']
             clip_duration = clip_end - clip_start
             
             clipped_video_path = os.path.join(temp_dir, 'input_clip.mp4')
             
-            if source_type == 'youtube':
-                update_status(redis_client, project_id, {
-                    'status': 'processing',
-                    'stage': 'downloading_youtube',
-                    'progress': 5
-                })
-                
-                source_url = job_data['source_url']
-                
-                try:
-                    download_youtube_clip(source_url, clip_start, clip_end, clipped_video_path)
-                except Exception as e:
-                    logger.warning(f"[{job_id}] Clip download failed, using fallback: {e}")
-                    download_youtube_full_and_trim(source_url, clip_start, clip_end, clipped_video_path, temp_dir)
-                
+            resumed = checkpoint.completed('input') if checkpoint else None
+            if resumed and checkpoint.restore('input', clipped_video_path):
+                logger.info(f"[{job_id}] Resuming from checkpoint (completed: {', '.join(checkpoint.manifest['stages'])})")
+                clip_offset = resumed['clip_offset']
+                source_id = resumed['source_id']
             else:
-                update_status(redis_client, project_id, {
-                    'status': 'processing',
-                    'stage': 'downloading_video',
-                    'progress': 5
-                })
-                
-                video_path = job_data['video_path']
-                full_video_path = os.path.join(temp_dir, 'full_video.mp4')
-                download_from_s3(video_path, full_video_path)
-                
-                update_status(redis_client, project_id, {
-                    'status': 'processing',
-                    'stage': 'extracting_clip',
-                    'progress': 15
-                })
-                
-                ffmpeg_cmd = [
-                    'ffmpeg', '-y',
-                    '-ss', str(clip_start),
-                    '-i', full_video_path,
-                    '-t', str(clip_duration),
-                    '-c:v', 'libx264',
-                    '-preset', 'veryfast',
-                    '-crf', '23',
-                    '-c:a', 'aac',
-                    '-b:a', '128k',
-                    '-avoid_negative_ts', 'make_zero',
-                    clipped_video_path
-                ]
-                
-                logger.info(f"[{job_id}] Extracting clip: {clip_start}s - {clip_end}s")
-                subprocess.run(ffmpeg_cmd, check=True, capture_output=True, timeout=300)
-                
-                cleanup_file(full_video_path)
+                clip_offset, source_id = fetch_job_input(job_data, redis_client, clipped_video_path, temp_dir, stage_timings_ms)
+                if checkpoint:
+                    checkpoint.complete('input', {'clip_offset': clip_offset, 'source_id': source_id}, clipped_video_path)
             
+            check_superseded()
             force_garbage_collection()
             
             update_status(redis_client, project_id, {
@@ -421,16 +941,33 @@ def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str
             
             output_path = os.path.join(temp_dir, 'output.mp4')
             
+            output_prefix = job_data.get('output_prefix', f"podcast-clips/{job_data['user_id']}/{project_id}")
+            output_key = f"{output_prefix}/output_{int(time.time())}.mp4"
+            
+            # The final encode is written as fragmented MP4 straight into a
+            # multipart upload instead of to disk followed by a separate upload
+            output_sink = S3MultipartSink(output_key) if STREAMING_UPLOAD else None
             
-            models_dir = os.path.join(os.path.dirname(__file__), 'models')
             engine = SmartClipEngine(
-                models_dir=models_dir,
+                models_dir=MODELS_DIR,
                 temp_dir=temp_dir,
-                output_dir=temp_dir
+                output_dir=temp_dir,
+                # Stage outputs go to the job checkpoint, which falls through to the shared cache
+                artifact_cache=checkpoint or get_artifact_cache(),
+                render_chunks=RENDER_CHUNKS,
+                face_backend=FACE_DETECTOR_BACKEND,
+                face_tracking=FACE_TRACKING,
+                active_speaker=ACTIVE_SPEAKER,
+                vad_gating=VAD_GATED_ASR,
+                ffmpeg_stall_seconds=FFMPEG_STALL_SECONDS,
+                ffmpeg_min_speed=FFMPEG_MIN_SPEED,
+                cpu_threads=_thread_budget
             )
             
             
             def progress_callback(progress: float, message: str):
+                # Raising here fails the running stage, which stops the engine
+                check_superseded()
                 mapped_progress = 25 + (progress * 65)  # Map 0-1 to 25-90
                 update_status(redis_client, project_id, {
                     'status': 'processing',
@@ -439,15 +976,34 @@ def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str
                 })
             
             
-            result = engine.process(
-                input_path=clipped_video_path,
-                output_path=output_path,
-                start_time=0,
-                end_time=clip_duration,
-                subtitle_style=subtitle_style,
-                whisper_model=whisper_model,
-                progress_callback=progress_callback
-            )
+            try:
+                result = engine.process(
+                    input_path=clipped_video_path,
+                    output_path=output_path,
+                    # A stream-copied clip starts at the keyframe before clip_start;
+                    # the engine trims the lead-in in its single final encode
+                    start_time=clip_offset,
+                    end_time=clip_offset + clip_duration,
+                    subtitle_style=subtitle_style,
+                    whisper_model=whisper_model,
+                    progress_callback=progress_callback,
+                    source_id=source_id,
+                    output_sink=output_sink
+                )
+            except Exception:
+                if output_sink:
+                    output_sink.abort()
+                raise
+            
+            for stage, elapsed_ms in result.get('stage_timings_ms', {}).items():
+                stage_timings_ms[stage] = elapsed_ms
+                metrics.observe('smartclip_stage_seconds', elapsed_ms / 1000, stage=stage)
+            
+            for run in result.get('ffmpeg_runs', []):
+                logger.info(
+                    f"[{job_id}] FFmpeg {run['kind']}: {run['media_seconds']:.1f}s in {run['wall_seconds']:.1f}s "
+                    f"({run['fps']} fps, {run['speed']}x){' STALLED' if run['stalled'] else ''}"
+                )
 
             
             cleanup_file(clipped_video_path)
@@ -456,6 +1012,14 @@ def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str
             force_garbage_collection()
             
             
+            try:
+                check_superseded()
+            except JobSuperseded:
+                if output_sink:
+                    output_sink.abort()
+                raise
+            
+            
             update_status(redis_client, project_id, {
                 'status': 'processing',
                 'stage': 'uploading',
@@ -463,15 +1027,19 @@ def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str
             })
             
             
-            output_prefix = job_data.get('output_prefix', f"podcast-clips/{job_data['user_id']}/{project_id}")
-            output_key = f"{output_prefix}/output_{int(time.time())}.mp4"
-            
-            output_url = upload_to_s3(output_path, output_key)
+            with timed_stage(stage_timings_ms, 'upload'):
+                if output_sink:
+                    output_url = output_sink.close()
+                else:
+                    output_url = upload_to_s3(output_path, output_key)
             
             
             processing_time_ms = int((time.time() - start_time) * 1000)
             
             
+            check_superseded()
+            
+            
             final_status = {
                 'status': 'completed',
                 'stage': 'completed',
@@ -479,82 +1047,187 @@ def process_job(job_data: Dict[str, Any], redis_client: redis.Redis) -> Dict[str
                 'output_url': output_url,
                 'speakers_detected': result.get('speakers_detected', 1),
                 'layout_mode': result.get('layout_mode', 'single'),
-                'processing_time_ms': processing_time_ms
+                'processing_time_ms': processing_time_ms,
+                'stage_timings_ms': stage_timings_ms
             }
             
             update_status(redis_client, project_id, final_status)
+            metrics.inc('smartclip_jobs_total', status='completed')
+            if checkpoint:
+                checkpoint.clear()
+            metrics.observe('smartclip_job_seconds', processing_time_ms / 1000)
             
             logger.info(f"[{job_id}] Job completed in {processing_time_ms / 1000:.1f}s")
             logger.info(f"[{job_id}] Output: {output_url}")
             
             return final_status
             
+        except JobSuperseded:
+            metrics.inc('smartclip_jobs_total', status='superseded')
+            raise
         except Exception as e:
+            if superseded and superseded():
+                # Failed while being taken over; the other delivery owns the status
+                metrics.inc('smartclip_jobs_total', status='superseded')
+                raise JobSuperseded(f"Job {job_id} was taken over by another delivery") from e
+            
             error_msg = str(e)
             logger.error(f"[{job_id}] Job failed: {error_msg}")
             logger.error(traceback.format_exc())
             
-            update_status(redis_client, project_id, {
-                'status': 'failed',
-                'stage': 'error',
-                'progress': 0,
-                'error': error_msg
-            })
+            if final_attempt:
+                update_status(redis_client, project_id, {
+                    'status': 'failed',
+                    'stage': 'error',
+                    'progress': 0,
+                    'error': error_msg
+                })
+                if checkpoint:
+                    checkpoint.clear()
+            else:
+                update_status(redis_client, project_id, {
+                    'status': 'processing',
+                    'stage': 'retrying',
+                    'progress': 5,
+                    'error': error_msg
+                })
+            metrics.inc('smartclip_jobs_total', status='failed' if final_attempt else 'retried')
             
             raise
+        finally:
+            metrics.add_gauge('smartclip_jobs_in_flight', -1)
 
-def run_worker():
-    """Main worker loop that polls Redis for jobs."""
-    logger.info("=" * 60)
-    logger.info("Podcast Clipper Worker Starting (Optimized)")
-    logger.info("=" * 60)
-    logger.info(f"Redis URL: {REDIS_URL.split('@')[-1] if '@' in REDIS_URL else REDIS_URL}")
-    logger.info(f"S3 Bucket: {AWS_S3_BUCKET}")
-    logger.info(f"AWS Region: {AWS_REGION}")
-    logger.info(f"Max Temp Size: {MAX_TEMP_SIZE_MB} MB")
-    logger.info("=" * 60)
-    
-    redis_client = get_redis_client()
+def preload_models() -> None:
+    """Load the face detector and default Whisper models into the model pool."""
+    pool = get_model_pool()
     
+    start = time.time()
+    pool.face_detector(MODELS_DIR, FACE_DETECTOR_BACKEND)
+    for model_name in PRELOAD_WHISPER_MODELS:
+        try:
+            pool.asr(model_name)
+        except Exception as e:
+            logger.warning(f"Failed to preload Whisper model '{model_name}': {e}")
     
+    logger.info(f"Models preloaded in {time.time() - start:.1f}s ({pool.resident_mb()} MB resident)")
+
+# Cores a job may use; each pool process sets its share (None = all cores)
+_thread_budget = None
+
+def configure_thread_budget(threads: int) -> None:
+    """Limit intra-op threads so concurrent jobs do not oversubscribe cores."""
+    global _thread_budget
+    _thread_budget = threads
+    import cv2
+    cv2.setNumThreads(threads)
+    get_model_pool().face_detector(MODELS_DIR, FACE_DETECTOR_BACKEND).set_threads(FACE_DETECTOR_THREADS or threads)
+    get_model_pool().asr_threads = ASR_CPU_THREADS or threads
     try:
-        redis_client.ping()
-        logger.info("Redis connection successful")
-    except Exception as e:
-        logger.error(f"Redis connection failed: {e}")
-        sys.exit(1)
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+def run_queued_job(queue: StreamJobQueue, job: QueuedJob, redis_client: redis.Redis) -> None:
+    """
+    Process a job delivered by the stream queue: heartbeat it while it
+    runs, mark it done and ack it on success, and requeue or dead-letter
+    it on failure.
+    
+    A delivery that another consumer reclaimed (missed heartbeats) or that
+    another delivery already completed stops without retrying,
+    dead-lettering or acking; the entry belongs to the other consumer.
+    """
+    job_data = job.data
+    
+    if queue.exhausted(job):
+        # Every attempt so far died without reporting (OOM kill, crash)
+        error = f"Job abandoned after {job.attempt - 1} attempts without completing"
+        logger.error(f"[{job_data.get('job_id', 'unknown')}] {error}")
+        queue.dead_letter(job, error)
+        checkpoint = get_job_checkpoint(str(job_data['job_id'])) if 'job_id' in job_data else None
+        if checkpoint:
+            checkpoint.clear()
+        if 'project_id' in job_data:
+            update_status(redis_client, job_data['project_id'], {
+                'status': 'failed',
+                'stage': 'error',
+                'progress': 0,
+                'error': error
+            })
+        return
+    
+    final_attempt = queue.is_final_attempt(job)
+    with queue.keepalive(job):
+        try:
+            process_job(
+                job_data, redis_client, final_attempt=final_attempt,
+                superseded=lambda: job.lost or queue.is_done(job)
+            )
+        except JobSuperseded as e:
+            logger.warning(f"[{job_data.get('job_id', 'unknown')}] {e}; dropping this delivery")
+            return
+        except Exception as e:
+            if final_attempt:
+                queue.dead_letter(job, str(e))
+            else:
+                logger.info(f"[{job_data.get('job_id', 'unknown')}] Requeueing for attempt {job.attempt + 1}/{JOB_MAX_ATTEMPTS}")
+                queue.retry(job, str(e))
+            raise
     
-    logger.info(f"Listening for jobs on queue: {JOB_QUEUE_KEY}")
+    # Mark first: a crash before the ack then only causes a redelivery that
+    # sees the marker and is dropped, instead of running the job again
+    queue.mark_done(job)
+    queue.ack(job)
+
+def worker_loop(slot: int = 0) -> int:
+    """Poll Redis for jobs and process them one at a time."""
+    redis_client = get_redis_client()
+    queue = get_job_queue(redis_client)
     
     jobs_processed = 0
     
     while True:
         try:
             
-            result = redis_client.brpop(JOB_QUEUE_KEY, timeout=POLL_INTERVAL)
-            
-            if result is None:
-                continue
-            
-            queue_name, job_json = result
+            if queue:
+                job = queue.fetch(POLL_INTERVAL)
+                if job is None:
+                    continue
+                job_json = job.payload
+            else:
+                result = redis_client.brpop(JOB_QUEUE_KEY, timeout=POLL_INTERVAL)
+                if result is None:
+                    continue
+                queue_name, job_json = result
             
             try:
                 job_data = json.loads(job_json)
-                logger.info(f"Received job: {job_data.get('job_id', 'unknown')}")
+                logger.info(f"[slot {slot}] Received job: {job_data.get('job_id', 'unknown')}")
                 
-                process_job(job_data, redis_client)
+                if queue:
+                    if job.attempt > 1:
+                        logger.info(f"[slot {slot}] Attempt {job.attempt}/{JOB_MAX_ATTEMPTS}")
+                    run_queued_job(queue, job, redis_client)
+                else:
+                    process_job(job_data, redis_client)
                 jobs_processed += 1
                 
                 
                 force_garbage_collection()
                 
+                # Checkpoints of jobs that were never retried or finished
+                if JOB_CHECKPOINTS:
+                    JobCheckpoint.sweep(CHECKPOINT_DIR, CHECKPOINT_TTL_HOURS * 3600)
                 
                 if jobs_processed % 5 == 0:
                     try:
                         import psutil
                         process = psutil.Process()
-                        mem_mb = process.memory_info().rss / 1024 / 1024
-                        logger.info(f"Jobs processed: {jobs_processed}, Memory usage: {mem_mb:.1f} MB")
+                        rss = process.memory_info().rss
+                        metrics.set_gauge('smartclip_worker_rss_bytes', rss, slot=slot)
+                        mem_mb = rss / 1024 / 1024
+                        logger.info(f"[slot {slot}] Jobs processed: {jobs_processed}, Memory usage: {mem_mb:.1f} MB")
                     except ImportError:
                         pass
                 
@@ -570,9 +1243,13 @@ def run_worker():
             logger.info("Attempting to reconnect in 5 seconds...")
             time.sleep(5)
             redis_client = get_redis_client()
+            try:
+                queue = get_job_queue(redis_client)
+            except redis.ConnectionError:
+                pass
             
         except KeyboardInterrupt:
-            logger.info("Shutdown signal received")
+            logger.info(f"[slot {slot}] Shutdown signal received")
             break
             
         except Exception as e:
@@ -580,7 +1257,121 @@ def run_worker():
             logger.error(traceback.format_exc())
             time.sleep(1)
     
-    logger.info(f"Worker shutting down. Total jobs processed: {jobs_processed}")
+    if _status_publisher:
+        _status_publisher.close()
+    
+    logger.info(f"[slot {slot}] Worker shutting down. Total jobs processed: {jobs_processed}")
+    return jobs_processed
+
+def worker_process(slot: int, concurrency: int) -> None:
+    """Entry point of a forked pool process."""
+    global _s3_client, _status_publisher
+    
+    # Clients are not fork-safe; each process opens its own connections
+    _s3_client = None
+    _status_publisher = None
+    metrics.forward_to_parent()
+    configure_thread_budget(max(1, (os.cpu_count() or 1) // concurrency))
+    
+    worker_loop(slot)
+
+def run_worker_pool(concurrency: int) -> None:
+    """
+    Run `concurrency` forked worker processes, each pulling its own jobs.
+    
+    Models preloaded in the parent are inherited copy-on-write, and each
+    job already runs in its own temp directory. Processes that die are
+    restarted.
+    """
+    ctx = multiprocessing.get_context('fork')
+    processes: Dict[int, multiprocessing.Process] = {}
+    
+    def spawn(slot: int) -> None:
+        process = ctx.Process(
+            target=worker_process,
+            args=(slot, concurrency),
+            name=f'podcast-clipper-{slot}'
+        )
+        process.start()
+        processes[slot] = process
+        logger.info(f"Started worker process {slot} (pid {process.pid})")
+    
+    for slot in range(concurrency):
+        spawn(slot)
+    
+    try:
+        while True:
+            for slot, process in list(processes.items()):
+                if not process.is_alive():
+                    logger.warning(f"Worker process {slot} exited with code {process.exitcode}, restarting")
+                    spawn(slot)
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        logger.info("Shutdown signal received, waiting for worker processes")
+        for process in processes.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+def run_worker():
+    """Main worker entry point: preload models and start polling Redis for jobs."""
+    logger.info("=" * 60)
+    logger.info("Podcast Clipper Worker Starting (Optimized)")
+    logger.info("=" * 60)
+    logger.info(f"Redis URL: {REDIS_URL.split('@')[-1] if '@' in REDIS_URL else REDIS_URL}")
+    logger.info(f"S3 Bucket: {AWS_S3_BUCKET}")
+    logger.info(f"AWS Region: {AWS_REGION}")
+    logger.info(f"Max Temp Size: {MAX_TEMP_SIZE_MB} MB")
+    logger.info(f"Source Cache: {SOURCE_CACHE_DIR} ({SOURCE_CACHE_MAX_MB} MB)")
+    logger.info(f"Artifact Cache: {ARTIFACT_CACHE_DIR} ({ARTIFACT_CACHE_MAX_MB} MB)")
+    logger.info(f"Job Checkpoints: {CHECKPOINT_DIR if JOB_CHECKPOINTS else 'disabled'}")
+    logger.info(f"Concurrency: {WORKER_CONCURRENCY}")
+    logger.info(f"Metrics Port: {METRICS_PORT or 'disabled'}")
+    logger.info("=" * 60)
+    
+    if WORKER_CONCURRENCY > 1:
+        # Keep torch single-threaded while loading so no OpenMP pool exists
+        # before fork; each pool process sets its own thread budget
+        configure_thread_budget(1)
+    
+    preload_models()
+    
+    redis_client = get_redis_client()
+    
+    
+    try:
+        redis_client.ping()
+        logger.info("Redis connection successful")
+    except Exception as e:
+        logger.error(f"Redis connection failed: {e}")
+        sys.exit(1)
+    finally:
+        redis_client.close()
+    
+    if METRICS_PORT:
+        queue_client = get_redis_client()
+        depth_queue = get_job_queue(queue_client)
+        if depth_queue:
+            metrics.gauge_callback('smartclip_queue_depth', depth_queue.depth)
+        else:
+            metrics.gauge_callback('smartclip_queue_depth', lambda: queue_client.llen(JOB_QUEUE_KEY))
+        if WORKER_CONCURRENCY > 1:
+            metrics.start_collector()
+        metrics.serve(METRICS_PORT)
+        logger.info(f"Metrics endpoint: http://0.0.0.0:{METRICS_PORT}/metrics")
+    
+    if JOB_QUEUE_BACKEND == 'streams':
+        logger.info(
+            f"Listening for jobs on stream: {JOB_STREAM_KEY} (group {JOB_CONSUMER_GROUP}, "
+            f"bridging {JOB_QUEUE_KEY}, visibility {JOB_VISIBILITY_TIMEOUT:.0f}s, {JOB_MAX_ATTEMPTS} attempts)"
+        )
+    else:
+        logger.info(f"Listening for jobs on queue: {JOB_QUEUE_KEY}")
+    
+    if WORKER_CONCURRENCY > 1:
+        run_worker_pool(WORKER_CONCURRENCY)
+    else:
+        worker_loop()
 
 if __name__ == '__main__':
     run_worker()